@@ -1,46 +1,53 @@
+import os
 import pandas as pd
 import numpy as np
-import openpyxl
-from openpyxl import load_workbook
-from openpyxl.styles import Alignment, Font
-from utils import *
+from concurrent.futures import ProcessPoolExecutor
+from paths import get_app_dir
+from utils import render_values, render_date_pairs
+from store import read_table
+from regions import LATAM_COUNTRIES, compile_regions, country_bitmasks, classify_regions, bitmask_names
+from engine import decode_levels, build_window_table, evaluate_windows, evaluate_windows_batch, group_avails
+from excel import write_workbook, write_partitions
+from instrument import RunReport, report_path
+from cache import TitleCache, title_digests, cache_key, concat_rows
+from rules import PAY_TV_RULES, apply_rules
 import warnings
 
 # Supress all warnings
 warnings.filterwarnings('ignore')
 
-def avails_process():
-    print('Processing avails...')
-
-    app_dir = get_app_dir()
-
-    latam_countries = [
-        'Costa Rica',
-        'El Salvador',
-        'Guatemala',
-        'Honduras',
-        'Nicaragua',
-        'Panama',
-        'Mexico',
-        'Argentina',
-        'Bolivia',
-        'Brazil',
-        'Chile',
-        'Colombia',
-        'Ecuador',
-        'Paraguay',
-        'Peru',
-        'Uruguay',
-        'Venezuela'
-    ]
+# Rights groups of the avails and summary workbooks
+USEFUL_RIGHTS = [
+    'SVOD',
+    'Premium Pay TV (Pan Regional)',
+    'Premium Pay TV (Local)',
+    'Basic Pay TV (Pan Regional)',
+    'Basic Pay TV (Local)',
+    'AVOD',
+]
+
+# Fewest titles worth sending to a worker process
+SHARD_MIN_TITLES = 100
+
+def read_windows(tables_dir):
+    """
+    Load the windows of the contracts with a 'Normal' status from the table store.
+
+    Params
+    ------
+    tables_dir : str
+        directory of the tables written by `process_data`
+
+    Returns
+    -------
+    pandas.DataFrame
+        Returns the windows indexed by 'window', with the 'contract_type',
+        'distributor' and 'status' of their contract.
+    """
+    # The declared columns of schema.TABLE_SCHEMAS
+    windows_df = read_table(tables_dir, 'windows', categorical=True)
+    contracts = read_table(tables_dir, 'contracts', categorical=True)
 
-    # Load the data
-    windows_df = pd.read_pickle(os.path.join(app_dir, 'data', 'tables', 'windows.pkl'))
-    contracts = pd.read_pickle(os.path.join(app_dir, 'data', 'tables',  'contracts.pkl'))
-    titles = pd.read_pickle(os.path.join(app_dir, 'data', 'tables', 'titles.pkl'))
-    roles = pd.read_pickle(os.path.join(app_dir, 'data', 'tables', 'roles.pkl'))
-    people = pd.read_pickle(os.path.join(app_dir, 'data', 'tables', 'people.pkl'))
-    
     # Filter contracts_df for 'Normal' status
     contracts_filtered = contracts[contracts['status'] == 'Normal']
 
@@ -49,373 +56,22 @@ def avails_process():
 
     # Use the window column as the index
     windows_df.set_index('window', inplace=True)
-
-    # Filter titles for 'SD Tape' and 'SD File' in the 'original_format' column
-    titles = titles.loc[
-        ~(titles['original_format'].isin(['SD Tape', 'SD File']))
-        ]
-
-    titles.drop([
-        'imdb_code', 
-        'project_group', 
-        'adj_running_time', 
-        'aka_2', 
-        'title_code'
-        ], axis=1, inplace=True)
-
-    # Create a talent dataframe by merging the roles and people dataframes
-    talent = pd.merge(
-        roles[['title', 'role', 'person']], 
-        people[['person', 'name']],
-        on='person', 
-        how='inner'
-    )
-
-    # Group the talent dataframe by 'title' and 'role' and aggregate the 'name' column as a list
-    talent_list = talent.groupby(['title', 'role'])[['name']].agg({'name':list})
-    talent_list = talent_list.unstack(1)
-    talent_list.columns = [role.lower() for _, role in talent_list.columns]
-
-    # Merge the titles dataframe with the talent_list dataframe
-    titles = titles.join(
-        talent_list, 
-        how='left',
-    )
-
-    # Create a sales_activity dataframe by filtering the windows_df dataframe for 'Sales' and 'Holdback' in the 'contract_type' and 'license_type' columns respectively
-    sales_activity = windows_df.loc(axis=0)[
-        (windows_df['contract_type'] == 'Sales') &
-        (windows_df['license_type'] != 'Holdback')
-    ]
-
-    # Group the sales_activity dataframe by 'title', 'group', 'right_name', 'country_name', 'license_type', and 'distributor' and aggregate the 'end_date' column as the maximum value
-    sales_activity = sales_activity.groupby([
-        'title',
-        'group',
-        'right_name',
-        'country_name',
-        'license_type', 
-        'distributor'
-    ], dropna=False)['end_date'].max()
-
-    # Unstack the sales_activity dataframe by the last two levels
-    sales_activity = sales_activity.unstack(level=[-1, -2])
-
-    # Drop rows with all NaN values
-    sales_activity = sales_activity[~sales_activity.isna().all(axis=1)]
-    sales_cols = sales_activity.columns
-    
-    # sort sales_cols alphabetically
-    sales_cols = sorted(sales_cols, key=lambda x: x[0])
-    sales_activity = sales_activity[sales_cols]
-
-    # Create windows_mat by grouping the windows_df dataframe by 'title', 'group', 
-    # 'right_name', 'country_name', 'contract_type', and 'license_type' and 
-    # aggregating the 'start_date' and 'end_date' columns as the maximum value
-    window_mat = windows_df.groupby([
-        'title',
-        'group',
-        'right_name',
-        'country_name',
-        'contract_type',
-        'license_type'
-    ], dropna=False).agg({
-        'start_date': np.max,
-        'end_date': np.max
-    })
-
-    # Add 1 day to the end_date to make it inclusive
-    window_mat.loc[
-        pd.IndexSlice[:,:,:,:,'Sales', :], 
-        'end_date'
-        ] = window_mat.loc[
-            pd.IndexSlice[:,:,:,:,'Sales', :], 
-            'end_date'
-            ] + pd.Timedelta(1, 'D')
-
-    # Unstack the window_mat dataframe by the last two levels
-    window_mat = window_mat.unstack(level=[-2, -1])
-    window_mat['today'] = pd.Timestamp('today').date()
-
-    # Calculate the exclusive avail start date
-    st_date_excl = window_mat.loc[
-        (~window_mat[('start_date',  'Acquisition',       'License')].isna()) &
-        (window_mat[(  'end_date',  'Acquisition',       'License')] >= pd.Timestamp('today') + pd.Timedelta(26, 'W')) 
-    ][[
-        ('start_date',  'Acquisition',       'License'),
-        (  'end_date',  'Acquisition',      'Holdback'),
-        (  'end_date', 'Sales', 'Non-Exclusive'),
-        (  'end_date', 'Sales',       'License'),
-        (  'end_date', 'Sales',      'Holdback'),
-        (     'today',    '',              ''),
-    ]]
-    st_date_excl = st_date_excl.fillna(pd.Timestamp.min)
-    st_date_excl_idx = st_date_excl.index
-
-    # Create an avails_df dataframe with the exclusive column
-    avails_df = pd.DataFrame(
-        st_date_excl.values.max(axis=1), 
-        columns=['exclusive'], 
-        index=st_date_excl_idx
-    )
-
-    # Calculate the non-exclusive start date
-    st_date_non_excl = window_mat.loc[
-        (~window_mat[('start_date',  'Acquisition',       'License')].isna() |
-        (~window_mat[('start_date',  'Acquisition',       'Non-Exclusive')].isna())) &
-        ((window_mat[(  'end_date',  'Acquisition',       'License')] >= pd.Timestamp('today') + pd.Timedelta(26, 'W'))  |
-        (window_mat[(  'end_date',  'Acquisition',       'Non-Exclusive')] >= pd.Timestamp('today') + pd.Timedelta(26, 'W')))
-    ][[
-        ('start_date',  'Acquisition',       'License'),
-        ('start_date',  'Acquisition', 'Non-Exclusive'),
-        (  'end_date',  'Acquisition',      'Holdback'),
-        (  'start_date', 'Sales',       'License'),
-        (  'end_date', 'Sales',       'License'),
-        (  'end_date', 'Sales',      'Holdback'),
-        (     'today',    '',              ''),
-    ]]
-    st_date_non_excl = st_date_non_excl.fillna(pd.Timestamp.min)
-    st_date_non_excl['non-exclusive'] = st_date_non_excl.apply(max_date, axis=1)
-
-    # Join the non-exclusive column of st_date_non_excl with the avails_df dataframe
-    avails_df = avails_df.join(st_date_non_excl[['non-exclusive']], how='outer')
-
-    avails_df.columns = [''.join(col) for col in avails_df.columns]
-
-    # Calculate the acquitsition expiry date
-    acq_exp = window_mat.loc[
-        (~window_mat[('start_date',  'Acquisition',       'License')].isna() |
-        (~window_mat[('start_date',  'Acquisition',       'Non-Exclusive')].isna())) &
-        ((window_mat[(  'end_date',  'Acquisition',       'License')] >= pd.Timestamp('today') + pd.Timedelta(26, 'W'))  |
-        (window_mat[(  'end_date',  'Acquisition',       'Non-Exclusive')] >= pd.Timestamp('today') + pd.Timedelta(26, 'W')))
-    ][[
-        (  'end_date',  'Acquisition',       'License'),
-        (  'end_date',  'Acquisition', 'Non-Exclusive'),
-    ]]
-    acq_exp = acq_exp.fillna(pd.Timestamp.min)
-    avails_df['acq_expires'] = acq_exp.values.max(axis=1)
-
-    # Calculate the non-exclusive end date
-    non_excl_end_date = avails_df[['non-exclusive', 'acq_expires']].join(
-        window_mat[[
-            ('start_date',       'Sales',       'License'),
-            ('start_date',       'Sales',      'Holdback'),
-        ]], 
-        how='left'
-    )
-    avails_df['non-exclusive_end_date'] = non_excl_end_date.apply(non_exclusive_end_date, axis=1)
-    avails_df = avails_df.reset_index().groupby(['title', 'group', 'country_name'])[['exclusive', 'non-exclusive', 'acq_expires', 'non-exclusive_end_date']].max()
-
-    # Replace the exclusive and non-exclusive columns of avails_df where the boolean condition 
-    # avails_df['acq_expires'] - avails_df['exclusive'] < pd.Timedelta(26, 'W') is True with NaT
-    avails_df.loc[avails_df['acq_expires'] - avails_df['exclusive'] < pd.Timedelta(26, 'W'), 'exclusive'] = pd.NaT
-    avails_df.loc[avails_df['acq_expires'] - avails_df['non-exclusive'] < pd.Timedelta(26, 'W'), 'non-exclusive'] = pd.NaT
-
-    # Drop the last column of st_date_non_excl
-    non_exclusive_dates = st_date_non_excl.drop(st_date_non_excl.columns[-1], axis=1).max(axis=1)
-
-    # name the non_exclusive_dates series as 'non-exclusive'
-    non_exclusive_dates.name = 'non-exclusive'
-
-    # Create a non_exclusive_dates dataframe with the 'non-exclusive' column and a 'non-exclusive_end_date' column with NaT values
-    non_exclusive_dates = pd.DataFrame(non_exclusive_dates)
-    non_exclusive_dates['non-exclusive_end_date'] = pd.NaT
-
-    # Group the non_exclusive_dates dataframe by 'title', 'group', and 'country_name' and aggregate the maximum value
-    non_exclusive_dates = non_exclusive_dates.groupby(['title', 'group', 'country_name']).max()
-
-    # Replace the non-exclusive and non-exclusive_end_date columns of avails_df where the boolean condition 
-    # avails_df['non-exclusive_end_date'] - avails_df['non-exclusive'] < pd.Timedelta(26, 'W') is True 
-    # with the corresponding values of the non_exclusive_dates series where the index matches
-    avails_df.loc[avails_df['non-exclusive_end_date'] - avails_df['non-exclusive'] < pd.Timedelta(26, 'W'), ['non-exclusive', 'non-exclusive_end_date']] = non_exclusive_dates
-
-    # Drop rows with all NaT values
-    avails_df.dropna(subset=['exclusive', 'non-exclusive'], how='all', inplace=True)
-
-    # Create a slice of avails_df with the 'Premium Pay TV (Local)' and 'Premium Pay TV (Pan Regional)' rights
-    latam_ptv_slice = avails_df.loc[
-        pd.IndexSlice[:, ['Premium Pay TV (Local)', 'Premium Pay TV (Pan Regional)'], latam_countries],
-        ['exclusive', 'non-exclusive']
-    ]
-
-    # Group the latam_ptv_slice dataframe by 'title' and aggregate the maximum value
-    max_latam_ptv_dates = latam_ptv_slice.reset_index().groupby(['title'])[['exclusive', 'non-exclusive']].max()
-    latam_pan_ptv_slice = avails_df.loc[
-        pd.IndexSlice[:, 'Premium Pay TV (Pan Regional)', latam_countries],
-        ['exclusive', 'non-exclusive']
-    ]
-
-    # Merge the exclusive and non-exclusive columns of a slice of avails_df with max_latam_ptv_dates by title
-    latam_pan_ptv_slice = latam_pan_ptv_slice.merge(
-        max_latam_ptv_dates,
-        how='inner',
-        left_index=True,
-        right_index=True,
-        suffixes=('_prev', '')
-    )
-    latam_pan_ptv_slice.drop(['exclusive_prev', 'non-exclusive_prev'], axis=1, inplace=True)
-
-    # Replace the exclusive and non-exclusive columns of avails_df with the latam_pan_ptv_slice
-    avails_df.loc[
-        pd.IndexSlice[:, 'Premium Pay TV (Pan Regional)', latam_countries],
-        ['exclusive', 'non-exclusive']
-    ] = latam_pan_ptv_slice
-
-    # Create a slice of avails_df with the 'Basic Pay TV (Local)' and 'Basic Pay TV (Pan Regional)' rights
-    latam_bptv_slice = avails_df.loc[
-        pd.IndexSlice[:, ['Basic Pay TV (Local)', 'Basic Pay TV (Pan Regional)'], latam_countries],
-        ['exclusive', 'non-exclusive']
-    ]
-
-    # Group the latam_bptv_slice dataframe by 'title' and aggregate the maximum value
-    max_latam_bptv_dates = latam_bptv_slice.reset_index().groupby(['title'])[['exclusive', 'non-exclusive']].max()
-    
-    # Create a slice of avails_df with the 'Basic Pay TV (Pan Regional)' rights
-    latam_pan_bptv_slice = avails_df.loc[
-        pd.IndexSlice[:, 'Basic Pay TV (Pan Regional)', latam_countries],
-        ['exclusive', 'non-exclusive']
-    ]
-
-    # Merge the exclusive and non-exclusive columns of a slice of avails_df with max_latam_bptv_dates by title
-    latam_pan_bptv_slice = latam_pan_bptv_slice.merge(
-        max_latam_bptv_dates,
-        how='left',
-        left_index=True,
-        right_index=True,
-        suffixes=('_prev', '')
-    )
-    latam_pan_bptv_slice.drop(['exclusive_prev', 'non-exclusive_prev'], axis=1, inplace=True)
-
-    # Replace the exclusive and non-exclusive columns of avails_df with the latam_pan_bptv_slice
-    avails_df.loc[
-        pd.IndexSlice[:, 'Basic Pay TV (Pan Regional)', latam_countries],
-        ['exclusive', 'non-exclusive']
-    ] = latam_pan_bptv_slice
-
-    useful_rights = [
-        'SVOD', 
-        'Premium Pay TV (Pan Regional)',
-        'Premium Pay TV (Local)',
-        'Basic Pay TV (Pan Regional)', 
-        'Basic Pay TV (Local)', 
-        'AVOD', 
-    ]
-
-    # Create a slice of avails_df with the useful_rights
-    avails_redux = avails_df.loc[pd.IndexSlice[:,useful_rights,:,:,:]]
-    
-    # Join the avails_redux dataframe with the sales_activity dataframe
-    avails_redux = avails_redux.join(sales_activity, how='left')
-    avails_redux.reset_index(inplace=True)
-
-    # Create a 'first_run_status' column in avails_redux with the value 'First Run' if all the values in the sales_cols are NaN, otherwise 'Library'
-    avails_redux['first_run_status'] = avails_redux[sales_cols].isna().all(axis=1).map({True: 'First Run', False: 'Library'})
-
-    # Group the avails_redux dataframe by 'title', 'group', and 'country_name' and aggregate the 'first_run_status' column as a set
-    status_df = avails_redux.groupby(['title', 'group', 'country_name'])['first_run_status'].apply(set)
-
-    # Replace sets with length greater than 1 with a singleton set containing 'Library'
-    status_df = status_df.apply(lambda x: {'Library'} if len(x) > 1 else x)
-
-    # Convert sets to strings
-    status_df = status_df.apply(lambda x: ''.join(x))
-
-    # Convert the 'first_run_status' column of status_df to a dataframe
-    status_df = status_df.to_frame()
-
-    # Unstack the status_df dataframe by the 'group' column
-    status_df.columns = ['first_run_status']
-    status_df = status_df.unstack('group')
-
-    # delete the multiindex
-    status_df.columns = status_df.columns.droplevel()
-    
-    # if Basic Pay TV (Local) is Library, then set Basic Pay TV (Pan Regional) to Library and vice versa
-    status_df.loc[status_df['Basic Pay TV (Pan Regional)'] == 'Library', 'Basic Pay TV (Local)'] = 'Library'
-    status_df.loc[status_df['Basic Pay TV (Local)'] == 'Library', 'Basic Pay TV (Pan Regional)'] = 'Library'
-
-    # if Premium Pay TV (Local) is Library, then set Premium Pay TV (Pan Regional) to Library and vice versa
-    status_df.loc[status_df['Premium Pay TV (Pan Regional)'] == 'Library', 'Premium Pay TV (Local)'] = 'Library'
-    status_df.loc[status_df['Premium Pay TV (Local)'] == 'Library', 'Premium Pay TV (Pan Regional)'] = 'Library'
-
-    # if Basic Pay TV (Local) is Library, then set Premium Pay TV (Local) and Premium Pay TV (Pan Regional) to Library
-    status_df.loc[status_df['Basic Pay TV (Local)'] == 'Library', 'Premium Pay TV (Local)'] = 'Library'
-    status_df.loc[status_df['Basic Pay TV (Local)'] == 'Library', 'Premium Pay TV (Pan Regional)'] = 'Library'
-
-    # if SVOD is Library, then set Premium Pay TV (Local) and Premium Pay TV (Pan Regional) to Library
-    status_df.loc[status_df['SVOD'] == 'Library', 'Premium Pay TV (Local)'] = 'Library'
-    status_df.loc[status_df['SVOD'] == 'Library', 'Premium Pay TV (Pan Regional)'] = 'Library'
-
-    # stack group back to columns
-    status_df = status_df.stack('group')
-
-    # name the status_df series 'first_run_status'
-    status_df.name = 'first_run_status'
-
-    status_df = status_df.reset_index()
-
-    # Merge the status_df dataframe with the avails_redux dataframe
-    avails_redux = avails_redux.merge(status_df, how='left', on=['title', 'group', 'country_name'], suffixes=('_2drop', ''))
-    avails_redux = avails_redux.drop(columns=['first_run_status_2drop'])
-
-    # Group the avails_redux dataframe by 'title', 'group', 'exclusive', and 'non-exclusive' and aggregate the 'right_name', 
-    # 'country_name', and 'first_run_status' columns as a set
-    groupby_cols = [
-            'title', 
-            'group', 
-            'exclusive', 
-            'non-exclusive',
-    ]
-    agg_cols = [
-        'right_name', 
-        'country_name',
-        'first_run_status'
-    ]
-    agg_dict = {ag_col:set for ag_col in agg_cols}
-    other_cols = [col for col in avails_redux.columns if (not col in groupby_cols) and (not col in agg_cols)]
-    apply_funcs = {**agg_dict, **{col:'first' for col in other_cols}}
-
-    # Aggregate the avails_redux dataframe: output_audit
-    output_audit = avails_redux.groupby(groupby_cols, dropna=False)[agg_cols+other_cols].agg(apply_funcs)
-    output_audit['first_run_status'] = output_audit['first_run_status'].apply(lambda x: {'Library'} if len(x) > 1 else x)
-    output_audit['first_run_status'] = output_audit['first_run_status'].apply(lambda x: ''.join(x))
-    output_audit.reset_index(inplace=True)
-
-    # Check if countries_to_check is a subset of the countries in each row
-    output_audit['avails_region'] = output_audit['country_name'].apply(avails_region)
-    output_audit = output_audit.loc[output_audit['avails_region'].apply(lambda x: len(x) > 0)]
-
-    for col in output_audit.select_dtypes(include=['object']).columns:
-        output_audit[col] = output_audit[col].apply(clean_str)
-
-    other_cols = [col for col in output_audit.columns if col not in sales_cols]
-
-    # Merge the output_audit dataframe with the titles dataframe
-    output_audit = output_audit.merge(
-        titles.reset_index(),
-        how='inner',
-        on='title'
-    )
-    output_audit.drop('title', axis=1, inplace=True)
-    output_audit.rename(columns={'name':'title'}, inplace=True)
-    output_audit.columns = [
-        '_'.join(col) if col[0] != '' and type(col) != str else col for col in output_audit.columns
-    ]
-
-    # format 'year_completed' column as an integer
-    output_audit['year_completed'] = output_audit['year_completed'].apply(lambda x: int(x))
-
-    # sort values of output_audit by year_completed in descending order
-    output_audit.sort_values('year_completed', ascending=False, inplace=True)
-
-    # define the columns to be formatted as dates
-    date_cols = [
-        'non-exclusive',
-        'exclusive',
-        'non-exclusive_end_date',
-        'acq_expires'
-    ]
-
+    return windows_df
+
+def audit_columns(sales_cols):
+    """
+    Columns of the avails audit workbook.
+
+    Params
+    ------
+    sales_cols : list
+        the sales activity columns, (distributor, license_type) pairs
+
+    Returns
+    -------
+    dict
+        Returns the audit column names, keyed by the column names of the audit rows.
+    """
     sales_cols = [
         '_'.join(col) for col in sales_cols
     ]
@@ -496,53 +152,579 @@ def avails_process():
 
     # Swap the keys and values of col_dict
     col_dict = {v: k for k, v in col_dict.items()}
-
-    # format the date columns and sales columns as dates. If the value is NaT, then do not format it
-    for col in date_cols + sales_cols:
-        output_audit[col] = output_audit[col].apply(
-            lambda x: pd.to_datetime(x, errors='coerce').date() if x != 'NaT' else x
+    return col_dict
+
+def title_status(rights):
+    """
+    Compute the first run status of every (title, rights group, country) a title
+    has windows in.
+
+    A title is 'Library' where it was sold, and the pay TV rules below carry the
+    status across the rights groups of a country. The status only depends on the
+    windows of the title, not on the avails of the day, so it is computed once per
+    title and cached.
+
+    Params
+    ------
+    rights : pandas.Series
+        whether the title was sold, a boolean indexed by ('title', 'group',
+        'country_name') for every rights group of USEFUL_RIGHTS the title has
+        windows in
+
+    Returns
+    -------
+    pandas.DataFrame
+        Returns the 'group', 'country_name' and 'first_run_status' columns,
+        indexed by title, in title order.
+    """
+    if rights.empty:
+        return pd.DataFrame(
+            columns=['group', 'country_name', 'first_run_status'], index=pd.Index([], name='title')
         )
+    status_df = rights.map({True: 'Library', False: 'First Run'})
+
+    # Convert the 'first_run_status' column of status_df to a dataframe
+    status_df = status_df.to_frame()
+
+    # Unstack the status_df dataframe by the 'group' column
+    status_df.columns = ['first_run_status']
+    status_df = status_df.unstack('group')
+
+    # delete the multiindex
+    status_df.columns = status_df.columns.droplevel()
+
+    # A title may not have every rights group
+    status_df = status_df.reindex(columns=status_df.columns.union(USEFUL_RIGHTS, sort=False))
+    
+    # if Basic Pay TV (Local) is Library, then set Basic Pay TV (Pan Regional) to Library and vice versa
+    status_df.loc[status_df['Basic Pay TV (Pan Regional)'] == 'Library', 'Basic Pay TV (Local)'] = 'Library'
+    status_df.loc[status_df['Basic Pay TV (Local)'] == 'Library', 'Basic Pay TV (Pan Regional)'] = 'Library'
+
+    # if Premium Pay TV (Local) is Library, then set Premium Pay TV (Pan Regional) to Library and vice versa
+    status_df.loc[status_df['Premium Pay TV (Pan Regional)'] == 'Library', 'Premium Pay TV (Local)'] = 'Library'
+    status_df.loc[status_df['Premium Pay TV (Local)'] == 'Library', 'Premium Pay TV (Pan Regional)'] = 'Library'
+
+    # if Basic Pay TV (Local) is Library, then set Premium Pay TV (Local) and Premium Pay TV (Pan Regional) to Library
+    status_df.loc[status_df['Basic Pay TV (Local)'] == 'Library', 'Premium Pay TV (Local)'] = 'Library'
+    status_df.loc[status_df['Basic Pay TV (Local)'] == 'Library', 'Premium Pay TV (Pan Regional)'] = 'Library'
+
+    # if SVOD is Library, then set Premium Pay TV (Local) and Premium Pay TV (Pan Regional) to Library
+    status_df.loc[status_df['SVOD'] == 'Library', 'Premium Pay TV (Local)'] = 'Library'
+    status_df.loc[status_df['SVOD'] == 'Library', 'Premium Pay TV (Pan Regional)'] = 'Library'
+
+    # stack group back to columns
+    status_df = status_df.stack('group')
+
+    # name the status_df series 'first_run_status'
+    status_df.name = 'first_run_status'
+
+    status_df = status_df.reset_index(['group', 'country_name'])
+    return status_df.sort_index(kind='mergesort')
+
+def title_metadata(titles):
+    """
+    Prepare the metadata and talent of the titles for the audit rows.
+
+    Params
+    ------
+    titles : pandas.DataFrame
+        the title metadata and talent, indexed by title
+
+    Returns
+    -------
+    pandas.DataFrame
+        Returns the metadata indexed by title, in title order.
+    """
+    metadata = titles.copy()
+
+    # format 'year_completed' column as an integer
+    metadata['year_completed'] = metadata['year_completed'].apply(lambda x: int(x))
+    return metadata.sort_index(kind='mergesort')
+
+def title_results(rights, titles):
+    """
+    Compute the per-title results of the avails that do not depend on the date:
+    the first run status and the metadata of the titles.
+
+    Params
+    ------
+    rights : pandas.Series
+        the input of `title_status`
+    titles : pandas.DataFrame
+        the title metadata and talent, indexed by title
+
+    Returns
+    -------
+    dict
+        Returns the `title_status` as 'status' and the `title_metadata` as
+        'metadata', both indexed by title.
+    """
+    return {
+        'status': title_status(rights),
+        'metadata': title_metadata(titles),
+    }
+
+def _title_shard(job):
+    # Runs in a worker process
+    return title_results(*job)
+
+def title_results_sharded(rights, titles, shards):
+    """
+    Run `title_results` on shards of the titles in a process pool.
+
+    The titles are hash-partitioned into `shards` shards, one per worker process,
+    and the results of the shards are merged back in title order, the order
+    `title_results` returns them in. The results are those of a single call.
+
+    Params
+    ------
+    rights, titles
+        the arguments of `title_results`
+    shards : int
+        number of shards and worker processes
+
+    Returns
+    -------
+    dict
+        Returns the 'status' and 'metadata' of the titles, indexed by title.
+    """
+    rights_shard = pd.util.hash_array(rights.index.get_level_values('title').to_numpy()) % shards
+    titles_shard = pd.util.hash_array(titles.index.to_numpy()) % shards
+    jobs = [
+        (rights.loc[rights_shard == i], titles.loc[titles_shard == i])
+        for i in range(shards)
+    ]
+    with ProcessPoolExecutor(max_workers=len(jobs)) as executor:
+        results = list(executor.map(_title_shard, jobs))
+    return {
+        name: concat_rows([result[name] for result in results]).sort_index(kind='mergesort')
+        for name in results[0]
+    }
+
+def audit_rows(avails_redux, metadata, regions, col_dict):
+    """
+    Compute the audit rows of the avails: one row per title, rights group and
+    avails dates, with its rights, countries, region and metadata.
+
+    The rows are grouped on the avails dates, which depend on the date of the run,
+    so they are computed for every title in one vectorized pass.
+
+    Params
+    ------
+    avails_redux : pandas.DataFrame
+        avails of the USEFUL_RIGHTS joined with the sales activity and the first
+        run status, one row per (title, group, right_name, country_name)
+    metadata : pandas.DataFrame
+        the `title_metadata` of the titles
+    regions : dict
+        the output of `regions.compile_regions`
+    col_dict : dict
+        the output of `audit_columns`
+
+    Returns
+    -------
+    pandas.DataFrame
+        Returns the audit rows indexed by title, in title order, with the columns
+        renamed by `col_dict`.
+    """
+    # Group the avails_redux dataframe by 'title', 'group', 'exclusive', and 'non-exclusive'. The 'right_name',
+    # 'country_name' and 'first_run_status' of each group are aggregated as bitmasks over integer codes
+    groupby_cols = [
+            'title', 
+            'group', 
+            'exclusive', 
+            'non-exclusive',
+    ]
+    agg_cols = [
+        'right_name', 
+        'country_name',
+        'first_run_status'
+    ]
+    other_cols = [col for col in avails_redux.columns if (not col in groupby_cols) and (not col in agg_cols)]
+
+    # Aggregate the avails_redux dataframe: output_audit
+    grouped = avails_redux.groupby(groupby_cols, dropna=False)
+    group_ids = grouped.ngroup().to_numpy()
+    output_audit = grouped[other_cols].first()
+    n_groups = output_audit.shape[0]
+
+    # A group is 'Library' when any of its rows is 'Library'
+    library = np.bincount(
+        group_ids, weights=(avails_redux['first_run_status'] == 'Library').to_numpy(), minlength=n_groups
+    ) > 0
+    output_audit.insert(0, 'first_run_status', np.where(library, 'Library', 'First Run').astype(object))
+
+    # The rights of each group, as bitmasks over the codes of the sorted right names
+    right_codes, right_names = pd.factorize(avails_redux['right_name'], sort=True)
+    right_masks = country_bitmasks(group_ids, right_codes, n_groups, len(right_names) // 64 + 1)
+    output_audit.insert(0, 'country_name', None)
+    output_audit.insert(0, 'right_name', bitmask_names(right_masks, dict(enumerate(right_names))))
+    output_audit.reset_index(inplace=True)
+
+    # Classify the countries of each row into a region, using bitmasks over the country ids
+    country_masks = country_bitmasks(
+        group_ids,
+        avails_redux['country_name'].map(regions['country_ids']),
+        n_groups,
+        regions['n_words']
+    )
+    country_names = {country_id: name for name, country_id in regions['country_ids'].items()}
+    output_audit['country_name'] = bitmask_names(country_masks, country_names)
+    region_labels, region_counts = classify_regions(country_masks, regions)
+    output_audit['avails_region'] = region_labels
+
+    # Rows that fit no region keep their countries, without the Caribbean and the dependencies
+    unclassified = pd.isna(region_labels)
+    output_audit.loc[unclassified, 'avails_region'] = bitmask_names(
+        country_masks[unclassified] & ~regions['excluded'], country_names
+    )
+    output_audit = output_audit.loc[region_counts > 0]
+
+    for col in output_audit.select_dtypes(include=['object']).columns:
+        output_audit[col] = render_values(output_audit[col])
+
+    # Merge the output_audit dataframe with the title metadata
+    output_audit = output_audit.merge(
+        metadata,
+        how='inner',
+        left_on='title',
+        right_index=True
+    )
+
+    # Index the rows by title
+    output_audit.set_index('title', inplace=True)
+    output_audit.index.name = 'title_id'
+    output_audit.rename(columns={'name':'title'}, inplace=True)
+    output_audit.columns = [
+        '_'.join(col) if col[0] != '' and type(col) != str else col for col in output_audit.columns
+    ]
+
+    # The date and sales columns stay datetime64, they are rendered once at export
 
     # Rename the columns of output_audit using col_dict
     output_audit.rename(columns=col_dict, inplace=True)
 
+    return output_audit
+
+def month_ends(periods=12, start=None):
+    """The next `periods` month-ends from `start`, defaults to today."""
+    start = pd.Timestamp('today') if start is None else pd.Timestamp(start)
+    return list(pd.date_range(start.normalize(), periods=periods, freq='M'))
+
+def avails_by_date(as_of_dates, app_dir=None, data_dir=None, output_dir=None, report=None):
+    """
+    Compute the avails as of several dates and export them as a long table to
+    'avails_by_date.xlsx', one row per (as-of date, title, rights group, country).
+
+    The windows are read and reduced once, and the avails of every date are
+    computed in one pass over the reduced windows by `engine.evaluate_windows_batch`.
+
+    Params
+    ------
+    as_of_dates : list
+        the dates the avails are computed for, e.g. `month_ends(12)`
+    app_dir : str
+        directory with the 'data' and 'avails' directories, defaults to `get_app_dir()`
+    data_dir : str
+        directory with the 'tables' written by `process_data`, defaults to `app_dir`/data
+    output_dir : str
+        directory the table is written to, defaults to `app_dir`/avails
+    report : instrument.RunReport
+        report the stages are recorded in. It is saved to `output_dir`/run_report.json
+
+    Returns
+    -------
+    pandas.DataFrame
+        Returns the long table, sorted by as-of date.
+    """
+    print('Processing avails by date...')
+
+    if app_dir is None:
+        app_dir = get_app_dir()
+    if data_dir is None:
+        data_dir = os.path.join(app_dir, 'data')
+    if output_dir is None:
+        output_dir = os.path.join(app_dir, 'avails')
+    if report is None:
+        report = RunReport()
+
+    report.start('read tables')
+    tables_dir = os.path.join(data_dir, 'tables')
+    windows_df = read_windows(tables_dir)
+    titles = read_table(tables_dir, 'titles', columns=['name', 'original_format'])
+    report.end(rows=windows_df.shape[0])
+
+    report.start('window matrix')
+    window_table = build_window_table(windows_df)
+    report.end(rows=window_table.shape[0])
+
+    report.start('exclusivity')
+    avails_df = group_avails(evaluate_windows_batch(window_table, as_of_dates))
+
+    # The Latam pay TV rules compare the avails of a title as of the same date
+    avails_df = apply_rules(avails_df, PAY_TV_RULES)
+    report.end(rows=avails_df.shape[0])
+
+    report.start('export')
+    # Filter titles for 'SD Tape' and 'SD File' in the 'original_format' column
+    titles = titles.loc[~titles['original_format'].isin(['SD Tape', 'SD File'])]
+    avails_df = avails_df.reset_index()
+    avails_df = avails_df.merge(titles[['name']], left_on='title', right_index=True, how='inner')
+    avails_df = avails_df[[
+        'as_of',
+        'name',
+        'group',
+        'country_name',
+        'exclusive',
+        'non-exclusive',
+        'non-exclusive_end_date',
+        'acq_expires',
+    ]].sort_values(['as_of', 'name', 'group', 'country_name'])
+    avails_df.columns = [
+        'As Of',
+        'Title',
+        'Rights Group',
+        'Country Name',
+        'Exclusive Start Date',
+        'Non-Exclusive Start Date',
+        'Non-Exclusive End Date',
+        'Acq Expires',
+    ]
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    write_workbook(
+        os.path.join(output_dir, 'avails_by_date.xlsx'),
+        [('Avails', avails_df)],
+        date_columns=[0, 4, 5, 6, 7]
+    )
+    report.end(rows=avails_df.shape[0])
+
+    report.save(report_path(output_dir))
+    return avails_df
+
+def avails_process(workers=None, free_tv_files=False, app_dir=None, data_dir=None, output_dir=None, report=None, as_of=None,
+                   use_cache=True):
+    """
+    Compute the avails from the stored tables and export them to the 'avails' directory.
+
+    Params
+    ------
+    workers : int
+        number of processes computing the first run status and metadata of the
+        titles, sharded by title, and writing the Free TV workbooks, defaults to the number of CPUs
+    free_tv_files : bool
+        whether to also write one Free TV workbook per country to 'avails/free_tv'
+    app_dir : str
+        directory with the 'data' and 'avails' directories, defaults to `get_app_dir()`
+    data_dir : str
+        directory with the 'tables' written by `process_data`, defaults to `app_dir`/data
+    output_dir : str
+        directory the avails are written to, defaults to `app_dir`/avails
+    report : instrument.RunReport
+        report the stages are recorded in, e.g. the one of `process_data`. It is
+        saved to `output_dir`/run_report.json
+    as_of : pandas.Timestamp
+        the date the avails are computed for, defaults to now
+    use_cache : bool
+        whether to reuse the first run status and metadata of the titles whose
+        windows, contracts and metadata did not change since the last run, stored
+        in `data_dir`/cache. They do not depend on `as_of`
+    """
+    print('Processing avails...')
+
+    if app_dir is None:
+        app_dir = get_app_dir()
+    if data_dir is None:
+        data_dir = os.path.join(app_dir, 'data')
+    if output_dir is None:
+        output_dir = os.path.join(app_dir, 'avails')
+    if report is None:
+        report = RunReport()
+
+    # Load the columns used below from the table store
+    report.start('read tables')
+    tables_dir = os.path.join(data_dir, 'tables')
+    windows_df = read_windows(tables_dir)
+    titles = read_table(tables_dir, 'titles')
+    roles = read_table(tables_dir, 'roles', columns=['title', 'role', 'person'])
+    people = read_table(tables_dir, 'people', columns=['person', 'name'])
+    report.end(rows=windows_df.shape[0])
+    
+    report.start('window matrix')
+
+    # Filter titles for 'SD Tape' and 'SD File' in the 'original_format' column
+    titles = titles.loc[
+        ~(titles['original_format'].isin(['SD Tape', 'SD File']))
+        ]
+
+    # Create a talent dataframe by merging the roles and people dataframes
+    talent = pd.merge(
+        roles[['title', 'role', 'person']], 
+        people[['person', 'name']],
+        on='person', 
+        how='inner'
+    )
+
+    # Group the talent dataframe by 'title' and 'role' and aggregate the 'name' column as a list
+    talent_list = talent.groupby(['title', 'role'])[['name']].agg({'name':list})
+    talent_list = talent_list.unstack(1)
+    talent_list.columns = [role.lower() for _, role in talent_list.columns]
+
+    # Merge the titles dataframe with the talent_list dataframe
+    titles = titles.join(
+        talent_list, 
+        how='left',
+    )
+
+    # Create a sales_activity dataframe by filtering the windows_df dataframe for 'Sales' and 'Holdback' in the 'contract_type' and 'license_type' columns respectively
+    sales_activity = windows_df.loc(axis=0)[
+        (windows_df['contract_type'] == 'Sales') &
+        (windows_df['license_type'] != 'Holdback')
+    ]
+
+    # Group the sales_activity dataframe by 'title', 'group', 'right_name', 'country_name', 'license_type', and 'distributor' and aggregate the 'end_date' column as the maximum value
+    sales_activity = sales_activity.groupby([
+        'title',
+        'group',
+        'right_name',
+        'country_name',
+        'license_type', 
+        'distributor'
+    ], dropna=False, observed=True)['end_date'].max()
+    # Sorted on the names, as a groupby on plain names would be
+    sales_activity.index = decode_levels(sales_activity.index)
+    sales_activity = sales_activity.sort_index()
+
+    # Unstack the sales_activity dataframe by the last two levels
+    sales_activity = sales_activity.unstack(level=[-1, -2])
+
+    # Drop rows with all NaN values
+    sales_activity = sales_activity[~sales_activity.isna().all(axis=1)]
+    sales_cols = sales_activity.columns
+    
+    # sort sales_cols alphabetically
+    sales_cols = sorted(sales_cols, key=lambda x: x[0])
+    sales_activity = sales_activity[sales_cols]
+
+    # Reduce the windows to the latest start and end date of each contract and license type
+    window_table = build_window_table(windows_df)
+    report.end(rows=window_table.shape[0])
+
+    # Compute the exclusive and non-exclusive avails of each title, rights group and country
+    report.start('exclusivity')
+    avails_df = group_avails(evaluate_windows(window_table, as_of=as_of))
+
+    # Latam Pan Regional pay TV avails start after the local ones, see rules.PAY_TV_RULES
+    avails_df = apply_rules(avails_df, PAY_TV_RULES)
+
+    report.end(rows=avails_df.shape[0])
+
+    report.start('status rules')
+
+    # Create a slice of avails_df with the useful rights
+    avails_redux = avails_df.loc[pd.IndexSlice[:,USEFUL_RIGHTS,:,:,:]]
+    
+    # Join the avails_redux dataframe with the sales_activity dataframe
+    avails_redux = avails_redux.join(sales_activity, how='left')
+    avails_redux.reset_index(inplace=True)
+
+    col_dict = audit_columns(sales_cols)
+    regions = compile_regions(dict(zip(windows_df['country_name'], windows_df['country'])))
+
+    # Whether each title was sold in each rights group and country it has windows in
+    title_windows = windows_df.loc[windows_df['title'].isin(titles.index)]
+    useful_windows = title_windows.loc[title_windows['group'].isin(USEFUL_RIGHTS)]
+    rights = (
+        (useful_windows['contract_type'] == 'Sales') &
+        (useful_windows['license_type'] != 'Holdback') &
+        useful_windows['end_date'].notna()
+    ).groupby([
+        useful_windows['title'],
+        useful_windows['group'],
+        useful_windows['country_name'],
+    ], observed=True).any()
+    rights.index = decode_levels(rights.index)
+
+    def compute_titles(title_ids):
+        title_rights = rights.loc[rights.index.get_level_values('title').isin(title_ids)]
+        metadata = titles.loc[titles.index.isin(title_ids)]
+
+        # Large runs are sharded by title across worker processes
+        shards = min(workers or os.cpu_count() or 1, -(-len(title_ids) // SHARD_MIN_TITLES))
+        if shards > 1:
+            return title_results_sharded(title_rights, metadata, shards)
+        return title_results(title_rights, metadata)
+
+    # The first run status and the metadata of a title only depend on its windows,
+    # their contracts and its metadata, not on the date. With the cache, only the
+    # titles whose inputs changed since the last run are recomputed
+    cache_counts = None
+    if use_cache:
+        title_cache = TitleCache(
+            os.path.join(data_dir, 'cache', 'avails_titles.pkl'),
+            cache_key('avails titles', USEFUL_RIGHTS, list(titles.columns))
+        )
+        digests = title_digests({'windows': title_windows, 'titles': titles.reset_index()})
+        results = title_cache.update(digests, compute_titles)
+        title_cache.save()
+        cache_counts = {'cache_hits': title_cache.hits, 'cache_misses': title_cache.misses}
+        print(f'Avails cache: {title_cache.misses} titles recomputed, {title_cache.hits} reused')
+    else:
+        results = compute_titles(titles.index)
+
+    # No title was computed when there are no titles, e.g. when the SD filter leaves none
+    if not results:
+        results = title_results(rights.iloc[:0], titles.iloc[:0])
+
+    # The status of the rights without sales activity that no rule changed is 'First Run'
+    avails_redux = avails_redux.merge(
+        results['status'].reset_index(),
+        how='left',
+        on=['title', 'group', 'country_name']
+    )
+    avails_redux['first_run_status'] = avails_redux['first_run_status'].fillna('First Run')
+
+    report.end(rows=avails_redux.shape[0], counts=cache_counts)
+
+    # The audit rows group the avails on their dates, they are computed every run
+    report.start('audit')
+    if avails_redux.empty:
+        # The audit rows of no title
+        output_audit = pd.DataFrame(
+            columns=list(col_dict.values()) + ['country_of_origin'],
+            index=pd.Index([], name='title_id')
+        )
+    else:
+        output_audit = audit_rows(avails_redux, results['metadata'], regions, col_dict)
+
+    # sort values of output_audit by year in descending order
+    output_audit.sort_values('Year', ascending=False, inplace=True)
+
+    sales_cols = [
+        '_'.join(col) for col in sales_cols
+    ]
+
     # get the values of col_dict as a list
     col_list = list(col_dict.values())
 
+    report.end(rows=output_audit.shape[0])
+
+    report.start('export')
+
     # Create an 'avails' directory if it does not exist
-    if not os.path.exists(os.path.join(app_dir, 'avails')):
-        os.makedirs(os.path.join(app_dir, 'avails'))
-
-    # Export output_audit[col_list] to excel and format the columns
-    output_audit[col_list].dropna(axis=1, how='all').to_excel(os.path.join(app_dir, 'avails', 'avails_audit.xlsx'), index=False)
-
-    # Format the excel sheet
-    wb2 = load_workbook(os.path.join(app_dir, 'avails', 'avails_audit.xlsx'))
-    ws2 = wb2.active    
-    ws2.auto_filter.ref = ws2.dimensions
-    ws2.freeze_panes = ws2['C2']
-    for col in ws2.iter_cols(min_col=1):
-        for cell in col:
-            ws2.column_dimensions[cell.column_letter].width = 30
-            if cell.column_letter in ['G', 'H', 'I', 'J']:
-                cell.number_format = 'YYYY-MM-DD'
-    for row in ws2.iter_rows(min_row=1):
-        for cell in row:
-            cell.font = Font(size=11)
-            cell.alignment = Alignment(wrap_text=True)
-            ws2.row_dimensions[cell.row].height = 50
-    for row in ws2.iter_rows(min_row=1, max_row=1):
-        for cell in row:
-            cell.font = Font(bold=True)
-            cell.alignment = Alignment(horizontal='center')
-    for row in ws2.iter_rows(min_row=2, max_row=ws2.max_row):
-            for cell in row:
-                if cell.column_letter == 'A':
-                    cell.alignment = Alignment(horizontal='left')
-                    cell.font = Font(bold=True)
-
-    wb2.save(os.path.join(app_dir, 'avails', 'avails_audit.xlsx'))
-    wb2.close()
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    # Export output_audit[col_list] to excel, with the date columns G to J formatted as dates.
+    # The date and sales columns are written as dates, converted once per column
+    audit_sheet = output_audit[col_list].dropna(axis=1, how='all')
+    for col in audit_sheet.select_dtypes(include=['datetime']).columns:
+        audit_sheet[col] = audit_sheet[col].dt.date
+    write_workbook(
+        os.path.join(output_dir, 'avails_audit.xlsx'),
+        [('Sheet1', audit_sheet)],
+        date_columns=[6, 7, 8, 9]
+    )
 
     # Append the 'country_of_origin' column to col_list
     col_list.append('country_of_origin')
@@ -550,13 +732,8 @@ def avails_process():
     # Create a combined_df dataframe with the columns in col_list
     combined_df = output_audit[col_list].copy()
 
-    # convet the sales cols of output_audit to a dictionary and drop pd.NaT values
-    sales_dict_list = combined_df[sales_cols].to_dict(orient='records')
-    sales_dict_list = [
-        {k:str(v) for k, v in sales_dict.items() if type(v) != pd._libs.tslibs.nattype.NaTType} for sales_dict in sales_dict_list
-    ]
-    combined_df['Sales'] = sales_dict_list
-    combined_df['Sales'] = combined_df['Sales'].apply(clean_str)
+    # Summarize the sales dates of each row as 'distributor_license: date' pairs, column by column
+    combined_df['Sales'] = render_date_pairs(combined_df[sales_cols])
 
     # Group the combined_df dataframe by 'title' and 'region' and aggregate the minimum value of the 'acq_expires' column
     acq_expires = combined_df[['Title', 'Region', 'Acq_expires']].groupby(['Title', 'Region']).min()
@@ -603,9 +780,9 @@ def avails_process():
         right_index=True
     )
 
-    # clean the strings of the columns that are objects
-    for col in combined_unstacked.select_dtypes(include=['object']).columns:
-        combined_unstacked[col] = combined_unstacked[col].apply(clean_str)
+    # render the columns that are objects or dates as text
+    for col in combined_unstacked.select_dtypes(include=['object', 'datetime']).columns:
+        combined_unstacked[col] = render_values(combined_unstacked[col])
 
     combined_unstacked.reset_index(inplace=True)
 
@@ -694,53 +871,20 @@ def avails_process():
         'rating_venezuela'
     ]
 
-    # Export the combined_unstacked dataframe to excel and format the columns
-    combined_unstacked[cols_ordered].dropna(axis=1, how='all').to_excel(os.path.join(app_dir, 'avails', 'avails.xlsx'), index=False)
-
-    # Format the excel sheet
-    wb2 = load_workbook(os.path.join(app_dir, 'avails', 'avails.xlsx'))
-    ws2 = wb2.active
-
-    # Apply an autofilter to the first row of 'avails.xlsx'
-    ws2.auto_filter.ref = ws2.dimensions
-
-    # Format the height of the rows of 'avails.xlsx' to be higher 
-    for row in ws2.iter_rows(min_row=1):
-        for cell in row:
-            cell.alignment = Alignment(wrap_text=True)
-            cell.font = Font(size=11)
-            ws2.row_dimensions[cell.row].height = 50
-
-    # Format the width of the columns of 'avails.xlsx' to be wider
-    for col in ws2.iter_cols(min_col=1):
-        for cell in col:
-            ws2.column_dimensions[cell.column_letter].width = 30
-
-    for row in ws2.iter_rows(min_row=1, max_row=1):
-        for cell in row:
-            cell.font = Font(bold=True)
-            cell.alignment = Alignment(horizontal='center')
-
-    for row in ws2.iter_rows(min_row=2, max_row=ws2.max_row):
-        for cell in row:
-            if cell.column_letter == 'A':
-                cell.alignment = Alignment(horizontal='left')
-                cell.font = Font(bold=True)
-
-    # Freeze the first row of 'avails.xlsx'
-    ws2.freeze_panes = ws2['C2']
-
-    # Save the workbook
-    wb2.save(os.path.join(app_dir, 'avails', 'avails.xlsx'))
-    wb2.close()
+    # Export the combined_unstacked dataframe to excel and format the columns. The
+    # columns of a rights group no title has are empty and dropped with the others
+    write_workbook(
+        os.path.join(output_dir, 'avails.xlsx'),
+        [('Sheet1', combined_unstacked.reindex(columns=cols_ordered).dropna(axis=1, how='all'))]
+    )
 
     # Free TV avails
     free_tv_avails = avails_df.reset_index()
 
-    # Index slice avails_df where group is 'Free TV' and 'country_name' is in latam_countries
+    # Index slice avails_df where group is 'Free TV' and 'country_name' is in LATAM_COUNTRIES
     free_tv_avails = free_tv_avails.loc[
         (free_tv_avails['group'] == 'Free TV') &
-        (free_tv_avails['country_name'].isin(latam_countries + ['Dominican Republic', 'Puerto Rico'])),
+        (free_tv_avails['country_name'].isin(LATAM_COUNTRIES + ['Dominican Republic', 'Puerto Rico'])),
         ['title', 'country_name', 'group', 'exclusive', 'acq_expires']
     ].drop_duplicates()
 
@@ -855,49 +999,25 @@ def avails_process():
 
     # clean the strings of the columns that are objects
     for col in free_tv_avails.select_dtypes(include=['object']).columns:
-        free_tv_avails[col] = free_tv_avails[col].apply(clean_str)
-
-    # save free_tv_avails to an excel file, create one worksheet per country and name the worksheet with the country name
-    with pd.ExcelWriter(os.path.join(app_dir, 'avails', 'free_tv_avails.xlsx')) as writer:
-        for country in free_tv_avails['Country Name'].unique():
-            sheet_df = free_tv_avails.loc[free_tv_avails['Country Name'] == country, :].dropna(how='all', axis=1)
-            sheet_df.drop('Country Name', axis=1, inplace=True)
-            sheet_df.to_excel(writer, sheet_name=country, index=False)
-
-    # open the workbook object
-    wb3 = openpyxl.load_workbook(os.path.join(app_dir, 'avails', 'free_tv_avails.xlsx'))
-
-    # Format the date columns of each sheet of 'free_tv_avails.xlsx' to be in the format 'YYYY-MM-DD'
-    for sheet in wb3.sheetnames:
-        ws3 = wb3[sheet]
-        ws3.auto_filter.ref = ws3.dimensions
-        ws3.freeze_panes = ws3['C2']
-        for col in ws3.iter_cols(min_col=1):
-            for cell in col:
-                ws3.column_dimensions[cell.column_letter].width = 30
-                if cell.column_letter in ['D', 'E']:
-                    cell.number_format = 'YYYY-MM-DD'
-        for row in ws3.iter_rows(min_row=1):
-            for cell in row:
-                cell.font = Font(size=11)
-                cell.alignment = Alignment(wrap_text=True)
-                ws3.row_dimensions[cell.row].height = 50
-        for row in ws3.iter_rows(min_row=1, max_row=1):
-            for cell in row:
-                cell.font = Font(bold=True)
-                cell.alignment = Alignment(horizontal='center')
-        for row in ws3.iter_rows(min_row=2, max_row=ws3.max_row):
-            for cell in row:
-                if cell.column_letter == 'A':
-                    cell.alignment = Alignment(horizontal='left')
-                    cell.font = Font(bold=True)
-
-
-    # save the workbook object
-    wb3.save(os.path.join(app_dir, 'avails', 'free_tv_avails.xlsx'))
-
-    # close the workbook object
-    wb3.close()
+        free_tv_avails[col] = render_values(free_tv_avails[col])
+
+    # Split free_tv_avails by country once, in the order the countries first appear
+    free_tv_sheets = [
+        (country, sheet_df.dropna(how='all', axis=1).drop('Country Name', axis=1))
+        for country, sheet_df in free_tv_avails.groupby('Country Name', sort=False)
+    ]
+
+    # save free_tv_avails to an excel file with one worksheet per country, and optionally one file
+    # per country in avails/free_tv. The date columns D and E are formatted as dates
+    write_partitions(
+        os.path.join(output_dir, 'free_tv_avails.xlsx'),
+        free_tv_sheets,
+        date_columns=[3, 4],
+        partition_dir=os.path.join(output_dir, 'free_tv') if free_tv_files else None,
+        workers=workers
+    )
+    report.end(rows=output_audit.shape[0] + combined_unstacked.shape[0] + free_tv_avails.shape[0])
+    report.save(report_path(output_dir))
 
 if __name__ == '__main__':
     avails_process()
\ No newline at end of file
@@ -0,0 +1,633 @@
+import os
+import re
+import sys
+import subprocess
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import datetime
+import numpy as np
+import pandas as pd
+from utils import clean_date, clean_dates, render_values
+from engine import build_window_table, evaluate_windows, evaluate_windows_batch, group_avails
+from regions import (
+    LATAM_COUNTRIES,
+    LATAM_EX_MEX,
+    LATAM_EX_BRZ,
+    LATAM_EX_MEX_BRZ,
+    CARIBBEAN,
+    DEPENDENCIES,
+    WORLD,
+    compile_regions,
+    country_bitmasks,
+    classify_regions,
+)
+from rules import PAY_TV_RULES, apply_rules
+from excel import write_workbook
+from synthetic import generate
+from engine_reference import max_dates, non_exclusive_end_dates, window_matrix_avails, random_windows
+
+def _timeit(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def bench_clean_dates(n=1_000_000, seed=0):
+    """Time the per-cell `clean_date` apply against `clean_dates` on an `n` row column."""
+    rng = np.random.default_rng(seed)
+    days = rng.integers(0, 365 * 40, n)
+    values = (np.datetime64('1990-01-01', 'D') + days).astype('datetime64[ms]').astype(object)
+    # Blank cells and dates past pandas' datetime range, as found in the Open Windows export
+    values[rng.random(n) < 0.05] = np.nan
+    values[rng.random(n) < 0.001] = datetime.datetime(2999, 12, 31)
+    dates = pd.Series(values, dtype=object)
+
+    results = {}
+    for start_date in [True, False]:
+        old, old_time = _timeit(dates.apply, lambda x: clean_date(x, start_date=start_date))
+        new, new_time = _timeit(clean_dates, dates, start_date=start_date)
+        pd.testing.assert_series_equal(old, new)
+        results['start_date' if start_date else 'end_date'] = {
+            'rows': n,
+            'apply_seconds': old_time,
+            'vectorized_seconds': new_time,
+            'speedup': old_time / new_time,
+        }
+    return results
+
+def _clean_str(cell):
+    # The text cleaning that `utils.render_values` replaces
+    # Define the characters to remove
+    chars_to_remove = '[]{}\"\''
+
+    # Create a translation table that maps the unwanted characters to None
+    translation_table = str.maketrans('', '', chars_to_remove)
+
+    # Apply the translation table to the input string
+    new_cell = str(cell).translate(translation_table)
+    new_cell = new_cell.replace('None', '')
+    new_cell = new_cell.replace('nan', '')
+    new_cell = new_cell.replace('NaT', '')
+    return new_cell
+
+def bench_render_values(n=200_000, seed=0):
+    """
+    Time the per-cell `_clean_str` apply against `render_values` on `n` row columns
+    of the kinds found in the avails outputs. The names avoid the substrings
+    `_clean_str` removes, so that both give the same text.
+    """
+    rng = np.random.default_rng(seed)
+    names = np.array([f'Person {i}' for i in range(500)], dtype=object)
+    dates = [str(day) for day in pd.date_range('2020-01-01', periods=500).date]
+
+    def with_missing(values):
+        values = pd.Series(values, dtype=object)
+        values[rng.random(n) < 0.2] = np.nan
+        return values
+
+    columns = {
+        'strings': with_missing(names[rng.integers(0, len(names), n)]),
+        'lists': with_missing([list(names[rng.integers(0, len(names), k)]) for k in rng.integers(1, 4, n)]),
+        'dicts': pd.Series([
+            {f'Distributor {d}_License': dates[i] for d in range(k)}
+            for i, k in zip(rng.integers(0, len(dates), n), rng.integers(0, 4, n))
+        ], dtype=object),
+        'numbers': with_missing(rng.integers(60, 180, n).astype(float)),
+    }
+
+    results = {}
+    for name, values in columns.items():
+        old, old_time = _timeit(values.apply, _clean_str)
+        new, new_time = _timeit(render_values, values)
+        pd.testing.assert_series_equal(old, new, check_dtype=False)
+        results[name] = {
+            'rows': n,
+            'apply_seconds': old_time,
+            'vectorized_seconds': new_time,
+            'speedup': old_time / new_time,
+        }
+    return results
+
+def _random_dates(rng, n, missing=0.3):
+    days = rng.integers(-365 * 10, 365 * 10, n)
+    dates = pd.Series(pd.Timestamp('today').normalize() + pd.to_timedelta(days, unit='D'))
+    dates[rng.random(n) < missing] = pd.NaT
+    return dates
+
+def _max_date(row, today=None):
+    # The row-wise rules that the window matrix applied before `max_dates`
+    if today is None:
+        today = pd.to_datetime('today')
+    if today < row[('start_date', 'Sales', 'License')]:
+        # Exclude 'sales_start_date' and 'sales_end_date', and return max date
+        return max(row.drop([('start_date', 'Sales', 'License'), ('end_date', 'Sales', 'License')]))
+    else:
+        # Return max date of the entire row
+        return max(row)
+    
+def _non_exclusive_end_date(row):
+    sales_dates = [row.iloc[2], 
+                row.iloc[3]]
+    valid_dates = [
+        date for date in sales_dates if row.iloc[0] <= date <= row.iloc[1]
+    ]
+    
+    if valid_dates:
+        return min(valid_dates)
+    else:
+        return pd.NaT
+
+def bench_window_rules(n=100_000, seed=0):
+    """
+    Check `max_dates` and `non_exclusive_end_dates` against the row-wise `_max_date`
+    and `_non_exclusive_end_date` on a random window matrix of `n` rows, and time both.
+    """
+    rng = np.random.default_rng(seed)
+    st_date_non_excl = pd.DataFrame({
+        col: _random_dates(rng, n) for col in [
+            ('start_date',  'Acquisition',       'License'),
+            ('start_date',  'Acquisition', 'Non-Exclusive'),
+            (  'end_date',  'Acquisition',      'Holdback'),
+            (  'start_date', 'Sales',       'License'),
+            (  'end_date', 'Sales',       'License'),
+            (  'end_date', 'Sales',      'Holdback'),
+        ]
+    })
+    st_date_non_excl[('today', '', '')] = pd.Timestamp('today').date()
+    st_date_non_excl = st_date_non_excl.fillna(pd.Timestamp.min)
+
+    non_excl_end_date = pd.DataFrame({
+        'non-exclusive': _random_dates(rng, n, missing=0.1),
+        'acq_expires': _random_dates(rng, n, missing=0),
+        ('start_date', 'Sales', 'License'): _random_dates(rng, n),
+        ('start_date', 'Sales', 'Holdback'): _random_dates(rng, n),
+    })
+
+    results = {}
+    old, old_time = _timeit(st_date_non_excl.apply, _max_date, axis=1)
+    new, new_time = _timeit(max_dates, st_date_non_excl)
+    pd.testing.assert_series_equal(pd.to_datetime(old), new)
+    results['max_date'] = {'rows': n, 'apply_seconds': old_time, 'vectorized_seconds': new_time, 'speedup': old_time / new_time}
+
+    old, old_time = _timeit(non_excl_end_date.apply, _non_exclusive_end_date, axis=1)
+    new, new_time = _timeit(non_exclusive_end_dates, non_excl_end_date)
+    pd.testing.assert_series_equal(pd.to_datetime(old), new)
+    results['non_exclusive_end_date'] = {'rows': n, 'apply_seconds': old_time, 'vectorized_seconds': new_time, 'speedup': old_time / new_time}
+    return results
+
+def _compute_avails(windows_df, as_of=None):
+    # The engine stages chained, as `avails_process` runs them
+    return group_avails(evaluate_windows(build_window_table(windows_df), as_of=as_of))
+
+def _compute_avails_batch(windows_df, as_of_dates):
+    return group_avails(evaluate_windows_batch(build_window_table(windows_df), as_of_dates))
+
+def bench_engine(n=500_000, titles=5_000, seed=0):
+    """
+    Time the engine against the window matrix implementation on `n` random
+    windows, about 10 times the current catalogue. Their parity is checked by
+    test_engine.py.
+    """
+    windows_df = random_windows(np.random.default_rng(seed), n, titles)
+    _, old_time = _timeit(window_matrix_avails, windows_df)
+    _, new_time = _timeit(_compute_avails, windows_df)
+    return {'rows': n, 'window_matrix_seconds': old_time, 'engine_seconds': new_time, 'speedup': old_time / new_time}
+
+def bench_as_of_batch(n=500_000, titles=5_000, dates=12, seed=0):
+    """
+    Time the engine on `dates` month-ends in one batch against one run per date.
+    Their parity is checked by test_engine.py.
+    """
+    windows_df = random_windows(np.random.default_rng(seed), n, titles)
+    as_of_dates = list(pd.date_range(pd.Timestamp('today').normalize(), periods=dates, freq='M'))
+    _, runs_time = _timeit(lambda: [_compute_avails(windows_df, as_of=as_of) for as_of in as_of_dates])
+    _, batch_time = _timeit(_compute_avails_batch, windows_df, as_of_dates)
+    return {'rows': n, 'dates': dates, 'runs_seconds': runs_time, 'batch_seconds': batch_time, 'speedup': runs_time / batch_time}
+
+def _propagate_by_slices(avails_df, latam_countries):
+    # The Latam pay TV propagation as it was written before rules.apply_rules, one
+    # slice, groupby, merge and assignment per rights group
+    # Create a slice of avails_df with the 'Premium Pay TV (Local)' and 'Premium Pay TV (Pan Regional)' rights
+    latam_ptv_slice = avails_df.loc[
+        pd.IndexSlice[:, ['Premium Pay TV (Local)', 'Premium Pay TV (Pan Regional)'], latam_countries],
+        ['exclusive', 'non-exclusive']
+    ]
+
+    # Group the latam_ptv_slice dataframe by 'title' and aggregate the maximum value
+    max_latam_ptv_dates = latam_ptv_slice.reset_index().groupby(['title'])[['exclusive', 'non-exclusive']].max()
+    latam_pan_ptv_slice = avails_df.loc[
+        pd.IndexSlice[:, 'Premium Pay TV (Pan Regional)', latam_countries],
+        ['exclusive', 'non-exclusive']
+    ]
+
+    # Merge the exclusive and non-exclusive columns of a slice of avails_df with max_latam_ptv_dates by title
+    latam_pan_ptv_slice = latam_pan_ptv_slice.merge(
+        max_latam_ptv_dates,
+        how='inner',
+        left_index=True,
+        right_index=True,
+        suffixes=('_prev', '')
+    )
+    latam_pan_ptv_slice.drop(['exclusive_prev', 'non-exclusive_prev'], axis=1, inplace=True)
+
+    # Replace the exclusive and non-exclusive columns of avails_df with the latam_pan_ptv_slice
+    avails_df.loc[
+        pd.IndexSlice[:, 'Premium Pay TV (Pan Regional)', latam_countries],
+        ['exclusive', 'non-exclusive']
+    ] = latam_pan_ptv_slice
+
+    # Create a slice of avails_df with the 'Basic Pay TV (Local)' and 'Basic Pay TV (Pan Regional)' rights
+    latam_bptv_slice = avails_df.loc[
+        pd.IndexSlice[:, ['Basic Pay TV (Local)', 'Basic Pay TV (Pan Regional)'], latam_countries],
+        ['exclusive', 'non-exclusive']
+    ]
+
+    # Group the latam_bptv_slice dataframe by 'title' and aggregate the maximum value
+    max_latam_bptv_dates = latam_bptv_slice.reset_index().groupby(['title'])[['exclusive', 'non-exclusive']].max()
+    
+    # Create a slice of avails_df with the 'Basic Pay TV (Pan Regional)' rights
+    latam_pan_bptv_slice = avails_df.loc[
+        pd.IndexSlice[:, 'Basic Pay TV (Pan Regional)', latam_countries],
+        ['exclusive', 'non-exclusive']
+    ]
+
+    # Merge the exclusive and non-exclusive columns of a slice of avails_df with max_latam_bptv_dates by title
+    latam_pan_bptv_slice = latam_pan_bptv_slice.merge(
+        max_latam_bptv_dates,
+        how='left',
+        left_index=True,
+        right_index=True,
+        suffixes=('_prev', '')
+    )
+    latam_pan_bptv_slice.drop(['exclusive_prev', 'non-exclusive_prev'], axis=1, inplace=True)
+
+    # Replace the exclusive and non-exclusive columns of avails_df with the latam_pan_bptv_slice
+    avails_df.loc[
+        pd.IndexSlice[:, 'Basic Pay TV (Pan Regional)', latam_countries],
+        ['exclusive', 'non-exclusive']
+    ] = latam_pan_bptv_slice
+
+    return avails_df
+
+def _random_avails(rng, titles):
+    groups = [
+        'Premium Pay TV (Local)', 'Premium Pay TV (Pan Regional)', 'Basic Pay TV (Local)',
+        'Basic Pay TV (Pan Regional)', 'SVOD', 'Free TV',
+    ]
+    countries = LATAM_COUNTRIES + ['Spain', 'Puerto Rico', 'Canada']
+    index = pd.MultiIndex.from_product(
+        [np.arange(titles), groups, countries], names=['title', 'group', 'country_name']
+    )
+    index = index[rng.random(len(index)) < 0.5]
+    columns = {}
+    for col in ['exclusive', 'non-exclusive', 'acq_expires', 'non-exclusive_end_date']:
+        dates = pd.Timestamp('today').normalize() + pd.to_timedelta(rng.integers(0, 365 * 5, len(index)), unit='D')
+        columns[col] = dates.where(rng.random(len(index)) > 0.2)
+    return pd.DataFrame(columns, index=index)
+
+def bench_pay_tv_rules(titles=20_000, seed=0):
+    """
+    Check `rules.apply_rules` with the Latam pay TV rules against the slice by
+    slice propagation it replaced, and time both.
+    """
+    avails_df = _random_avails(np.random.default_rng(seed), titles)
+    old, old_time = _timeit(_propagate_by_slices, avails_df.copy(), LATAM_COUNTRIES)
+    new, new_time = _timeit(apply_rules, avails_df.copy(), PAY_TV_RULES)
+    pd.testing.assert_frame_equal(old, new)
+    return {'rows': avails_df.shape[0], 'slices_seconds': old_time, 'rules_seconds': new_time, 'speedup': old_time / new_time}
+
+def _avails_region(cell):
+    # The per-row region rule that `regions.classify_regions` replaces
+    cell = cell - set(CARIBBEAN) - set(DEPENDENCIES)
+    world_count = len(WORLD.intersection(cell))
+    if (
+        set(LATAM_COUNTRIES).issubset(cell) and \
+        world_count <= 16
+    ):
+        return 'All Latam'
+    elif (
+        set(LATAM_EX_MEX).issubset(cell) and \
+        world_count <= 16
+    ):
+        return 'Latam excluding Mexico'
+    elif (
+        set(LATAM_EX_BRZ).issubset(cell) and \
+        world_count <= 16
+    ):
+        return 'Latam excluding Brazil'
+    elif (
+        set(LATAM_EX_MEX_BRZ).issubset(cell) and \
+        world_count <= 16
+    ):
+        return 'Latam excluding Mexico and Brazil'
+    elif (
+        world_count >= 50 and \
+        len(set(LATAM_COUNTRIES).intersection(cell)) >= 16
+    ):
+        return 'Worldwide'
+    elif (
+        world_count >= 50 and \
+        len(set(LATAM_COUNTRIES).intersection(cell)) < 16
+    ):
+        return 'Worldwide excluding Latam'
+    else:
+        return cell
+
+def bench_classify_regions(n=100_000, seed=0):
+    """
+    Check `classify_regions` against the per-row `_avails_region` on `n` random
+    country sets, and time both.
+    """
+    rng = np.random.default_rng(seed)
+    names = sorted(set(LATAM_COUNTRIES + CARIBBEAN + DEPENDENCIES) | WORLD)
+    regions = compile_regions({name: i for i, name in enumerate(names)})
+    # Latam sets with a few countries missing or added, and large world sets
+    latam = np.array([names.index(name) for name in LATAM_COUNTRIES])
+    cells, group_ids, country_ids = [], [], []
+    for i in range(n):
+        if rng.random() < 0.5:
+            ids = latam[rng.random(len(latam)) > rng.choice([0, 0.05, 0.2])]
+            ids = np.union1d(ids, rng.choice(len(names), rng.integers(0, 20), replace=False))
+        else:
+            ids = rng.choice(len(names), rng.integers(1, len(names)), replace=False)
+        cells.append({names[j] for j in ids})
+        group_ids.append(np.full(len(ids), i))
+        country_ids.append(ids)
+
+    def per_row():
+        return [_avails_region(cell) for cell in cells]
+
+    def vectorized():
+        masks = country_bitmasks(np.concatenate(group_ids), np.concatenate(country_ids), n, regions['n_words'])
+        return classify_regions(masks, regions)[0]
+
+    old, old_time = _timeit(per_row)
+    new, new_time = _timeit(vectorized)
+    # Unclassified rows are rendered from the country set later, only the labels compare
+    assert all(
+        label == (cell if isinstance(cell, str) else None) for cell, label in zip(old, new)
+    )
+    return {'rows': n, 'apply_seconds': old_time, 'vectorized_seconds': new_time, 'speedup': old_time / new_time}
+
+def _to_excel_and_restyle(df, file_path):
+    # The to_excel, reload and restyle pass that `write_workbook` replaces
+    from openpyxl import load_workbook
+    from openpyxl.styles import Alignment, Font
+    df.to_excel(file_path, index=False)
+    wb = load_workbook(file_path)
+    ws = wb.active
+    ws.auto_filter.ref = ws.dimensions
+    ws.freeze_panes = ws['C2']
+    for col in ws.iter_cols(min_col=1):
+        for cell in col:
+            ws.column_dimensions[cell.column_letter].width = 30
+            if cell.column_letter in ['G', 'H', 'I', 'J']:
+                cell.number_format = 'YYYY-MM-DD'
+    for row in ws.iter_rows(min_row=1):
+        for cell in row:
+            cell.font = Font(size=11)
+            cell.alignment = Alignment(wrap_text=True)
+            ws.row_dimensions[cell.row].height = 50
+    for row in ws.iter_rows(min_row=1, max_row=1):
+        for cell in row:
+            cell.font = Font(bold=True)
+            cell.alignment = Alignment(horizontal='center')
+    for row in ws.iter_rows(min_row=2, max_row=ws.max_row):
+        for cell in row:
+            if cell.column_letter == 'A':
+                cell.alignment = Alignment(horizontal='left')
+                cell.font = Font(bold=True)
+    wb.save(file_path)
+    wb.close()
+
+def bench_excel_writer(n=5_000, seed=0):
+    """Time the to_excel and restyle pass against `write_workbook` on an `n` row audit-like sheet."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        f'text_{i}': np.array(['Mexico, Brazil', 'First Run', 'Library', ''], dtype=object)[rng.integers(0, 4, n)]
+        for i in range(6)
+    })
+    for i in range(4):
+        dates = _random_dates(rng, n).dt.date.astype(object)
+        df.insert(6 + i, f'date_{i}', dates.where(dates.notna(), None))
+    for i in range(30):
+        df[f'number_{i}'] = rng.integers(0, 10**6, n)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        _, old_time = _timeit(_to_excel_and_restyle, df, os.path.join(tmp_dir, 'old.xlsx'))
+        _, new_time = _timeit(
+            write_workbook, os.path.join(tmp_dir, 'new.xlsx'), [('Sheet1', df)], date_columns=[6, 7, 8, 9]
+        )
+    results['write_workbook'] = {'rows': n, 'restyle_seconds': old_time, 'streaming_seconds': new_time, 'speedup': old_time / new_time}
+    return results
+
+def bench_pipeline(scales=(1, 10, 100), titles=50, rights=None, territories=None, windows_per_title=40,
+                   workers=None, seed=0, results_fp=None):
+    """
+    Time `process_data` and `avails_process` on synthetic inputs, end to end and
+    stage by stage.
+
+    Each scale multiplies the number of titles. The inputs are generated in a
+    temporary app directory that is removed after the run. Both calls record
+    their stages in one `RunReport`, whose wall time, CPU time, peak RSS and rows
+    are kept for each stage. The peak RSS is the high water mark of the benchmark
+    process, so it only grows from one scale to the next.
+
+    Params
+    ------
+    scales : list
+        multiples of `titles` to run, e.g. 1x, 10x and 100x
+    titles, rights, territories, windows_per_title, seed :
+        arguments of `synthetic.generate` at 1x
+    workers : int
+        worker processes of both stages, defaults to the number of CPUs
+    results_fp : str
+        JSON file the run is appended to, or None to only return it
+
+    Returns
+    -------
+    dict
+        Returns the run, with the environment, and the seconds of both calls and
+        the records of their stages per scale.
+    """
+    # Imported here so that the micro benchmarks do not load the pipeline
+    from data_process import process_data
+    from avails import avails_process
+    from instrument import RunReport
+
+    run = {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'cpus': os.cpu_count(),
+        'results': [],
+    }
+    for scale in scales:
+        app_dir = tempfile.mkdtemp()
+        try:
+            n_titles = titles * scale
+            _, generate_time = _timeit(
+                generate,
+                os.path.join(app_dir, 'data'),
+                titles=n_titles,
+                rights=rights,
+                territories=territories,
+                windows_per_title=windows_per_title,
+                seed=seed
+            )
+            report = RunReport()
+            _, ingest_time = _timeit(process_data, workers=workers, use_cache=False, app_dir=app_dir, report=report)
+            _, avails_time = _timeit(avails_process, workers=workers, app_dir=app_dir, report=report)
+        finally:
+            shutil.rmtree(app_dir, ignore_errors=True)
+        run['results'].append({
+            'scale': scale,
+            'titles': n_titles,
+            'generate_seconds': generate_time,
+            'process_data_seconds': ingest_time,
+            'avails_process_seconds': avails_time,
+            'stages': report.stages,
+        })
+
+    if results_fp is not None:
+        runs = []
+        if os.path.isfile(results_fp):
+            with open(results_fp) as f:
+                runs = json.load(f)
+        runs.append(run)
+        with open(results_fp, 'w') as f:
+            json.dump(runs, f, indent=2)
+    return run
+
+# Modules the entry points must not import before a stage runs
+HEAVY_MODULES = ['pandas', 'numpy', 'openpyxl', 'pyarrow', 'xlsxwriter', 'tqdm']
+
+def check_import_time(modules=('main', 'cli'), budget_ms=300, repeat=3):
+    """
+    Import each entry point in a fresh interpreter with `-X importtime` and check
+    it against the budget, and that none of the HEAVY_MODULES were imported.
+
+    Params
+    ------
+    modules : list
+        entry point modules, imported from the directory of this file
+    budget_ms : float
+        the most milliseconds an import may take, the best of `repeat` runs
+    repeat : int
+        number of fresh interpreters per module
+
+    Returns
+    -------
+    dict
+        Returns the milliseconds, the heavy modules imported and whether the
+        budget was kept, per module.
+    """
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    for module in modules:
+        code = f'import sys, {module}; print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))'
+        times = []
+        for _ in range(repeat):
+            proc = subprocess.run(
+                [sys.executable, '-X', 'importtime', '-c', code],
+                cwd=repo_dir, capture_output=True, text=True, check=True
+            )
+            # Lines are 'import time: self [us] | cumulative | imported package'
+            match = re.search(rf'^import time:\s+\d+ \|\s+(\d+) \| {module}$', proc.stderr, re.MULTILINE)
+            times.append(int(match.group(1)) / 1000)
+        heavy = [m for m in proc.stdout.strip().split(',') if m]
+        results[module] = {
+            'milliseconds': min(times),
+            'heavy_modules': heavy,
+            'ok': min(times) <= budget_ms and not heavy,
+        }
+    return results
+
+def run_micro_benchmarks():
+    for name, result in bench_clean_dates().items():
+        print(
+            f"clean_dates ({name}): {result['rows']} rows, apply {result['apply_seconds']:.2f}s, "
+            f"vectorized {result['vectorized_seconds']:.3f}s, {result['speedup']:.0f}x"
+        )
+    for name, result in bench_render_values().items():
+        print(
+            f"render_values ({name}): {result['rows']} rows, _clean_str apply {result['apply_seconds']:.2f}s, "
+            f"vectorized {result['vectorized_seconds']:.3f}s, {result['speedup']:.0f}x"
+        )
+    for name, result in bench_window_rules().items():
+        print(
+            f"{name}: {result['rows']} rows, apply {result['apply_seconds']:.2f}s, "
+            f"vectorized {result['vectorized_seconds']:.3f}s, {result['speedup']:.0f}x"
+        )
+
+    result = bench_classify_regions()
+    print(
+        f"classify_regions: {result['rows']} rows, apply {result['apply_seconds']:.2f}s, "
+        f"vectorized {result['vectorized_seconds']:.3f}s, {result['speedup']:.0f}x"
+    )
+
+    result = bench_engine()
+    print(
+        f"compute_avails: {result['rows']} windows, window matrix {result['window_matrix_seconds']:.2f}s, "
+        f"engine {result['engine_seconds']:.3f}s, {result['speedup']:.0f}x"
+    )
+
+    result = bench_as_of_batch()
+    print(
+        f"compute_avails_batch: {result['rows']} windows, {result['dates']} dates, one run per date "
+        f"{result['runs_seconds']:.2f}s, batch {result['batch_seconds']:.2f}s, {result['speedup']:.1f}x"
+    )
+    result = bench_pay_tv_rules()
+    print(
+        f"apply_rules (Latam pay TV): {result['rows']} avails, slices {result['slices_seconds']:.2f}s, "
+        f"rules {result['rules_seconds']:.3f}s, {result['speedup']:.0f}x"
+    )
+    for name, result in bench_excel_writer().items():
+        print(
+            f"{name}: {result['rows']} rows, restyle {result['restyle_seconds']:.2f}s, "
+            f"streaming {result['streaming_seconds']:.2f}s, {result['speedup']:.0f}x"
+        )
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the benchmarks.')
+    parser.add_argument('--pipeline', action='store_true', help='time process_data and avails_process on synthetic data')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--titles', type=int, default=50, help='titles at 1x')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--results', default='benchmark_results.json', help='JSON file the pipeline run is appended to')
+    parser.add_argument(
+        '--import-budget', type=float, metavar='MS', nargs='?', const=300,
+        help='check the import time of the entry points against a budget (default: 300 ms), exits 1 over it'
+    )
+    args = parser.parse_args()
+
+    if args.import_budget is not None:
+        results = check_import_time(budget_ms=args.import_budget)
+        for module, result in results.items():
+            print(
+                f"import {module}: {result['milliseconds']:.0f} ms (budget {args.import_budget:.0f} ms)"
+                + (f", imports {', '.join(result['heavy_modules'])}" if result['heavy_modules'] else '')
+            )
+        sys.exit(0 if all(result['ok'] for result in results.values()) else 1)
+
+    if not args.pipeline:
+        run_micro_benchmarks()
+        sys.exit(0)
+
+    run = bench_pipeline(scales=args.scales, titles=args.titles, workers=args.workers, results_fp=args.results)
+    for result in run['results']:
+        print(
+            f"{result['scale']}x ({result['titles']} titles): process_data {result['process_data_seconds']:.1f}s, "
+            f"avails_process {result['avails_process_seconds']:.1f}s"
+        )
+        for stage in result['stages']:
+            peak_rss = '' if stage['peak_rss_mb'] is None else f", peak RSS {stage['peak_rss_mb']:.0f} MB"
+            print(
+                f"    {stage['stage']}: {stage['wall_seconds']:.2f}s wall, "
+                f"{stage['cpu_seconds']:.2f}s CPU{peak_rss}, {stage['rows']} rows"
+            )
@@ -0,0 +1,318 @@
+import os
+import re
+import json
+import hashlib
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+import numpy as np
+import pandas as pd
+
+# Bump when the cleaning or the avails code changes so that stale entries are not reused
+CACHE_VERSION = 5
+
+_MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_PKG_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+# A cell holding an index into the shared strings table
+_shared_string_cell = re.compile(rb'(<c\b[^>]*\bt="s"[^>]*>\s*<v>)(\d+)(</v>)')
+
+def _hash_file(file_path, chunk_size=1 << 20):
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def cache_key(*parts):
+    """Digest of the given key parts, the cache version and the pandas version."""
+    sha = hashlib.sha256()
+    for part in (CACHE_VERSION, pd.__version__) + parts:
+        sha.update(json.dumps(part, sort_keys=True, default=str).encode('utf-8'))
+        sha.update(b'\0')
+    return sha.hexdigest()
+
+def sheet_digests(file_path):
+    """
+    Hash the content of every sheet of an .xlsx workbook without parsing the cells.
+
+    Shared string indices are replaced by the strings they point to, so a sheet
+    keeps its digest when another sheet of the workbook adds or removes strings.
+
+    Params
+    ------
+    file_path : str
+        path of the .xlsx file
+
+    Returns
+    -------
+    dict
+        Returns a dictionary with the sheet names as keys and their digest as values.
+    """
+    with zipfile.ZipFile(file_path) as zf:
+        names = set(zf.namelist())
+        workbook = ET.fromstring(zf.read('xl/workbook.xml'))
+        rels = ET.fromstring(zf.read('xl/_rels/workbook.xml.rels'))
+        targets = {
+            rel.get('Id'): rel.get('Target') for rel in rels.iter(_PKG_REL_NS + 'Relationship')
+        }
+
+        shared_strings = []
+        if 'xl/sharedStrings.xml' in names:
+            for si in ET.fromstring(zf.read('xl/sharedStrings.xml')).iter(_MAIN_NS + 'si'):
+                text = ''.join(t.text or '' for t in si.iter(_MAIN_NS + 't'))
+                shared_strings.append(json.dumps(text).encode('utf-8'))
+
+        # Number formats decide which cells are read as dates
+        styles = zf.read('xl/styles.xml') if 'xl/styles.xml' in names else b''
+        styles_digest = hashlib.sha256(styles).digest()
+
+        def resolve(match):
+            return match.group(1) + shared_strings[int(match.group(2))] + match.group(3)
+
+        digests = {}
+        for sheet in workbook.iter(_MAIN_NS + 'sheet'):
+            target = targets[sheet.get(_REL_NS + 'id')]
+            if target.startswith('/'):
+                member = target.lstrip('/')
+            else:
+                member = posixpath.normpath(posixpath.join('xl', target))
+            sha = hashlib.sha256(styles_digest)
+            sha.update(_shared_string_cell.sub(resolve, zf.read(member)))
+            digests[sheet.get('name')] = sha.hexdigest()
+    return digests
+
+class IngestCache:
+    """
+    Parsed and normalized tables of the source files, stored as pickles in
+    `cache_dir` and looked up by a key derived from the source content.
+
+    Source files are fingerprinted by size, mtime and content hash. The content
+    hash is only recomputed when the size or the mtime changed since the last run.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.manifest_fp = os.path.join(cache_dir, 'manifest.json')
+        self.manifest = {'files': {}, 'entries': {}}
+        if os.path.isfile(self.manifest_fp):
+            try:
+                with open(self.manifest_fp) as f:
+                    self.manifest = json.load(f)
+            except (OSError, ValueError):
+                pass
+        self.used = set()
+        self.hits = 0
+        self.misses = 0
+
+    def fingerprint(self, file_path):
+        """Return the size, mtime and sha256 of a source file."""
+        stat = os.stat(file_path)
+        previous = self.manifest['files'].get(os.path.abspath(file_path), {})
+        if previous.get('size') == stat.st_size and previous.get('mtime') == stat.st_mtime:
+            return previous
+        fingerprint = {
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'sha256': _hash_file(file_path),
+        }
+        self.manifest['files'][os.path.abspath(file_path)] = fingerprint
+        return fingerprint
+
+    def sheet_digests(self, file_path):
+        """Return the per-sheet digests of a workbook, reusing them while the file is unchanged."""
+        fingerprint = self.fingerprint(file_path)
+        if 'sheets' not in fingerprint:
+            fingerprint['sheets'] = sheet_digests(file_path)
+        return fingerprint['sheets']
+
+    def _entry_fp(self, name, key):
+        return os.path.join(self.cache_dir, f'{name}-{key[:32]}.pkl')
+
+    def load(self, name, key):
+        entry_fp = self._entry_fp(name, key)
+        if self.manifest['entries'].get(entry_fp) == key and os.path.isfile(entry_fp):
+            try:
+                df = pd.read_pickle(entry_fp)
+            except Exception:
+                self.misses += 1
+                return None
+            self.used.add(entry_fp)
+            self.hits += 1
+            return df
+        self.misses += 1
+        return None
+
+    def store(self, name, key, df):
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        entry_fp = self._entry_fp(name, key)
+        df.to_pickle(entry_fp)
+        self.manifest['entries'][entry_fp] = key
+        self.used.add(entry_fp)
+
+    def get(self, name, key, loader):
+        """Return the cached table for `key`, calling `loader` and storing its result on a miss."""
+        df = self.load(name, key)
+        if df is None:
+            df = loader()
+            self.store(name, key, df)
+        return df
+
+    def save(self):
+        """Write the manifest and delete the entries that were not used by this run."""
+        for entry_fp in list(self.manifest['entries']):
+            if entry_fp not in self.used:
+                del self.manifest['entries'][entry_fp]
+                if os.path.isfile(entry_fp):
+                    os.remove(entry_fp)
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        with open(self.manifest_fp, 'w') as f:
+            json.dump(self.manifest, f)
+
+def title_digests(tables, title_col='title'):
+    """
+    Digest of the rows of each title in several tables.
+
+    The rows are hashed with `pandas.util.hash_pandas_object` and the hashes are
+    summed per title, so the digest does not depend on the order of the rows.
+
+    Params
+    ------
+    tables : dict
+        dataframes with a `title_col` column, by name
+    title_col : str
+        the title column
+
+    Returns
+    -------
+    pandas.Series
+        Returns the uint64 digest of each title, indexed by title.
+    """
+    sums = {}
+    for name, df in tables.items():
+        try:
+            hashes = pd.util.hash_pandas_object(df, index=False)
+        except TypeError:
+            # Unhashable values, e.g. the lists of cast names, are hashed as text
+            hashes = pd.util.hash_pandas_object(df.astype(str), index=False)
+        sums[name] = hashes.groupby(df[title_col].to_numpy()).sum()
+    titles = pd.Index([])
+    for table_sums in sums.values():
+        titles = titles.union(table_sums.index)
+    # A title missing from a table sums to 0 for it
+    sums = pd.DataFrame({
+        name: table_sums.reindex(titles, fill_value=0).astype(np.uint64) for name, table_sums in sums.items()
+    }, index=titles)
+    return pd.util.hash_pandas_object(sums, index=True)
+
+def concat_rows(frames):
+    """
+    Concatenate dataframes with the same columns, keeping their missing values.
+
+    `pandas.concat` fills a column that is entirely missing in one of the frames
+    with NaN, e.g. an object column of NaT, which is then rendered differently.
+    Columns of different dtypes are concatenated as objects.
+    """
+    frames = [df for df in frames if not df.empty] or frames[:1]
+    if len(frames) == 1:
+        return frames[0]
+    columns = frames[0].columns
+    data = {}
+    for col in columns:
+        dtypes = {df[col].dtype for df in frames}
+        if len(dtypes) == 1:
+            data[col] = np.concatenate([df[col].to_numpy() for df in frames])
+        else:
+            data[col] = np.concatenate([df[col].astype(object).to_numpy() for df in frames])
+    index = frames[0].index.append([df.index for df in frames[1:]])
+    return pd.DataFrame(data, index=index, columns=columns)
+
+class TitleCache:
+    """
+    Per-title results of the avails, stored in a single pickle with the digest
+    of the input rows each title was computed from. The results must not depend
+    on anything but these rows and the `context`, e.g. not on the as-of date.
+
+    The titles with a new or a changed digest are recomputed, and the stored
+    results of the other titles are reused. Every stored result is dropped when
+    the `context` of the run, e.g. the columns shared by every title, changed.
+
+    Params
+    ------
+    file_path : str
+        path of the pickle
+    context : str
+        digest of what the results depend on besides the rows of their title
+    """
+
+    def __init__(self, file_path, context):
+        self.file_path = file_path
+        self.context = context
+        self.digests = pd.Series([], dtype=np.uint64)
+        self.results = {}
+        self.hits = 0
+        self.misses = 0
+        if os.path.isfile(file_path):
+            try:
+                state = pd.read_pickle(file_path)
+            except Exception:
+                state = None
+            if state is not None and state.get('context') == context:
+                self.digests = state['digests']
+                self.results = state['results']
+
+    def dirty(self, digests):
+        """Titles of `digests` whose digest is new or changed since the stored run."""
+        known = digests.index.intersection(self.digests.index)
+        unchanged = known[self.digests[known].to_numpy() == digests[known].to_numpy()]
+        return digests.index.difference(unchanged)
+
+    def update(self, digests, compute):
+        """
+        Recompute the dirty titles and merge them with the stored results.
+
+        Params
+        ------
+        digests : pandas.Series
+            the `title_digests` of this run
+        compute : callable
+            takes the dirty titles and returns a dictionary of dataframes indexed
+            by title, e.g. {'audit': df}
+
+        Returns
+        -------
+        dict
+            Returns the dataframes of every title of `digests`, ordered by title.
+            The rows of a title keep the order they were computed in.
+        """
+        dirty = self.dirty(digests)
+        self.misses = len(dirty)
+        self.hits = len(digests) - len(dirty)
+        computed = compute(dirty) if len(dirty) else {}
+
+        results = {}
+        for name in set(computed) | set(self.results):
+            frames = []
+            if name in self.results:
+                stored = self.results[name]
+                clean = stored.index.isin(digests.index) & ~stored.index.isin(dirty)
+                frames.append(stored.loc[clean])
+            if name in computed:
+                frames.append(computed[name])
+            results[name] = concat_rows(frames).sort_index(kind='mergesort')
+        self.digests = digests
+        self.results = results
+        return results
+
+    def save(self):
+        """Write the digests and the results of the last `update`."""
+        if not os.path.exists(os.path.dirname(self.file_path)):
+            os.makedirs(os.path.dirname(self.file_path))
+        pd.to_pickle({
+            'context': self.context,
+            'digests': self.digests,
+            'results': self.results,
+        }, self.file_path)
@@ -0,0 +1,132 @@
+import os
+import sys
+import argparse
+import datetime
+import traceback
+import multiprocessing
+
+# Exit codes
+EXIT_OK = 0
+EXIT_INGEST_FAILED = 1
+EXIT_USAGE = 2
+EXIT_MISSING_INPUT = 3
+EXIT_AVAILS_FAILED = 4
+
+STAGES = ['ingest', 'avails', 'all']
+
+def _date(value):
+    # Dates are passed as YYYY-MM-DD
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid date {value!r}, expected YYYY-MM-DD')
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Ingest the source exports and generate the avails, without the GUI.',
+        epilog=(
+            f'Exit codes: {EXIT_OK} success, {EXIT_INGEST_FAILED} ingest failed, {EXIT_USAGE} bad arguments, '
+            f'{EXIT_MISSING_INPUT} missing input file, {EXIT_AVAILS_FAILED} avails failed.'
+        )
+    )
+    parser.add_argument(
+        '--stage', choices=STAGES, default='all',
+        help="'ingest' runs process_data, 'avails' runs avails_process on the stored tables, 'all' runs both"
+    )
+    parser.add_argument(
+        '--data-dir',
+        help="directory with the source files, the 'tables' are written to and read from it (default: <app dir>/data)"
+    )
+    parser.add_argument('--output-dir', help='directory the avails are written to (default: <app dir>/avails)')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: number of CPUs)')
+    parser.add_argument(
+        '--no-cache', action='store_true',
+        help='parse every source file and compute every title, ignoring the ingest and avails caches'
+    )
+    parser.add_argument('--free-tv-files', action='store_true', help='also write one Free TV workbook per country')
+    parser.add_argument('--profile-dir', help='write a cProfile dump of every stage to this directory')
+    parser.add_argument('--as-of', type=_date, help='compute the avails as of this date, YYYY-MM-DD (default: now)')
+    parser.add_argument(
+        '--as-of-dates', type=_date, nargs='+', metavar='DATE',
+        help="write the avails as of each of these dates to 'avails_by_date.xlsx' instead of the avails workbooks"
+    )
+    parser.add_argument(
+        '--month-ends', type=int, metavar='N',
+        help='same as --as-of-dates with the next N month-ends'
+    )
+    args = parser.parse_args(argv)
+    if args.workers is not None and args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if args.month_ends is not None and args.month_ends < 1:
+        parser.error('--month-ends must be at least 1')
+    if sum(arg is not None for arg in [args.as_of, args.as_of_dates, args.month_ends]) > 1:
+        parser.error('--as-of, --as-of-dates and --month-ends are exclusive')
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Imported here so that --help does not load the data stack
+    from paths import get_app_dir
+    from instrument import RunReport, report_path
+
+    app_dir = get_app_dir()
+    data_dir = args.data_dir or os.path.join(app_dir, 'data')
+    output_dir = args.output_dir or os.path.join(app_dir, 'avails')
+    report = RunReport(profile_dir=args.profile_dir)
+
+    if args.stage in ['ingest', 'all']:
+        from data_process import process_data
+        try:
+            process_data(
+                workers=args.workers,
+                use_cache=not args.no_cache,
+                data_dir=data_dir,
+                output_dir=output_dir,
+                report=report
+            )
+        except FileNotFoundError as e:
+            print(f'Error: {e}', file=sys.stderr)
+            report.save(report_path(output_dir))
+            return EXIT_MISSING_INPUT
+        except Exception:
+            traceback.print_exc()
+            report.save(report_path(output_dir))
+            return EXIT_INGEST_FAILED
+
+    if args.stage in ['avails', 'all']:
+        from avails import avails_process, avails_by_date, month_ends
+        try:
+            if args.as_of_dates or args.month_ends:
+                avails_by_date(
+                    args.as_of_dates or month_ends(args.month_ends),
+                    data_dir=data_dir,
+                    output_dir=output_dir,
+                    report=report
+                )
+            else:
+                avails_process(
+                    workers=args.workers,
+                    free_tv_files=args.free_tv_files,
+                    data_dir=data_dir,
+                    output_dir=output_dir,
+                    report=report,
+                    as_of=args.as_of,
+                    use_cache=not args.no_cache
+                )
+        except FileNotFoundError as e:
+            # The tables have not been written yet, e.g. --stage avails before any ingest
+            print(f'Error: {e}', file=sys.stderr)
+            report.save(report_path(output_dir))
+            return EXIT_MISSING_INPUT
+        except Exception:
+            traceback.print_exc()
+            report.save(report_path(output_dir))
+            return EXIT_AVAILS_FAILED
+
+    return EXIT_OK
+
+if __name__ == '__main__':
+    # Required for the process pools in a frozen executable
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -1,29 +1,110 @@
+import os
 import pandas as pd
 import numpy as np
 from tqdm import tqdm
-from utils import *
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from paths import get_app_dir, check_file
+from utils import clean_dates, tidy_split_columns
+from readers import (
+    contract_summary_cols,
+    titles_cols,
+    talent_cols,
+    normalize_contract_col,
+    read_contract_summary,
+    read_project_list,
+    read_title_metadata,
+    read_ratings,
+    sheet_names,
+)
+from cache import IngestCache, cache_key
+from store import write_table
+from schema import unused_columns
+from instrument import RunReport, report_path
+
+# Workbook handle opened once per worker process by _init_open_windows_worker
+_open_windows_xls = None
+
+def _init_open_windows_worker(open_windows_fp):
+    global _open_windows_xls
+    _open_windows_xls = pd.ExcelFile(open_windows_fp)
+
+def _read_open_windows_sheet(sheet_name, country_names, right_names):
+    sheet_df = pd.read_excel(_open_windows_xls, sheet_name=sheet_name)
+    return clean_open_windows_sheet(sheet_df, country_names, right_names)
+
+def clean_open_windows_sheet(sheet_df, country_names, right_names):
+    """
+    Filter and normalize one right sheet of the Open Windows workbook.
 
-def process_data():
+    Params
+    ------
+    sheet_df : pandas.DataFrame
+        the sheet as read from the workbook
+    country_names : list
+        territories to keep
+    right_names : list
+        rights to keep
+
+    Returns
+    -------
+    pandas.DataFrame
+        Returns the cleaned sheet with snake_case columns and a `title` column.
+    """
+    sheet_df = sheet_df.loc[~sheet_df['Contract Code'].isna()]
+    sheet_df = sheet_df.loc[sheet_df['Territory'].isin(country_names), :]
+    sheet_df = sheet_df.loc[sheet_df['Right'].isin(right_names), :]
+    sheet_df['Start Date'] = clean_dates(sheet_df['Start Date'])
+    sheet_df['End Date'] = clean_dates(sheet_df['End Date'], start_date=False)
+    sheet_df.columns = [
+        colname.replace(" ", "_").lower() for colname in sheet_df.columns
+    ]
+    sheet_df.loc[(sheet_df['contract_code'].map(len) > 6), 'contract_code'] = sheet_df.loc[(sheet_df['contract_code'].map(len) > 6), 'contract_code'].apply(lambda x: x.split()[0][:-1])
+    # No stage reads the estimated / actual flags of the dates
+    sheet_df.drop(['start_e/a', 'end_e/a'], axis=1, inplace=True)
+    sheet_df['title'] = sheet_df['unique_id'].astype(int)
+    sheet_df.drop('unique_id', axis=1, inplace=True)
+    return sheet_df
+
+def process_data(workers=None, use_cache=True, app_dir=None, data_dir=None, output_dir=None, report=None):
     print('Processing data...')
-    app_dir = get_app_dir()
+    if app_dir is None:
+        app_dir = get_app_dir()
+    if data_dir is None:
+        data_dir = os.path.join(app_dir, 'data')
+    if output_dir is None:
+        output_dir = os.path.join(app_dir, 'avails')
+
+    # Stages are timed in the run report, saved next to the avails outputs
+    if report is None:
+        report = RunReport()
+
+    # Parsed tables are cached per source file (and per sheet of the Open Windows workbook)
+    cache = IngestCache(os.path.join(data_dir, 'cache')) if use_cache else None
+
+    def cached(name, file_path, loader, *key_parts):
+        if cache is None:
+            return loader()
+        return cache.get(name, cache_key(cache.fingerprint(file_path)['sha256'], *key_parts), loader)
 
     # Path to the external files
-    open_windows_fp = os.path.join(app_dir, 'data', 'Availability Open Windows - By Territory and Right (Copy) 1.xlsx')
+    open_windows_fp = os.path.join(data_dir, 'Availability Open Windows - By Territory and Right (Copy) 1.xlsx')
     check_file(open_windows_fp)
-    contract_summary_fp = os.path.join(app_dir, 'data', 'Contract Summary.xlsx')
+    contract_summary_fp = os.path.join(data_dir, 'Contract Summary.xlsx')
     check_file(contract_summary_fp)
-    titles_fp = os.path.join(app_dir, 'data', 'Project List.xlsx')
+    titles_fp = os.path.join(data_dir, 'Project List.xlsx')
     check_file(titles_fp)
-    rights_fp = os.path.join(app_dir, 'data', 'rights.csv')
+    rights_fp = os.path.join(data_dir, 'rights.csv')
     check_file(rights_fp)
-    countries_fp = os.path.join(app_dir, 'data', 'countries.csv')
+    countries_fp = os.path.join(data_dir, 'countries.csv')
     check_file(countries_fp)
-    title_metadata_fp = os.path.join(app_dir, 'data', 'Project Data ID.xlsx')
+    title_metadata_fp = os.path.join(data_dir, 'Project Data ID.xlsx')
     check_file(title_metadata_fp)
-    ratings_fp = os.path.join(app_dir, 'data', 'Ratings & Titles.xlsx')
+    ratings_fp = os.path.join(data_dir, 'Ratings & Titles.xlsx')
     check_file(ratings_fp)
 
     # Load data
+    report.start('load')
     rights = pd.read_csv(rights_fp, encoding = 'unicode_escape')
 
     right_groups_map = {}
@@ -165,133 +246,99 @@ def process_data():
     countries = pd.read_csv(countries_fp, encoding = 'unicode_escape')
     countries = countries.drop_duplicates(subset='name', keep='first')
     countries['country'] = np.arange(1, countries.shape[0] + 1)
-    countries['market_region'] = countries['market_region'].fillna(countries['geo_region'])
 
-    contracts_df = pd.read_excel(contract_summary_fp, header=0)
+    # The column lists are part of the keys, a column added back is read again
+    contracts_df = cached(
+        'contracts', contract_summary_fp, lambda: read_contract_summary(contract_summary_fp), contract_summary_cols
+    )
+    titles_df = cached('titles', titles_fp, lambda: read_project_list(titles_fp), titles_cols)
+    title_metadata = cached('title_metadata', title_metadata_fp, lambda: read_title_metadata(title_metadata_fp))
+    ratings = cached('ratings', ratings_fp, lambda: read_ratings(ratings_fp))
+
+    open_windows_sn = sheet_names(open_windows_fp)
+    open_windows_sn.remove('All Rights')
+    open_windows_sn.remove('Filter Values')
+    open_windows_sn = [sn for sn in open_windows_sn if not sn.endswith(' (U)')]
+
+    country_names = countries['name'].tolist()
+    right_names = rights['name'].tolist()
+
+    # Reuse the cleaned sheets whose content, territories and rights did not change
+    sheet_dfs = {}
+    sheet_keys = {}
+    if cache is not None:
+        digests = cache.sheet_digests(open_windows_fp)
+        for sn in open_windows_sn:
+            sheet_keys[sn] = cache_key(digests[sn], country_names, right_names)
+            sheet_df = cache.load('open_windows', sheet_keys[sn])
+            if sheet_df is not None:
+                sheet_dfs[sn] = sheet_df
+        print(f'{len(sheet_dfs)} of {len(open_windows_sn)} sheets loaded from cache')
+    stale_sn = [sn for sn in open_windows_sn if sn not in sheet_dfs]
+
+    # Parse and clean the right sheets, in a process pool when more than one worker is available.
+    # executor.map yields the sheets in submission order, so the window ids stay deterministic
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(stale_sn)))
+
+    if not stale_sn:
+        parsed = []
+    elif workers == 1:
+        with pd.ExcelFile(open_windows_fp) as xls:
+            parsed = [
+                clean_open_windows_sheet(pd.read_excel(xls, sheet_name=sn), country_names, right_names)
+                for sn in tqdm(stale_sn)
+            ]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_open_windows_worker,
+            initargs=(open_windows_fp,)
+        ) as executor:
+            parsed = list(tqdm(
+                executor.map(
+                    partial(_read_open_windows_sheet, country_names=country_names, right_names=right_names),
+                    stale_sn
+                ),
+                total=len(stale_sn)
+            ))
+
+    for sn, sheet_df in zip(stale_sn, parsed):
+        sheet_dfs[sn] = sheet_df
+        if cache is not None:
+            cache.store('open_windows', sheet_keys[sn], sheet_df)
+
+    df_list = [sheet_dfs[sn] for sn in open_windows_sn]
+    report.end(rows=sum(sheet_df.shape[0] for sheet_df in df_list))
+
+    report.start('normalize')
     contracts_df.columns = [
-        colname.replace(" ","_").replace("/Conditions", "").replace("#","Id").lower() for colname in contracts_df.columns
-    ]
-    contract_summary_cols = [
-    #    'support_code', 
-        'contract_id', 
-        'contract_type', 
-        'licensor',
-        'distributor', 
-    #    'projects', 
-    #    'project_codes', 
-    #    'territories', 
-    #    'regions',
-    #    'zone', 
-    #    'languages', 
-        'status', 
-        'deal_status', 
-        'creation_date',
-        'deal_type', 
-    #    'isestimatedstartdate', 
-    #    'start_date', 
-    #    'end_date',
-    #    'isestimatedenddate', 
-    #    'start_date_note', 
-    #    'end_date_note',
-        'fully_executed', 
-    #    'nod', 
-    #    'outside_delivery_date', 
-    #    'deal_memo_date',
-    #    'mg_usd', 
-        'mg', 
-        'cur', 
-    #   'exchange_rate', 
-    #    'payment_data', 
-    #    'invoice_data',
-        'additional_terms', 
-    #    'total_invoiced', 
-    #    'total_paid', 
-    #    'total_balance',
-    #    'total_invoiced_usd', 
-    #    'total_paid_usd', 
-    #    'right_group_summary',
-    #    'right_summary', 
-    #  'notes'
+        normalize_contract_col(colname) for colname in contracts_df.columns
     ]
 
     contracts = contracts_df[contract_summary_cols].copy().sort_values(by='creation_date')
     contracts['contract'] = np.arange(1, contracts.shape[0]+1)
     contracts.rename(columns={'contract_id': 'contract_code'}, inplace=True)
 
-    titles_df = pd.read_excel(titles_fp)
     titles_df.dropna(axis=1, how='all', inplace=True)
-    titles_cols = [
-        'Title', 
-        'AKA 1', 
-        'AKA 2', 
-        'Adj. Running Time', 
-    #    'Associate Producer',
-    #    'Budget', 
-    #    'Business Unit', 
-    #    'Cast Crew - Summary Tab', 
-    #    'Cast Member',
-        'Copyright Holder', 
-    #  'Copyright Year', 
-        'Country of Origin',
-        'Dialogue Language', 
-    #    'Director', 
-    #    'Exploitation', 
-    #    'External Comments',
-        'Genre', 
-        'IMDB Code', 
-    #   'Internal Comments', 
-        'Logline',
-    #   'Motion Picture Association of America', 
-        'Number of Episodes',
-        'Number of Seasons', 
-        'Original Format', 
-        'Original Language', 
-    #    'Producer',
-    #    'Production Company', 
-        'Project Code', 
-        'Project Group', 
-        'Project Type',
-        'Rating', 
-    #   'Release Date', 
-        'Running Time', 
-    #  'Sales Agency', 
-        'Season',
-        'Short Synopsis', 
-        'Status', 
-        'Subtitle Language', 
-        'Synopsis',
-        'Title Code', 
-        'Unique Id', 
-    #   'Web Synopsis', 
-        'Website', 
-    #    'Writer',
-        'Year Completed'
-    ]
-    talent_df = tidy_split(titles_df[['Cast Member', 'Unique Id']], 'Cast Member')
-    talent_df['Role'] = 'Cast'
-    talent_df = talent_df.rename({'Cast Member': 'Talent Full Name'}, axis=1)
-    directors = tidy_split(titles_df[['Director', 'Unique Id']], 'Director')
-    directors['Role'] = 'Director'
-    directors = directors.rename({'Director': 'Talent Full Name'}, axis=1)
-    producers = tidy_split(titles_df[['Producer', 'Unique Id']], 'Producer')
-    producers['Role'] = 'Producer'
-    producers = producers.rename({'Producer': 'Talent Full Name'}, axis=1)
-    writers = tidy_split(titles_df[['Writer', 'Unique Id']], 'Writer')
-    writers['Role'] = 'Writer'
-    writers = writers.rename({'Writer': 'Talent Full Name'}, axis=1)
-    talent_df = pd.concat([talent_df, directors, producers, writers])
-    talent_df = talent_df.reset_index(drop=True)
+    talent_df = tidy_split_columns(
+        titles_df,
+        talent_cols,
+        'Unique Id',
+        value_name='Talent Full Name',
+        var_name='Role'
+    )
     titles_df.columns = [
         colname.replace(" ","_").replace(".","").lower() for colname in titles_df.columns
     ]
-    titles_cols = [
+    title_cols = [
         colname.replace(" ","_").replace(".","").lower() for colname in titles_cols
     ]
-    titles = titles_df[titles_cols].copy()
+    titles = titles_df[title_cols].copy()
     titles.rename(columns={'title':'name'}, inplace=True)
     titles.rename(columns={'unique_id':'title'}, inplace=True)
 
-    title_metadata = pd.read_excel(title_metadata_fp)
     title_metadata.columns = [
         colname.replace(" ","_").replace(".","").lower() for colname in title_metadata.columns
     ]
@@ -302,7 +349,6 @@ def process_data():
 
     titles = titles.set_index('title').join(title_metadata, how='left')
 
-    ratings = pd.read_excel(ratings_fp, index_col='Unique Identifier')
     ratings.columns = [
         colname.strip().replace(" ","_").replace(".","").lower() for colname in ratings.columns
     ]
@@ -314,54 +360,24 @@ def process_data():
 
     titles = titles.join(ratings, how='left')
 
-    xls = pd.ExcelFile(open_windows_fp)
-    open_windows_sn = xls.sheet_names
-    open_windows_sn.remove('All Rights')
-    open_windows_sn.remove('Filter Values')
-    open_windows_sn = [sn for sn in open_windows_sn if not sn.endswith(' (U)')]
-
-    df_list = []  # use list to store individual sheet dataframes
-
-    for sn in tqdm(open_windows_sn):
-        sheet_df = pd.read_excel(xls, sheet_name=sn)
-        sheet_df = sheet_df.loc[~sheet_df['Contract Code'].isna()]
-        sheet_df = sheet_df.loc[sheet_df['Territory'].isin(countries['name']), :]
-        sheet_df = sheet_df.loc[sheet_df['Right'].isin(rights['name']), :]
-        sheet_df['Start Date'] = sheet_df['Start Date'].apply(clean_date)
-        sheet_df['End Date'] = sheet_df['End Date'].apply(
-            lambda x: clean_date(x, start_date=False))
-        sheet_df.columns = [
-            colname.replace(" ", "_").lower() for colname in sheet_df.columns
-        ]
-        sheet_df.loc[(sheet_df['contract_code'].map(len) > 6), 'contract_code'] = sheet_df.loc[(sheet_df['contract_code'].map(len) > 6), 'contract_code'].apply(lambda x: x.split()[0][:-1])
-        sheet_df['window_id_name'] = sheet_df['contract_code'] + \
-            sheet_df['territory'] + sheet_df['right'] + \
-            sheet_df['unique_id'].astype(str)
-        sheet_df['start_confirmed'] = sheet_df['start_e/a'].map({
-            'E': False,
-            'A': True
-        })
-        sheet_df['end_confirmed'] = sheet_df['end_e/a'].map({
-            'E': False,
-            'A': True
-        })
-        sheet_df.drop(['start_e/a', 'end_e/a'], axis=1, inplace=True)
-        sheet_df['title'] = sheet_df['unique_id'].astype(int)
-        sheet_df.drop('unique_id', axis=1, inplace=True)
-        df_list.append(sheet_df)
-
     # concatenating all the dataframes at once
     open_windows = pd.concat(df_list, axis=0, ignore_index=True)
     open_windows['window'] = np.arange(1, open_windows.shape[0] + 1)
-    
+
+    # The names repeated on every window are held as categoricals, and stored dictionary encoded
+    for col in ['contract_code', 'license_type', 'territory', 'right']:
+        open_windows[col] = open_windows[col].astype('category')
+    report.end(rows=open_windows.shape[0])
+
     # Merge dataframes
+    report.start('merge')
     open_windows = open_windows.merge(
         contracts[['contract_code', 'contract']], 
         on='contract_code', 
         how='left'
     )
     open_windows = open_windows.merge(
-        countries[['country', 'name', 'market_region']],
+        countries[['country', 'name']],
         left_on='territory',
         right_on='name',
         how='left'
@@ -379,13 +395,9 @@ def process_data():
     open_windows.drop(['name', 'right_x'], axis=1, inplace=True)
     open_windows.rename(columns={'right_y': 'right'}, inplace=True)
 
-    open_windows = open_windows.merge(
-        titles.reset_index()[['title', 'name']],
-        how='left',
-        on='title'
-    )
-    open_windows['title_name'] = open_windows['name']
-    open_windows.drop('name', axis=1, inplace=True)
+    # The names added by the merges are categoricals as well
+    for col in ['country_name', 'right_name', 'group']:
+        open_windows[col] = open_windows[col].astype('category')
 
     # Create roles table
     talent = talent_df.copy()
@@ -404,19 +416,31 @@ def process_data():
     roles.drop(['talent_full_name','name'], axis=1, inplace=True)
     roles.rename(columns={'unique_id': 'title'}, inplace=True)
     roles['row'] = np.arange(1, roles.shape[0] + 1)
+    report.end(rows=open_windows.shape[0])
 
-    # Save tables to pickle
+    # Save tables to the columnar store
     print('Saving data to disk...')
+    report.start('store')
 
-    # Create an 'data/tables' directory if it does not exist
-    if not os.path.exists(os.path.join(app_dir, 'data', 'tables')):
-        os.makedirs(os.path.join(app_dir, 'data', 'tables'))
+    tables_dir = os.path.join(data_dir, 'tables')
+    tables = {
+        'windows': open_windows,
+        'contracts': contracts,
+        'titles': titles,
+        'people': people,
+        'roles': roles,
+    }
+    for name, table in tables.items():
+        # Only the columns declared in the schema are stored, flag the new ones
+        unused = unused_columns(table.columns, name)
+        if unused:
+            print(f'Columns of the {name} table not used downstream, not stored: {unused}')
+        write_table(table, tables_dir, name)
 
-    open_windows.to_pickle(os.path.join(app_dir, 'data', 'tables', 'windows.pkl'))
-    contracts.to_pickle(os.path.join(app_dir, 'data', 'tables', 'contracts.pkl'))
-    titles.to_pickle(os.path.join(app_dir, 'data', 'tables', 'titles.pkl'))
-    people.to_pickle(os.path.join(app_dir, 'data', 'tables', 'people.pkl'))
-    roles.to_pickle(os.path.join(app_dir, 'data', 'tables', 'roles.pkl'))
+    if cache is not None:
+        cache.save()
+    report.end(rows=open_windows.shape[0])
+    report.save(report_path(output_dir))
 
 if __name__ == '__main__':
     process_data()
\ No newline at end of file
@@ -0,0 +1,271 @@
+import numpy as np
+import pandas as pd
+
+# Dates are handled as int64 day numbers (days since 1970-01-01). A missing date
+# is smaller than any day, so it never wins a max
+NO_DATE = np.iinfo(np.int64).min
+DAY_NS = 86_400_000_000_000
+WEEKS_26_NS = 26 * 7 * DAY_NS
+
+# Keys of a row of the window table
+WINDOW_KEYS = ['title', 'group', 'right_name', 'country_name']
+
+# (contract_type, license_type) pairs the avails rules look at
+SLOTS = [
+    ('Acquisition', 'License'),
+    ('Acquisition', 'Non-Exclusive'),
+    ('Acquisition', 'Holdback'),
+    ('Sales', 'License'),
+    ('Sales', 'Non-Exclusive'),
+    ('Sales', 'Holdback'),
+]
+
+AVAILS_COLUMNS = ['exclusive', 'non-exclusive', 'acq_expires', 'non-exclusive_end_date']
+
+def to_days(dates):
+    """datetime64 values to int64 day numbers, NaT to NO_DATE."""
+    days = np.asarray(dates, dtype='datetime64[ns]').astype('datetime64[D]').astype(np.int64)
+    return np.where(np.isnat(np.asarray(dates, dtype='datetime64[ns]')), NO_DATE, days)
+
+def to_datetime(days):
+    """int64 day numbers to datetime64[ns] values, NO_DATE to NaT."""
+    days = np.asarray(days, dtype=np.int64)
+    return np.where(days == NO_DATE, np.iinfo(np.int64).min, days * DAY_NS).view('datetime64[ns]')
+
+def decode_levels(index):
+    """
+    Turn the categorical levels of a MultiIndex into plain levels of their names.
+
+    Only the level values are decoded and sorted, the rows keep integer codes
+    remapped to the sorted levels, the same index a groupby on the names builds.
+    Grouping and unstacking on the decoded levels only produce the observed names.
+    """
+    index = index.remove_unused_levels()
+    levels, codes = [], []
+    for level, level_codes in zip(index.levels, index.codes):
+        if isinstance(level, pd.CategoricalIndex):
+            level = level.astype(level.categories.dtype)
+            order = level.argsort()
+            # Position of each old code in the sorted level, -1 stays missing
+            rank = np.empty(len(order), dtype=np.int64)
+            rank[order] = np.arange(len(order))
+            level = level[order]
+            level_codes = np.where(level_codes < 0, level_codes, rank[level_codes])
+        levels.append(level)
+        codes.append(level_codes)
+    return pd.MultiIndex(levels=levels, codes=codes, names=index.names, verify_integrity=False)
+
+def build_window_table(windows_df):
+    """
+    Reduce the windows to one row per (title, group, right_name, country_name),
+    with the latest start and end day of each (contract_type, license_type).
+
+    The windows are sorted by row and slot and reduced with `np.maximum.reduceat`,
+    one contiguous interval per (row, slot).
+
+    Params
+    ------
+    windows_df : pandas.DataFrame
+        windows with the WINDOW_KEYS, 'contract_type', 'license_type',
+        'start_date' and 'end_date' columns
+
+    Returns
+    -------
+    pandas.DataFrame
+        Returns a dataframe indexed by WINDOW_KEYS, with int64 day columns named
+        like the window matrix: ('start_date' | 'end_date', contract_type, license_type).
+        Sales end days are moved one day later to make them inclusive.
+    """
+    slot = np.full(windows_df.shape[0], -1, dtype=np.int64)
+    for i, (ct, lt) in enumerate(SLOTS):
+        # Compared as Series, categoricals compare their codes
+        slot[((windows_df['contract_type'] == ct) & (windows_df['license_type'] == lt)).to_numpy()] = i
+    windows_df = windows_df.loc[slot >= 0]
+    slot = slot[slot >= 0]
+
+    grouped = windows_df.groupby(WINDOW_KEYS, dropna=False, sort=True, observed=True)
+    row = grouped.ngroup().to_numpy()
+    index = decode_levels(grouped.size().index)
+    n_rows = len(index)
+
+    # One interval per (row, slot) once the windows are sorted on it
+    cell = row * len(SLOTS) + slot
+    order = np.argsort(cell, kind='stable')
+    cell = cell[order]
+    bounds = np.flatnonzero(np.r_[True, cell[1:] != cell[:-1]])
+    start = to_days(windows_df['start_date'].to_numpy())[order]
+    end = to_days(windows_df['end_date'].to_numpy())[order]
+
+    columns = {}
+    for bound, days in [('start_date', start), ('end_date', end)]:
+        values = np.full(n_rows * len(SLOTS), NO_DATE, dtype=np.int64)
+        if len(cell):
+            values[cell[bounds]] = np.maximum.reduceat(days, bounds)
+        values = values.reshape(n_rows, len(SLOTS))
+        for i, (ct, lt) in enumerate(SLOTS):
+            columns[(bound, ct, lt)] = values[:, i]
+
+    # Add 1 day to the Sales end dates to make them inclusive
+    for ct, lt in SLOTS:
+        if ct == 'Sales':
+            days = columns[('end_date', ct, lt)]
+            columns[('end_date', ct, lt)] = np.where(days == NO_DATE, NO_DATE, days + 1)
+
+    return pd.DataFrame(columns, index=index)
+
+def _as_of_values(as_of_dates):
+    # Timestamps of the as-of dates, now when None
+    return pd.DatetimeIndex([
+        pd.Timestamp('today') if as_of is None else pd.Timestamp(as_of) for as_of in as_of_dates
+    ])
+
+def evaluate_windows_batch(window_table, as_of_dates):
+    """
+    Compute the avails dates of every row of a window table as of several dates,
+    in one pass over the window table.
+
+    The maxima over the window dates do not depend on the as-of date, so they are
+    computed once per row, and only the comparisons with the as-of day and the
+    26 week threshold are broadcast to a (date, row) array.
+
+    Params
+    ------
+    window_table : pandas.DataFrame
+        the output of `build_window_table`
+    as_of_dates : list
+        the dates the avails are computed for
+
+    Returns
+    -------
+    pandas.DataFrame
+        Returns the (as_of, row) pairs with a live acquisition, indexed by 'as_of'
+        and WINDOW_KEYS, with the 'exclusive', 'non-exclusive', 'acq_expires',
+        'non-exclusive_end_date' and 'non-exclusive_fallback' day numbers.
+    """
+    as_of_dates = _as_of_values(as_of_dates)
+    now = as_of_dates.asi8
+    today = (now // DAY_NS)[:, None]
+    # An end day counts when its midnight is at least 26 weeks after now
+    threshold = (-(-(now + WEEKS_26_NS) // DAY_NS))[:, None]
+
+    def col(bound, ct, lt):
+        return window_table[(bound, ct, lt)].to_numpy()
+
+    acq_lic_start = col('start_date', 'Acquisition', 'License')
+    acq_lic_end = col('end_date', 'Acquisition', 'License')
+    acq_ne_start = col('start_date', 'Acquisition', 'Non-Exclusive')
+    acq_ne_end = col('end_date', 'Acquisition', 'Non-Exclusive')
+    acq_hb_end = col('end_date', 'Acquisition', 'Holdback')
+    sales_lic_start = col('start_date', 'Sales', 'License')
+    sales_lic_end = col('end_date', 'Sales', 'License')
+    sales_ne_end = col('end_date', 'Sales', 'Non-Exclusive')
+    sales_hb_start = col('start_date', 'Sales', 'Holdback')
+    sales_hb_end = col('end_date', 'Sales', 'Holdback')
+
+    exclusive_rows = (acq_lic_start != NO_DATE) & (acq_lic_end >= threshold)
+    non_exclusive_rows = (
+        ((acq_lic_start != NO_DATE) | (acq_ne_start != NO_DATE)) &
+        ((acq_lic_end >= threshold) | (acq_ne_end >= threshold))
+    )
+
+    # The exclusive avail starts after every acquisition holdback and every sale
+    exclusive = np.maximum(np.maximum.reduce([
+        acq_lic_start, acq_hb_end, sales_ne_end, sales_lic_end, sales_hb_end
+    ]), today)
+    exclusive = np.where(exclusive_rows, exclusive, NO_DATE)
+
+    # The non-exclusive avail ignores a Sales License that has not started yet
+    fallback = np.maximum(np.maximum.reduce([
+        acq_lic_start, acq_ne_start, acq_hb_end, sales_lic_start, sales_lic_end, sales_hb_end
+    ]), today)
+    before_sale = np.maximum(np.maximum.reduce([
+        acq_lic_start, acq_ne_start, acq_hb_end, sales_hb_end
+    ]), today)
+    non_exclusive = np.where(sales_lic_start > today, before_sale, fallback)
+
+    acq_expires = np.maximum(acq_lic_end, acq_ne_end)
+
+    # The non-exclusive avail ends at the first sale starting while it is open
+    no_end = np.iinfo(np.int64).max
+    non_exclusive_end = np.full(non_exclusive.shape, no_end, dtype=np.int64)
+    for sales_start in [sales_lic_start, sales_hb_start]:
+        valid = (
+            (sales_start != NO_DATE) &
+            (sales_start >= non_exclusive) &
+            (sales_start <= acq_expires)
+        )
+        non_exclusive_end = np.minimum(non_exclusive_end, np.where(valid, sales_start, no_end))
+    non_exclusive_end = np.where(non_exclusive_end == no_end, NO_DATE, non_exclusive_end)
+
+    # Keep the (date, row) pairs with a live acquisition, by date then row
+    date_pos, row_pos = np.nonzero(non_exclusive_rows)
+    index = window_table.index[row_pos]
+    index = pd.MultiIndex.from_arrays(
+        [as_of_dates[date_pos]] + [index.get_level_values(key) for key in WINDOW_KEYS],
+        names=['as_of'] + WINDOW_KEYS
+    )
+    return pd.DataFrame({
+        'exclusive': exclusive[date_pos, row_pos],
+        'non-exclusive': non_exclusive[date_pos, row_pos],
+        'acq_expires': acq_expires[row_pos],
+        'non-exclusive_end_date': non_exclusive_end[date_pos, row_pos],
+        'non-exclusive_fallback': fallback[date_pos, row_pos],
+    }, index=index)
+
+def evaluate_windows(window_table, as_of=None):
+    """
+    Compute the avails dates of every row of a window table.
+
+    Params
+    ------
+    window_table : pandas.DataFrame
+        the output of `build_window_table`
+    as_of : pandas.Timestamp
+        the date the avails are computed for, defaults to now
+
+    Returns
+    -------
+    pandas.DataFrame
+        Returns the rows with a live acquisition and the 'exclusive', 'non-exclusive',
+        'acq_expires', 'non-exclusive_end_date' and 'non-exclusive_fallback' day numbers.
+    """
+    return evaluate_windows_batch(window_table, [as_of]).droplevel('as_of')
+
+def group_avails(rows):
+    """
+    Collapse the evaluated rows to (title, group, country_name) and apply the 26 week rules.
+
+    Params
+    ------
+    rows : pandas.DataFrame
+        the output of `evaluate_windows`, or of `evaluate_windows_batch` to
+        collapse them to (as_of, title, group, country_name)
+
+    Returns
+    -------
+    pandas.DataFrame
+        Returns the 'exclusive', 'non-exclusive', 'acq_expires' and
+        'non-exclusive_end_date' datetime columns of each (title, group, country_name)
+        with at least one avail.
+    """
+    rows = pd.DataFrame({
+        col: to_datetime(rows[col].to_numpy()) for col in rows.columns
+    }, index=rows.index)
+    group_keys = ['title', 'group', 'country_name']
+    if 'as_of' in rows.index.names:
+        group_keys = ['as_of'] + group_keys
+    avails_df = rows.groupby(level=group_keys, observed=True)[AVAILS_COLUMNS + ['non-exclusive_fallback']].max()
+    fallback = avails_df.pop('non-exclusive_fallback')
+
+    # Drop the avails that start less than 26 weeks before the acquisition expires
+    avails_df.loc[avails_df['acq_expires'] - avails_df['exclusive'] < pd.Timedelta(26, 'W'), 'exclusive'] = pd.NaT
+    avails_df.loc[avails_df['acq_expires'] - avails_df['non-exclusive'] < pd.Timedelta(26, 'W'), 'non-exclusive'] = pd.NaT
+
+    # When a sale leaves less than 26 weeks of non-exclusive avail, the non-exclusive
+    # avail starts after every window instead, with no end date
+    short = avails_df['non-exclusive_end_date'] - avails_df['non-exclusive'] < pd.Timedelta(26, 'W')
+    avails_df.loc[short, 'non-exclusive'] = fallback[short]
+    avails_df.loc[short, 'non-exclusive_end_date'] = pd.NaT
+
+    # Drop rows with all NaT values
+    return avails_df.dropna(subset=['exclusive', 'non-exclusive'], how='all')
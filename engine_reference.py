@@ -0,0 +1,188 @@
+import numpy as np
+import pandas as pd
+
+# The wide window matrix implementation of the avails that the engine replaced,
+# kept as the reference the tests and the benchmarks check the engine against,
+# with the random windows they run it on
+
+def _datetime_values(column):
+    # datetime64[ns] values of a column that may hold Timestamps, dates or NaT
+    return pd.to_datetime(column).to_numpy(dtype='datetime64[ns]')
+
+def max_dates(window_mat, today=None):
+    """
+    Vectorized `benchmarks._max_date` over the rows of a window matrix.
+
+    Params
+    ------
+    window_mat : pandas.DataFrame
+        window matrix with the ('start_date', 'Sales', 'License') and
+        ('end_date', 'Sales', 'License') columns, missing dates filled
+    today : pandas.Timestamp
+        the date the avails are computed for, defaults to now
+
+    Returns
+    -------
+    pandas.Series
+        Returns the max date of each row, ignoring the Sales License dates of
+        the rows where that license has not started yet.
+    """
+    if today is None:
+        today = pd.to_datetime('today')
+    values = np.column_stack([
+        _datetime_values(window_mat[col]) for col in window_mat.columns
+    ]).view('i8')
+    sales_cols = [
+        window_mat.columns.get_loc(('start_date', 'Sales', 'License')),
+        window_mat.columns.get_loc(('end_date', 'Sales', 'License')),
+    ]
+    other_cols = [i for i in range(values.shape[1]) if i not in sales_cols]
+    future_sale = values[:, sales_cols[0]] > pd.Timestamp(today).value
+    result = np.where(
+        future_sale,
+        values[:, other_cols].max(axis=1),
+        values.max(axis=1)
+    )
+    return pd.Series(result.view('datetime64[ns]'), index=window_mat.index)
+
+def non_exclusive_end_dates(window_mat):
+    """
+    Vectorized `benchmarks._non_exclusive_end_date` over the rows of a window matrix.
+
+    Params
+    ------
+    window_mat : pandas.DataFrame
+        the non-exclusive start date, the acquisition expiry date and two
+        sales start dates, in this order
+
+    Returns
+    -------
+    pandas.Series
+        Returns the earliest sales start date that falls between the non-exclusive
+        start date and the acquisition expiry date of each row, or NaT.
+    """
+    start = _datetime_values(window_mat.iloc[:, 0])
+    end = _datetime_values(window_mat.iloc[:, 1])
+    sales_dates = np.column_stack([
+        _datetime_values(window_mat.iloc[:, 2]),
+        _datetime_values(window_mat.iloc[:, 3]),
+    ])
+    # Comparisons with NaT are False, so missing dates are never valid
+    valid = (sales_dates >= start[:, None]) & (sales_dates <= end[:, None])
+    no_date = np.iinfo(np.int64).max
+    result = np.where(valid, sales_dates.view('i8'), no_date).min(axis=1)
+    result = np.where(result == no_date, np.datetime64('NaT', 'ns').view('i8'), result)
+    return pd.Series(result.view('datetime64[ns]'), index=window_mat.index)
+
+def window_matrix_avails(windows_df, as_of=None):
+    """
+    Compute the avails of the windows with one wide window matrix, as
+    `engine.build_window_table`, `engine.evaluate_windows` and `engine.group_avails` do.
+
+    Params
+    ------
+    windows_df : pandas.DataFrame
+        windows with the 'title', 'group', 'right_name', 'country_name',
+        'contract_type', 'license_type', 'start_date' and 'end_date' columns.
+        Every (contract_type, license_type) slot of the engine must appear
+    as_of : pandas.Timestamp
+        the date the avails are computed for, defaults to now
+
+    Returns
+    -------
+    pandas.DataFrame
+        Returns the 'exclusive', 'non-exclusive', 'acq_expires' and
+        'non-exclusive_end_date' columns of each (title, group, country_name)
+        with at least one avail.
+    """
+    as_of = pd.Timestamp('today') if as_of is None else pd.Timestamp(as_of)
+    window_mat = windows_df.groupby([
+        'title', 'group', 'right_name', 'country_name', 'contract_type', 'license_type'
+    ], dropna=False).agg({'start_date': np.max, 'end_date': np.max})
+    window_mat.loc[pd.IndexSlice[:,:,:,:,'Sales', :], 'end_date'] += pd.Timedelta(1, 'D')
+    window_mat = window_mat.unstack(level=[-2, -1])
+    window_mat['today'] = as_of.date()
+    live = as_of + pd.Timedelta(26, 'W')
+
+    st_date_excl = window_mat.loc[
+        (~window_mat[('start_date', 'Acquisition', 'License')].isna()) &
+        (window_mat[('end_date', 'Acquisition', 'License')] >= live)
+    ][[
+        ('start_date', 'Acquisition', 'License'),
+        ('end_date', 'Acquisition', 'Holdback'),
+        ('end_date', 'Sales', 'Non-Exclusive'),
+        ('end_date', 'Sales', 'License'),
+        ('end_date', 'Sales', 'Holdback'),
+        ('today', '', ''),
+    ]].fillna(pd.Timestamp.min)
+    avails_df = pd.DataFrame(st_date_excl.values.max(axis=1), columns=['exclusive'], index=st_date_excl.index)
+
+    non_excl_rows = (
+        (~window_mat[('start_date', 'Acquisition', 'License')].isna() |
+        (~window_mat[('start_date', 'Acquisition', 'Non-Exclusive')].isna())) &
+        ((window_mat[('end_date', 'Acquisition', 'License')] >= live) |
+        (window_mat[('end_date', 'Acquisition', 'Non-Exclusive')] >= live))
+    )
+    st_date_non_excl = window_mat.loc[non_excl_rows][[
+        ('start_date', 'Acquisition', 'License'),
+        ('start_date', 'Acquisition', 'Non-Exclusive'),
+        ('end_date', 'Acquisition', 'Holdback'),
+        ('start_date', 'Sales', 'License'),
+        ('end_date', 'Sales', 'License'),
+        ('end_date', 'Sales', 'Holdback'),
+        ('today', '', ''),
+    ]].fillna(pd.Timestamp.min)
+    st_date_non_excl['non-exclusive'] = max_dates(st_date_non_excl, today=as_of)
+    avails_df = avails_df.join(st_date_non_excl[['non-exclusive']], how='outer')
+    avails_df.columns = [''.join(col) for col in avails_df.columns]
+
+    acq_exp = window_mat.loc[non_excl_rows][[
+        ('end_date', 'Acquisition', 'License'),
+        ('end_date', 'Acquisition', 'Non-Exclusive'),
+    ]].fillna(pd.Timestamp.min)
+    avails_df['acq_expires'] = acq_exp.values.max(axis=1)
+    non_excl_end_date = avails_df[['non-exclusive', 'acq_expires']].join(
+        window_mat[[('start_date', 'Sales', 'License'), ('start_date', 'Sales', 'Holdback')]], how='left'
+    )
+    avails_df['non-exclusive_end_date'] = non_exclusive_end_dates(non_excl_end_date)
+    avails_df = avails_df.reset_index().groupby(['title', 'group', 'country_name'])[[
+        'exclusive', 'non-exclusive', 'acq_expires', 'non-exclusive_end_date'
+    ]].max()
+    avails_df.loc[avails_df['acq_expires'] - avails_df['exclusive'] < pd.Timedelta(26, 'W'), 'exclusive'] = pd.NaT
+    avails_df.loc[avails_df['acq_expires'] - avails_df['non-exclusive'] < pd.Timedelta(26, 'W'), 'non-exclusive'] = pd.NaT
+
+    non_exclusive_dates = pd.DataFrame(st_date_non_excl.drop(st_date_non_excl.columns[-1], axis=1).max(axis=1).rename('non-exclusive'))
+    non_exclusive_dates['non-exclusive_end_date'] = pd.NaT
+    non_exclusive_dates = non_exclusive_dates.groupby(['title', 'group', 'country_name']).max()
+    avails_df.loc[
+        avails_df['non-exclusive_end_date'] - avails_df['non-exclusive'] < pd.Timedelta(26, 'W'),
+        ['non-exclusive', 'non-exclusive_end_date']
+    ] = non_exclusive_dates
+    return avails_df.dropna(subset=['exclusive', 'non-exclusive'], how='all')
+
+def random_windows(rng, n, titles, origin=None):
+    """
+    `n` random windows of `titles` titles over every slot of the engine, starting
+    from 8 years before to 4 years after `origin`, today by default.
+    """
+    if origin is None:
+        origin = pd.Timestamp('today')
+    rights = ['SVOD', 'AVOD', 'Free TV', 'Basic Pay TV (Local)', 'Premium Pay TV (Local)']
+    countries = ['Mexico', 'Brazil', 'Argentina', 'Chile', 'Colombia', 'Peru', 'Spain', 'Puerto Rico']
+    slots = [
+        ('Acquisition', 'License'), ('Acquisition', 'License'), ('Acquisition', 'Non-Exclusive'),
+        ('Acquisition', 'Holdback'), ('Sales', 'License'), ('Sales', 'Non-Exclusive'), ('Sales', 'Holdback'),
+    ]
+    right_name = np.array(rights)[rng.integers(0, len(rights), n)]
+    slot = rng.integers(0, len(slots), n)
+    start = pd.Timestamp(origin).normalize() + pd.to_timedelta(rng.integers(-365 * 8, 365 * 4, n), unit='D')
+    return pd.DataFrame({
+        'title': rng.integers(0, titles, n),
+        'group': right_name,
+        'right_name': right_name,
+        'country_name': np.array(countries)[rng.integers(0, len(countries), n)],
+        'contract_type': np.array([ct for ct, _ in slots])[slot],
+        'license_type': np.array([lt for _, lt in slots])[slot],
+        'start_date': start,
+        'end_date': start + pd.to_timedelta(rng.integers(180, 365 * 10, n), unit='D'),
+    })
@@ -0,0 +1,194 @@
+import os
+import math
+import datetime
+import numpy as np
+import pandas as pd
+import xlsxwriter
+from concurrent.futures import ProcessPoolExecutor
+
+# Same number formats as pandas' Excel writer
+DATE_FORMAT = 'YYYY-MM-DD'
+DATETIME_FORMAT = 'YYYY-MM-DD HH:MM:SS'
+
+COLUMN_WIDTH = 30
+ROW_HEIGHT = 50
+
+class _Formats:
+    # One format object per (cell kind, number format), shared by every cell of the workbook
+    def __init__(self, workbook):
+        self.workbook = workbook
+        self.formats = {}
+
+    def get(self, kind, num_format=None):
+        key = (kind, num_format)
+        if key not in self.formats:
+            properties = {
+                'header': {'bold': True, 'align': 'center'},
+                'first': {'bold': True, 'align': 'left', 'font_size': 11},
+                'body': {'text_wrap': True, 'font_size': 11},
+            }[kind]
+            if num_format is not None:
+                properties = {**properties, 'num_format': num_format}
+            self.formats[key] = self.workbook.add_format(properties)
+        return self.formats[key]
+
+def _is_missing(value):
+    # Empty strings are left blank, as pandas' writer does
+    if value is None or value is pd.NaT or (isinstance(value, str) and value == ''):
+        return True
+    if isinstance(value, float):
+        return math.isnan(value)
+    if isinstance(value, np.floating):
+        return np.isnan(value)
+    return False
+
+def _write_cell(ws, row, col, value, formats, kind, date_column):
+    if _is_missing(value):
+        # Blank date cells keep the date format, for the dates typed in later
+        ws.write_blank(row, col, None, formats.get(kind, DATE_FORMAT if date_column else None))
+    elif isinstance(value, str):
+        ws.write_string(row, col, value, formats.get(kind))
+    elif isinstance(value, (bool, np.bool_)):
+        ws.write_boolean(row, col, bool(value), formats.get(kind))
+    elif isinstance(value, (int, float, np.integer, np.floating)):
+        ws.write_number(row, col, value, formats.get(kind))
+    elif isinstance(value, datetime.datetime):
+        num_format = DATE_FORMAT if date_column else DATETIME_FORMAT
+        ws.write_datetime(row, col, value, formats.get(kind, num_format))
+    elif isinstance(value, datetime.date):
+        ws.write_datetime(row, col, value, formats.get(kind, DATE_FORMAT))
+    else:
+        ws.write_string(row, col, str(value), formats.get(kind))
+
+def write_sheet(workbook, formats, sheet_name, df, date_columns=()):
+    """
+    Stream a dataframe to a new worksheet, row by row.
+
+    Params
+    ------
+    workbook : xlsxwriter.Workbook
+        workbook to add the worksheet to
+    formats : _Formats
+        the formats of the workbook
+    sheet_name : str
+        name of the worksheet
+    df : pandas.DataFrame
+        data to write, the column names are written as the header
+    date_columns : list
+        positions of the columns shown as 'YYYY-MM-DD', whether they hold dates or datetimes
+    """
+    ws = workbook.add_worksheet(sheet_name)
+    n_rows, n_cols = df.shape
+
+    # Sheet-level layout: column widths, row heights, filter and frozen panes
+    if n_cols:
+        ws.set_column(0, n_cols - 1, COLUMN_WIDTH)
+        ws.autofilter(0, 0, n_rows, n_cols - 1)
+    ws.set_default_row(ROW_HEIGHT)
+    ws.freeze_panes(1, 2)
+
+    date_columns = set(date_columns)
+    for col, colname in enumerate(df.columns):
+        ws.write_string(0, col, str(colname), formats.get('header'))
+
+    for row, values in enumerate(df.itertuples(index=False, name=None), start=1):
+        for col, value in enumerate(values):
+            kind = 'first' if col == 0 else 'body'
+            _write_cell(ws, row, col, value, formats, kind, col in date_columns)
+
+def write_workbook(file_path, sheets, date_columns=()):
+    """
+    Write styled worksheets to an .xlsx file in a single pass.
+
+    The header row is bold and centered, the first column bold and left aligned,
+    and the other cells wrap their text. Every column is 30 wide and every row 50
+    high, with a filter over the data and the panes frozen at C2. The workbook is
+    written in constant memory mode, so each row is flushed to disk once written.
+
+    Params
+    ------
+    file_path : str
+        path of the .xlsx file
+    sheets : list
+        (sheet_name, dataframe) pairs, in the order of the worksheets
+    date_columns : list
+        positions of the columns shown as 'YYYY-MM-DD' in every worksheet
+    """
+    workbook = xlsxwriter.Workbook(file_path, {
+        'constant_memory': True,
+        'nan_inf_to_errors': True,
+    })
+    try:
+        formats = _Formats(workbook)
+        for sheet_name, df in sheets:
+            write_sheet(workbook, formats, sheet_name, df, date_columns)
+    finally:
+        workbook.close()
+
+def _write_workbook_job(job):
+    file_path, sheets, date_columns = job
+    write_workbook(file_path, sheets, date_columns)
+    return file_path
+
+def write_workbooks(jobs, workers=None):
+    """
+    Write several workbooks, in a process pool when more than one worker is used.
+
+    Params
+    ------
+    jobs : list
+        (file_path, sheets, date_columns) arguments of `write_workbook`
+    workers : int
+        number of worker processes, defaults to the number of CPUs
+
+    Returns
+    -------
+    list
+        Returns the paths of the written workbooks.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(jobs)))
+    if workers == 1:
+        return [_write_workbook_job(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_write_workbook_job, jobs))
+
+def partition_file_name(partition):
+    # Partition names are used as file names, e.g. a country name
+    return str(partition).replace('/', '-').replace(os.sep, '-') + '.xlsx'
+
+def write_partitions(file_path, partitions, date_columns=(), partition_dir=None, workers=None):
+    """
+    Write one worksheet per partition to a workbook, and optionally one workbook
+    per partition to `partition_dir`.
+
+    The workbooks are independent, so they are written concurrently by `write_workbooks`.
+
+    Params
+    ------
+    file_path : str
+        path of the workbook with every partition
+    partitions : list
+        (name, dataframe) pairs, the name is used as the sheet name and the file name
+    date_columns : list
+        positions of the columns shown as 'YYYY-MM-DD'
+    partition_dir : str
+        directory of the per partition workbooks, or None to only write `file_path`
+    workers : int
+        number of worker processes, defaults to the number of CPUs
+
+    Returns
+    -------
+    list
+        Returns the paths of the written workbooks.
+    """
+    jobs = [(file_path, partitions, date_columns)]
+    if partition_dir is not None:
+        if not os.path.exists(partition_dir):
+            os.makedirs(partition_dir)
+        jobs += [
+            (os.path.join(partition_dir, partition_file_name(name)), [(name, df)], date_columns)
+            for name, df in partitions
+        ]
+    return write_workbooks(jobs, workers=workers)
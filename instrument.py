@@ -0,0 +1,132 @@
+import os
+import sys
+import json
+import time
+import datetime
+import cProfile
+
+# The resource module is not available on Windows, where the peak RSS is not recorded
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Number of runs kept in the run report
+MAX_RUNS = 50
+
+def report_path(output_dir):
+    """Path of the run report, next to the avails outputs."""
+    return os.path.join(output_dir, 'run_report.json')
+
+def _peak_rss_mb(who):
+    if resource is None:
+        return None
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def _cpu_seconds():
+    cpu = time.process_time()
+    if resource is not None:
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu += children.ru_utime + children.ru_stime
+    return cpu
+
+class RunReport:
+    """
+    Wall time, CPU time, peak RSS and row counts of the named stages of a run.
+
+    Stages run one after the other: `start` ends the running stage, if any, and
+    `end` records it. The CPU time includes the
+    worker processes that ended during the stage, and the peak RSS is the high
+    water mark of the process (and of its largest worker) when the stage ended.
+
+    Params
+    ------
+    profile_dir : str
+        directory to write a cProfile dump of every stage to, `<stage>.prof`,
+        or None to not profile
+    """
+
+    def __init__(self, profile_dir=None):
+        self.profile_dir = profile_dir
+        self.started = datetime.datetime.now().isoformat(timespec='milliseconds')
+        self.stages = []
+        self._current = None
+
+    def start(self, name):
+        """Start a stage, ending the running one."""
+        if self._current is not None:
+            self.end()
+        profiler = None
+        if self.profile_dir is not None:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        self._current = {
+            'name': name,
+            'wall': time.perf_counter(),
+            'cpu': _cpu_seconds(),
+            'profiler': profiler,
+        }
+
+    def end(self, rows=None, status='ok', counts=None):
+        """
+        End the running stage, with the number of rows it produced and other
+        counts to record with it, e.g. {'cache_hits': 10, 'cache_misses': 2}.
+        """
+        current, self._current = self._current, None
+        if current is None:
+            return
+        record = {
+            'stage': current['name'],
+            'status': status,
+            'wall_seconds': time.perf_counter() - current['wall'],
+            'cpu_seconds': _cpu_seconds() - current['cpu'],
+            'peak_rss_mb': _peak_rss_mb(resource.RUSAGE_SELF) if resource else None,
+            'children_peak_rss_mb': _peak_rss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+            'rows': rows,
+        }
+        if counts:
+            record.update(counts)
+        if current['profiler'] is not None:
+            current['profiler'].disable()
+            if not os.path.exists(self.profile_dir):
+                os.makedirs(self.profile_dir)
+            profile_fp = os.path.join(self.profile_dir, current['name'].replace(' ', '_') + '.prof')
+            current['profiler'].dump_stats(profile_fp)
+            record['profile'] = profile_fp
+        self.stages.append(record)
+
+    def to_dict(self):
+        return {
+            'started': self.started,
+            'python': sys.version.split()[0],
+            'stages': self.stages,
+            'wall_seconds': sum(stage['wall_seconds'] for stage in self.stages),
+            'cpu_seconds': sum(stage['cpu_seconds'] for stage in self.stages),
+        }
+
+    def save(self, file_path):
+        """
+        Write the report as JSON. A stage still running is recorded as failed.
+
+        The file holds the reports of the last MAX_RUNS runs, oldest first, under
+        'runs'. Each run has its own stages and totals, keyed by the time it
+        started: saving the same run again replaces its report, so a run that
+        saves after each stage ends up with a single report.
+        """
+        if self._current is not None:
+            self.end(status='failed')
+        if not os.path.exists(os.path.dirname(file_path)):
+            os.makedirs(os.path.dirname(file_path))
+        runs = []
+        if os.path.isfile(file_path):
+            try:
+                with open(file_path) as f:
+                    runs = json.load(f)['runs']
+            except (OSError, ValueError, KeyError, TypeError):
+                # An unreadable report, or one from before the runs were kept, is replaced
+                runs = []
+        runs = [run for run in runs if run.get('started') != self.started] + [self.to_dict()]
+        with open(file_path, 'w') as f:
+            json.dump({'runs': runs[-MAX_RUNS:]}, f, indent=2)
@@ -1,11 +1,10 @@
 import os
 import sys
+import multiprocessing
 import tkinter
 from tkinter import messagebox
-import pandas as pd
-from utils import get_app_dir
-from data_process import process_data
-from avails import avails_process
+from paths import get_app_dir
+from instrument import RunReport, report_path
 
 def main():
     # Display a message box to state that the program is running
@@ -13,18 +12,34 @@ def main():
     root.withdraw()
     messagebox.showinfo("Data Processing", "Data processing started. Click OK to continue.")
 
+    # The stages, and pandas, numpy and openpyxl with them, are only imported once the
+    # first dialog is up, so the executable shows something as soon as it starts
+    from data_process import process_data
+    from avails import avails_process
+
+    # Both stages record their timings in the same run report. Set AVAILS_PROFILE_DIR
+    # to also write a cProfile dump of every stage
+    app_dir = get_app_dir()
+    report = RunReport(profile_dir=os.environ.get('AVAILS_PROFILE_DIR'))
+
     # Process the data
     try:
-        process_data()
+        process_data(report=report)
         # Display completion message
         print("Data processing complete! Please wait while Avails are being generated.")
+    except FileNotFoundError as e:
+        # A required input file is missing
+        root = tkinter.Tk()
+        root.withdraw()
+        messagebox.showerror("Error", str(e))
+        sys.exit(1)
     except Exception as e:
         # Display error message
         root = tkinter.Tk()
         root.withdraw()
         messagebox.showerror("Error", "An error occurred while processing the data. Please check the log file for more information.")
-        # Write error message to log file
-        app_dir = get_app_dir()
+        # Write error message to log file, and the report of the stages that ran
+        report.save(report_path(os.path.join(app_dir, 'avails')))
         log_file = os.path.join(app_dir, 'error.log')
         with open(log_file, 'w') as f:
             f.write(str(e))
@@ -32,14 +47,14 @@ def main():
 
     # Process Avails
     try:
-        avails_process()
+        avails_process(report=report)
     except Exception as e:
         # Display error message
         root = tkinter.Tk()
         root.withdraw()
         messagebox.showerror("Error", "An error occurred while processing the Avails. Please check the log file for more information.")
-        # Write error message to log file
-        app_dir = get_app_dir()
+        # Write error message to log file, and the report of the stages that ran
+        report.save(report_path(os.path.join(app_dir, 'avails')))
         log_file = os.path.join(app_dir, 'error.log')
         with open(log_file, 'w') as f:
             f.write(str(e))
@@ -50,4 +65,6 @@ def main():
     messagebox.showinfo("Task Completed", "Avails processing complete! Check the avails folder for the output files. Click OK to exit.")
 
 if __name__ == '__main__':
+    # Required for the process pool in the frozen (PyInstaller) executable
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,19 @@
+import os
+import sys
+
+# Path helpers used at startup, before the data stack (pandas, numpy, openpyxl) is imported
+
+def get_app_dir():
+    """Get the directory where the executable or script is located."""
+    if getattr(sys, 'frozen', False):
+        # Running in a bundle (PyInstaller executable)
+        application_path = os.path.dirname(sys.executable)
+    else:
+        # Running in a normal Python environment
+        application_path = os.path.dirname(os.path.abspath(__file__))
+    return application_path
+
+def check_file(data_file):
+    # Check if the files exists. The GUI and the CLI report the error
+    if not os.path.isfile(data_file):
+        raise FileNotFoundError(f"Required file not found: {data_file}")
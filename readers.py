@@ -0,0 +1,188 @@
+import zipfile
+import xml.etree.ElementTree as ET
+from openpyxl import load_workbook
+from pandas.io.parsers import TextParser
+
+# Columns of 'Contract Summary.xlsx' read by the ingest, after normalize_contract_col.
+# The contracts table keeps the columns declared in schema.TABLE_SCHEMAS
+contract_summary_cols = [
+#    'support_code',
+    'contract_id',
+    'contract_type',
+#    'licensor',
+    'distributor',
+#    'projects',
+#    'project_codes',
+#    'territories',
+#    'regions',
+#    'zone',
+#    'languages',
+    'status',
+#    'deal_status',
+    'creation_date',
+#    'deal_type',
+#    'isestimatedstartdate',
+#    'start_date',
+#    'end_date',
+#    'isestimatedenddate',
+#    'start_date_note',
+#    'end_date_note',
+#    'fully_executed',
+#    'nod',
+#    'outside_delivery_date',
+#    'deal_memo_date',
+#    'mg_usd',
+#    'mg',
+#    'cur',
+#   'exchange_rate',
+#    'payment_data',
+#    'invoice_data',
+#    'additional_terms',
+#    'total_invoiced',
+#    'total_paid',
+#    'total_balance',
+#    'total_invoiced_usd',
+#    'total_paid_usd',
+#    'right_group_summary',
+#    'right_summary',
+#  'notes'
+]
+
+# Columns of 'Project List.xlsx' read into the titles table, see schema.TABLE_SCHEMAS
+titles_cols = [
+    'Title',
+#    'AKA 1',
+#    'AKA 2',
+#    'Adj. Running Time',
+#    'Associate Producer',
+#    'Budget',
+#    'Business Unit',
+#    'Cast Crew - Summary Tab',
+#    'Cast Member',
+#    'Copyright Holder',
+#  'Copyright Year',
+    'Country of Origin',
+    'Dialogue Language',
+#    'Director',
+#    'Exploitation',
+#    'External Comments',
+    'Genre',
+#    'IMDB Code',
+#   'Internal Comments',
+#    'Logline',
+#   'Motion Picture Association of America',
+#    'Number of Episodes',
+#    'Number of Seasons',
+    'Original Format',
+    'Original Language',
+#    'Producer',
+#    'Production Company',
+#    'Project Code',
+#    'Project Group',
+#    'Project Type',
+#    'Rating',
+#   'Release Date',
+    'Running Time',
+#  'Sales Agency',
+#    'Season',
+#    'Short Synopsis',
+#    'Status',
+    'Subtitle Language',
+    'Synopsis',
+#    'Title Code',
+    'Unique Id',
+#   'Web Synopsis',
+    'Website',
+#    'Writer',
+    'Year Completed'
+]
+
+# Columns of 'Project List.xlsx' exploded into the roles table
+talent_cols = {
+    'Cast Member': 'Cast',
+    'Director': 'Director',
+    'Producer': 'Producer',
+    'Writer': 'Writer',
+}
+
+def normalize_contract_col(colname):
+    return colname.replace(" ","_").replace("/Conditions", "").replace("#","Id").lower()
+
+def _convert_cell(value):
+    # Same conversions as pandas' openpyxl reader
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def read_columns(file_path, usecols=None, normalize=None, sheet_name=None):
+    """
+    Stream the rows of a sheet from a read-only workbook, keeping only the
+    requested columns.
+
+    Params
+    ------
+    file_path : str
+        path of the .xlsx file
+    usecols : list
+        header names to keep, or None to keep every column
+    normalize : callable
+        applied to the header names before matching them against `usecols`
+    sheet_name : str
+        sheet to read, defaults to the first sheet
+
+    Returns
+    -------
+    pandas.DataFrame
+        Returns a dataframe with the original header names of the kept columns,
+        parsed the same way as `pandas.read_excel`.
+    """
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name] if sheet_name is not None else wb.worksheets[0]
+        ws.reset_dimensions()
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, ())
+        keep = [
+            i for i, colname in enumerate(header)
+            if usecols is None or (
+                colname is not None and
+                (normalize(str(colname)) if normalize else str(colname)) in usecols
+            )
+        ]
+        data = [[_convert_cell(header[i]) for i in keep]]
+        last_row_with_data = 0
+        for row in rows:
+            if any(value is not None for value in row):
+                last_row_with_data = len(data)
+            data.append([_convert_cell(row[i]) if i < len(row) else '' for i in keep])
+        # Trim trailing empty rows
+        data = data[:last_row_with_data + 1]
+    finally:
+        wb.close()
+
+    return TextParser(data, header=0, skip_blank_lines=False).read()
+
+def sheet_names(file_path):
+    # Read the sheet names from the workbook part only, without loading the cells
+    with zipfile.ZipFile(file_path) as zf:
+        workbook = ET.fromstring(zf.read('xl/workbook.xml'))
+    return [
+        sheet.get('name')
+        for sheet in workbook.iter('{http://schemas.openxmlformats.org/spreadsheetml/2006/main}sheet')
+    ]
+
+def read_contract_summary(file_path):
+    return read_columns(file_path, contract_summary_cols, normalize_contract_col)
+
+def read_project_list(file_path):
+    return read_columns(file_path, titles_cols + list(talent_cols))
+
+def read_title_metadata(file_path):
+    # Every column of the metadata export is joined onto the titles table
+    return read_columns(file_path)
+
+def read_ratings(file_path):
+    # Every column of the ratings export is joined onto the titles table
+    return read_columns(file_path).set_index('Unique Identifier')
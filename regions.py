@@ -0,0 +1,262 @@
+import numpy as np
+
+LATAM_COUNTRIES = [
+    'Costa Rica',
+    'El Salvador',
+    'Guatemala',
+    'Honduras',
+    'Nicaragua',
+    'Panama',
+    'Mexico',
+    'Argentina',
+    'Bolivia',
+    'Brazil',
+    'Chile',
+    'Colombia',
+    'Ecuador',
+    'Paraguay',
+    'Peru',
+    'Uruguay',
+    'Venezuela'
+]
+
+LATAM_EX_MEX = [
+    'Costa Rica',
+    'El Salvador',
+    'Guatemala',
+    'Honduras',
+    'Nicaragua',
+    'Panama',
+    'Argentina',
+    'Bolivia',
+    'Brazil',
+    'Chile',
+    'Colombia',
+    'Ecuador',
+    'Paraguay',
+    'Peru',
+    'Uruguay',
+    'Venezuela'
+]
+
+LATAM_EX_BRZ = [
+    'Costa Rica',
+    'El Salvador',
+    'Guatemala',
+    'Honduras',
+    'Nicaragua',
+    'Panama',
+    'Mexico',
+    'Argentina',
+    'Bolivia',
+    'Chile',
+    'Colombia',
+    'Ecuador',
+    'Paraguay',
+    'Peru',
+    'Uruguay',
+    'Venezuela'
+]
+
+LATAM_EX_MEX_BRZ = [
+    'Costa Rica',
+    'El Salvador',
+    'Guatemala',
+    'Honduras',
+    'Nicaragua',
+    'Panama',
+    'Argentina',
+    'Bolivia',
+    'Chile',
+    'Colombia',
+    'Ecuador',
+    'Paraguay',
+    'Peru',
+    'Uruguay',
+    'Venezuela'
+]
+
+CARIBBEAN = [
+    'Anguilla',
+    'Antigua and Barbuda',
+    'Aruba',
+    'Bahamas',
+    'Barbados',
+    'Bermuda',
+    'Bonaire',
+    'British Virgin Islands',
+    'Cayman Islands',
+    'Cuba',
+    'Curaçao',
+    'Dominica',
+    'Dominican Republic',
+    'Grenada',
+    'Guadeloupe',
+    'Haiti',
+    'Jamaica',
+    'Martinique',
+    'Montserrat',
+    'Puerto Rico',
+    'Saint Barthélemy',
+    'Saint Kitts and Nevis',
+    'Saint Lucia',
+    'Saint Vincent and the Grenadines',
+    'Sint Eustatius',
+    'Sint Maarten',
+    'Trinidad and Tobago',
+    'Turks and Caicos Islands',
+    'United States Virgin Islands',
+]
+
+DEPENDENCIES = ['Guyana', 'French Guiana', 'Suriname', 'Belize']
+
+WORLD = frozenset(['Moldova', 'Malaysia', 'Qatar', 'Luxembourg', 'Portugal', 'Kenya', 'United Kingdom', 'Ghana', 'Andorra', 'South Korea', 'Latvia', 'Mayotte', 'Comoros', 'Turkmenistan', 'South Africa', 'Ukraine', 'Singapore', 'Kazakhstan', 'India', 'Slovenia', 'Bahrain', 'Indonesia', 'Lebanon', 'Tajikistan', 'Cambodia', 'Syria', 'Cameroon', 'Burundi', 'Tonga', 'Lithuania', 'Gabon', 'Bosnia and Herzegovina', 'Romania', 'Finland', 'Spain', 'Mauritania', 'Croatia', 'Djibouti', 'Bulgaria', 'Tanzania', 'South Sudan', 'Greece', 'Sudan', 'Brunei', 'Vietnam', 'North Korea', 'Philippines', 'Pakistan', 'Papua New Guinea', 'Uzbekistan', 'Sweden', 'Azerbaijan', 'New Zealand', 'Liberia', 'Vanuatu', 'Yemen', 'Russia', 'Czech Republic', 'Taiwan', 'Mongolia', 'Senegal', 'Botswana', 'Georgia', 'Serbia', 'United Arab Emirates', 'Iran', 'France', 'Saudi Arabia', 'Liechtenstein', 'Uganda', 'Zambia', 'Montenegro', 'Cyprus', 'Bermuda', 'Puerto Rico', 'Australia', 'Central African Republic', 'Iceland', 'Burkina Faso', 'Germany', 'Algeria', 'Denmark', 'Malta', 'Benin', 'Hungary', 'Solomon Islands', 'Bangladesh', 'Mauritius', 'Nepal', 'Norway', 'Lesotho', 'Belgium', 'Kyrgyzstan', 'New Caledonia', 'Fiji', 'Italy', 'Malawi', 'Bahamas', 'Seychelles', 'Madagascar', 'Sri Lanka', 'Kosovo', 'Israel', 'Laos', 'Togo', 'Canada', 'Guinea', 'Zimbabwe', 'French Polynesia', 'Albania', 'China', 'Mali', 'Ethiopia', 'Morocco', 'Namibia', 'Egypt', 'Japan', 'Bhutan', 'Belarus', 'Sierra Leone', 'Equatorial Guinea', 'Jordan', 'Estonia', 'Armenia', 'Turkey', 'Chad', 'Rwanda', 'Guinea-Bissau', 'Hong Kong', 'Switzerland', 'Nigeria', 'Kuwait', 'Monaco', 'Poland', 'Eritrea', 'Afghanistan', 'Iraq', 'Tuvalu', 'Mozambique', 'Ireland', 'Kiribati', 'Niger', 'Angola', 'Tunisia', 'Slovakia', 'Somalia', 'Libya', 'Thailand', 'Austria', 'Oman'])
+
+# Region labels in the order they are tested by classify_regions
+REGION_LABELS = [
+    'All Latam',
+    'Latam excluding Mexico',
+    'Latam excluding Brazil',
+    'Latam excluding Mexico and Brazil',
+    'Worldwide',
+    'Worldwide excluding Latam',
+]
+
+def country_bitmasks(group_ids, country_ids, n_groups, n_words):
+    """
+    OR the country ids of each group into one bitmask per group.
+
+    Params
+    ------
+    group_ids : array-like
+        the group (row of the result) of each country id
+    country_ids : array-like
+        the country ids, used as bit positions
+    n_groups : int
+        number of groups
+    n_words : int
+        number of 64 bit words per bitmask
+
+    Returns
+    -------
+    numpy.ndarray
+        Returns an array of shape (n_groups, n_words) of uint64 words.
+    """
+    masks = np.zeros((n_groups, n_words), dtype=np.uint64)
+    country_ids = np.asarray(country_ids, dtype=np.int64)
+    bits = np.left_shift(np.uint64(1), (country_ids % 64).astype(np.uint64))
+    np.bitwise_or.at(masks, (np.asarray(group_ids, dtype=np.int64), country_ids // 64), bits)
+    return masks
+
+def popcount(masks):
+    """Number of bits set in each bitmask row."""
+    masks = np.ascontiguousarray(masks)
+    return np.unpackbits(masks.view(np.uint8), axis=1).sum(axis=1)
+
+def bitmask_names(masks, names):
+    """
+    Render each bitmask row as the comma separated names of its bits, sorted.
+
+    Rows with the same bits share one string, each distinct bitmask is rendered
+    once.
+
+    Params
+    ------
+    masks : numpy.ndarray
+        bitmasks of shape (n_rows, n_words), built with `country_bitmasks`
+    names : dict
+        the name of each bit position
+
+    Returns
+    -------
+    numpy.ndarray
+        Returns an object array with the names of each row, e.g. 'Brazil, Chile'.
+    """
+    if masks.shape[0] == 0:
+        return np.empty(0, dtype=object)
+    unique, inverse = np.unique(masks, axis=0, return_inverse=True)
+    # Bit k of word w is column 64 * w + k
+    bits = np.unpackbits(unique.astype('<u8').view(np.uint8), axis=1, bitorder='little').astype(bool)
+    positions = sorted((pos for pos in names if pos < bits.shape[1]), key=lambda pos: names[pos])
+    sorted_names = np.array([names[pos] for pos in positions], dtype=object)
+    bits = bits[:, positions]
+    rendered = np.array([', '.join(sorted_names[row]) for row in bits], dtype=object)
+    return rendered[inverse.ravel()]
+
+def compile_regions(country_ids):
+    """
+    Precompile the region definitions as bitmasks over the country ids.
+
+    Params
+    ------
+    country_ids : dict
+        country names mapped to their integer id (the `country` id of countries.csv)
+
+    Returns
+    -------
+    dict
+        Returns the bitmask of each region, the name to id mapping and the number of
+        words per bitmask. Countries of the region lists that are missing from
+        `country_ids` get ids of their own, so that they are never matched.
+    """
+    country_ids = dict(country_ids)
+    next_id = max(country_ids.values(), default=0) + 1
+    for name in LATAM_COUNTRIES + CARIBBEAN + DEPENDENCIES + sorted(WORLD):
+        if name not in country_ids:
+            country_ids[name] = next_id
+            next_id += 1
+    n_words = next_id // 64 + 1
+
+    def region_mask(names):
+        ids = [country_ids[name] for name in names]
+        return country_bitmasks(np.zeros(len(ids)), ids, 1, n_words)[0]
+
+    return {
+        'country_ids': country_ids,
+        'n_words': n_words,
+        'excluded': region_mask(CARIBBEAN + DEPENDENCIES),
+        'latam': region_mask(LATAM_COUNTRIES),
+        'latam_ex_mex': region_mask(LATAM_EX_MEX),
+        'latam_ex_brz': region_mask(LATAM_EX_BRZ),
+        'latam_ex_mex_brz': region_mask(LATAM_EX_MEX_BRZ),
+        'world': region_mask(sorted(WORLD)),
+    }
+
+def classify_regions(masks, regions):
+    """
+    Classify a column of country bitmasks into the REGION_LABELS, first match wins.
+
+    Params
+    ------
+    masks : numpy.ndarray
+        country bitmasks, one row per country set, built with `country_bitmasks`
+    regions : dict
+        the output of `compile_regions`
+
+    Returns
+    -------
+    tuple
+        Returns an object array with the region label of each row (None where the
+        countries fit no region) and the number of countries left in each row once
+        the Caribbean and the dependencies are removed.
+    """
+    masks = masks & ~regions['excluded']
+    world = popcount(masks & regions['world'])
+    latam = popcount(masks & regions['latam'])
+
+    def covers(region):
+        return ((masks & region) == region).all(axis=1)
+
+    conditions = [
+        covers(regions['latam']) & (world <= 16),
+        covers(regions['latam_ex_mex']) & (world <= 16),
+        covers(regions['latam_ex_brz']) & (world <= 16),
+        covers(regions['latam_ex_mex_brz']) & (world <= 16),
+        (world >= 50) & (latam >= 16),
+        (world >= 50) & (latam < 16),
+    ]
+    labels = np.full(masks.shape[0], None, dtype=object)
+    # Assign in reverse so that the first matching rule wins
+    for condition, label in reversed(list(zip(conditions, REGION_LABELS))):
+        labels[condition] = label
+    return labels, popcount(masks)
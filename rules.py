@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+from regions import LATAM_COUNTRIES
+
+# Cross-right propagation rules of the avails. In the `countries` of a rule, the
+# `columns` of the `target` rights groups of a title take the latest value over
+# the `source` rights groups of that title in those countries
+LATAM_PAY_TV_RULES = [
+    {
+        'name': 'Latam Premium Pay TV',
+        'source': ['Premium Pay TV (Local)', 'Premium Pay TV (Pan Regional)'],
+        'target': ['Premium Pay TV (Pan Regional)'],
+        'countries': LATAM_COUNTRIES,
+        'columns': ['exclusive', 'non-exclusive'],
+    },
+    {
+        'name': 'Latam Basic Pay TV',
+        'source': ['Basic Pay TV (Local)', 'Basic Pay TV (Pan Regional)'],
+        'target': ['Basic Pay TV (Pan Regional)'],
+        'countries': LATAM_COUNTRIES,
+        'columns': ['exclusive', 'non-exclusive'],
+    },
+]
+
+def compile_rules(rules):
+    """
+    Check that a list of propagation rules can run in a single pass.
+
+    The rules read the avails as they were before any rule ran, so no two rules
+    may read the same (rights group, country) and no rule may change what
+    another rule reads.
+
+    Params
+    ------
+    rules : list
+        the rules, dictionaries with the 'name', 'source', 'target', 'countries'
+        and 'columns' of each rule
+
+    Returns
+    -------
+    dict
+        Returns the rules and the union of their columns, for `apply_rules`.
+    """
+    read_by = {}
+    for rule in rules:
+        for pair in [(group, country) for group in rule['source'] for country in rule['countries']]:
+            if pair in read_by:
+                raise ValueError(f"Rules '{read_by[pair]}' and '{rule['name']}' both read {pair}")
+            read_by[pair] = rule['name']
+    for rule in rules:
+        for pair in [(group, country) for group in rule['target'] for country in rule['countries']]:
+            if read_by.get(pair, rule['name']) != rule['name']:
+                raise ValueError(f"Rule '{rule['name']}' changes {pair}, which rule '{read_by[pair]}' reads")
+
+    columns = []
+    for rule in rules:
+        columns += [col for col in rule['columns'] if col not in columns]
+    return {'rules': rules, 'columns': columns}
+
+def apply_rules(avails_df, compiled):
+    """
+    Apply compiled propagation rules to the avails, in one pass.
+
+    The source rows of every rule are reduced with a single groupby max, keyed by
+    the title (and the as-of date of a batch) and the rule, and the maxima are
+    looked up for the target rows of each rule.
+
+    Params
+    ------
+    avails_df : pandas.DataFrame
+        avails indexed by (title, group, country_name) or (as_of, title, group,
+        country_name), from `engine.group_avails`
+    compiled : dict
+        the output of `compile_rules`
+
+    Returns
+    -------
+    pandas.DataFrame
+        Returns `avails_df`, updated in place.
+    """
+    rules, columns = compiled['rules'], compiled['columns']
+    index = avails_df.index
+    groups = index.get_level_values('group')
+    countries = index.get_level_values('country_name')
+    keys = [index.get_level_values(name) for name in index.names if name not in ['group', 'country_name']]
+
+    def rows_of(rule, side):
+        return np.asarray(groups.isin(rule[side]) & countries.isin(rule['countries']))
+
+    rule_of_row = np.full(len(index), -1, dtype=np.int64)
+    for i, rule in enumerate(rules):
+        rule_of_row[rows_of(rule, 'source')] = i
+    source = rule_of_row >= 0
+    if not source.any():
+        return avails_df
+
+    maxima = avails_df.loc[source, columns].groupby([key[source] for key in keys] + [rule_of_row[source]]).max()
+
+    for i, rule in enumerate(rules):
+        target = np.flatnonzero(rows_of(rule, 'target'))
+        if not len(target):
+            continue
+        lookup = pd.MultiIndex.from_arrays([key[target] for key in keys] + [np.full(len(target), i)])
+        position = maxima.index.get_indexer(lookup)
+        # Targets without a source row in their countries keep their avails
+        found = position >= 0
+        for col in rule['columns']:
+            avails_df.iloc[target[found], avails_df.columns.get_loc(col)] = maxima[col].to_numpy()[position[found]]
+    return avails_df
+
+PAY_TV_RULES = compile_rules(LATAM_PAY_TV_RULES)
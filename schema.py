@@ -0,0 +1,142 @@
+from fnmatch import fnmatchcase
+
+# Columns of the tables written by process_data that the avails stages consume,
+# with their dtypes. The ingest stores only these columns and `read_table` loads
+# only these columns, so the working set does not grow with the source exports.
+# The titles are the exception: their metadata columns are passed through.
+#
+# Dtypes: 'category' is stored dictionary encoded, 'string', 'int64', 'float64',
+# 'datetime' and 'bool' are stored as such, None keeps the inferred type (the
+# metadata columns passed through to the outputs as they were read)
+#
+# A column name may be a pattern, e.g. 'rating_*' or '*', which declares every
+# matching column. Exact names are matched before the patterns
+TABLE_SCHEMAS = {
+    'windows': {
+        'window': 'int64',
+        'title': 'int64',
+        'contract': 'int64',
+        'country': 'int64',
+        'license_type': 'category',
+        'country_name': 'category',
+        'right_name': 'category',
+        'group': 'category',
+        'start_date': 'datetime',
+        'end_date': 'datetime',
+    },
+    'contracts': {
+        'contract': 'int64',
+        'contract_type': 'category',
+        'distributor': 'category',
+        'status': 'category',
+    },
+    'titles': {
+        'title': 'int64',
+        'name': 'string',
+        'dialogue_language': 'category',
+        'genre': 'category',
+        'original_format': 'category',
+        'original_language': 'category',
+        'subtitle_language': 'category',
+        'synopsis': 'string',
+        # The title metadata and ratings pass through to the Free TV sheets, where
+        # only avails.title_cols2exclude filters them: every other column is kept
+        '*': None,
+    },
+    'people': {
+        'person': 'int64',
+        'name': 'string',
+    },
+    'roles': {
+        'title': 'int64',
+        'person': 'int64',
+        'role': 'category',
+    },
+}
+
+# Columns the ingest produces and knowingly does not store
+IGNORED_COLUMNS = {
+    'windows': [
+        'contract_code',
+        'right',
+    ],
+    'contracts': [
+        'contract_code',
+        'creation_date',
+    ],
+    'roles': [
+        'row',
+    ],
+}
+
+# Tables stored with a named index
+TABLE_INDEX = {
+    'titles': 'title',
+}
+
+def table_schema(name):
+    """Declared columns of a table and their dtypes, empty for an undeclared table."""
+    return TABLE_SCHEMAS.get(name, {})
+
+def is_pattern(key):
+    """Whether a declared column name is a pattern."""
+    return any(char in key for char in '*?[')
+
+def _pattern(schema, col):
+    # The declared name or pattern a column matches, or None
+    if col in schema:
+        return col
+    return next((key for key in schema if is_pattern(key) and fnmatchcase(col, key)), None)
+
+def is_declared(col, name):
+    """Whether a column of a table is declared, by name or by a pattern."""
+    return _pattern(table_schema(name), col) is not None
+
+def column_dtype(col, name):
+    """Declared dtype of a column of a table, None for an inferred or undeclared column."""
+    schema = table_schema(name)
+    key = _pattern(schema, col)
+    return None if key is None else schema[key]
+
+def project_columns(df, name):
+    """
+    Keep the declared columns of a table, in the order of the dataframe.
+
+    Params
+    ------
+    df : pandas.DataFrame
+        the table as produced by the ingest, with its index as a column
+    name : str
+        table name, e.g. 'windows'
+
+    Returns
+    -------
+    pandas.DataFrame
+        Returns the dataframe without the columns no stage consumes, or the
+        dataframe itself for an undeclared table.
+    """
+    if not table_schema(name):
+        return df
+    return df[[col for col in df.columns if is_declared(col, name)]]
+
+def unused_columns(columns, name):
+    """
+    Columns produced for a table that no stage consumes and that are not listed
+    in IGNORED_COLUMNS, e.g. the new columns of a wider source export.
+
+    Params
+    ------
+    columns : list
+        columns produced by the ingest
+    name : str
+        table name, e.g. 'windows'
+
+    Returns
+    -------
+    list
+        Returns the unexpected columns, in the order of `columns`.
+    """
+    if not table_schema(name):
+        return []
+    ignored = IGNORED_COLUMNS.get(name, [])
+    return [col for col in columns if not is_declared(col, name) and col not in ignored]
@@ -0,0 +1,407 @@
+import os
+import sys
+import json
+import time
+import argparse
+import datetime
+import threading
+import traceback
+import numpy as np
+import pandas as pd
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from paths import get_app_dir
+from store import read_table, table_path
+from engine import build_window_table, evaluate_windows, group_avails
+from avails import read_windows
+from rules import PAY_TV_RULES, apply_rules
+
+# Tables the avails are computed from, their modification times trigger a refresh
+SOURCE_TABLES = ['windows', 'contracts', 'titles']
+
+DATE_COLUMNS = ['exclusive', 'non-exclusive', 'acq_expires', 'non-exclusive_end_date']
+
+def tables_signature(tables_dir):
+    """Modification time and size of each source table, None for a missing table."""
+    signature = []
+    for name in SOURCE_TABLES:
+        try:
+            stat = os.stat(table_path(tables_dir, name))
+            signature.append((name, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append((name, None, None))
+    return tuple(signature)
+
+def _parse_date(value):
+    # Dates are passed as YYYY-MM-DD
+    try:
+        return np.datetime64(datetime.date.fromisoformat(value), 'ns')
+    except ValueError:
+        raise ValueError(f'invalid date {value!r}, expected YYYY-MM-DD') from None
+
+def _name_key(name):
+    # Names are matched case insensitively, ignoring surrounding spaces
+    return name.strip().lower()
+
+def _format_date(value):
+    return None if np.isnat(value) else str(value.astype('datetime64[D]'))
+
+class AvailsIndex:
+    """
+    Read-only avails of every (title, rights group, country), indexed for lookups.
+
+    Point lookups go through a dictionary keyed by (title, group, country), and
+    range queries scan the date arrays of one (group, country) with numpy. Title
+    names, groups and countries are matched case insensitively. An index is never
+    modified once built, a refresh builds a new one.
+
+    Params
+    ------
+    avails_df : pandas.DataFrame
+        avails indexed by (title, group, country_name), from `engine.group_avails`
+    title_names : pandas.Series
+        title names indexed by title
+    as_of : pandas.Timestamp
+        the date the avails were computed for
+    signature : tuple
+        the `tables_signature` of the tables the avails were computed from
+    """
+
+    def __init__(self, avails_df, title_names, as_of, signature=None):
+        self.as_of = as_of
+        self.signature = signature
+        self.loaded_at = datetime.datetime.now().isoformat(timespec='seconds')
+
+        self.title = avails_df.index.get_level_values('title').to_numpy()
+        self.group = avails_df.index.get_level_values('group').to_numpy()
+        self.country = avails_df.index.get_level_values('country_name').to_numpy()
+        self.title_name = title_names.reindex(self.title).to_numpy()
+        self.dates = {col: avails_df[col].to_numpy(dtype='datetime64[ns]') for col in DATE_COLUMNS}
+
+        self.by_key = {}
+        self.by_title = {}
+        self.by_name = {}
+        self.by_group_country = {}
+        self.group_key = np.array([_name_key(group) for group in self.group], dtype=object)
+        self.country_key = np.array([_name_key(country) for country in self.country], dtype=object)
+        for i, key in enumerate(zip(self.title, self.group_key, self.country_key)):
+            self.by_key[key] = i
+            self.by_title.setdefault(key[0], []).append(i)
+            self.by_group_country.setdefault((key[1], key[2]), []).append(i)
+        for title, name in title_names.items():
+            if isinstance(name, str):
+                self.by_name.setdefault(_name_key(name), []).append(title)
+        self.by_group_country = {
+            key: np.array(rows, dtype=np.int64) for key, rows in self.by_group_country.items()
+        }
+
+    def __len__(self):
+        return len(self.title)
+
+    def record(self, i):
+        record = {
+            'title': int(self.title[i]),
+            'title_name': self.title_name[i] if isinstance(self.title_name[i], str) else None,
+            'group': self.group[i],
+            'country_name': self.country[i],
+        }
+        for col in DATE_COLUMNS:
+            record[col] = _format_date(self.dates[col][i])
+        return record
+
+    def titles(self, title=None, title_id=None):
+        """
+        Title ids matching a title name (case insensitive) and/or a title id. A
+        name is never read as an id, so '1917' only finds the title named 1917.
+        """
+        ids = [] if title is None else list(self.by_name.get(_name_key(title), []))
+        if title_id is not None:
+            try:
+                title_id = int(title_id)
+            except ValueError:
+                raise ValueError(f'invalid title_id {title_id!r}, expected an integer') from None
+            ids += [] if title_id in ids else [title_id]
+        return ids
+
+    def lookup(self, title=None, group=None, country=None, title_id=None):
+        """
+        Avails of a title, given by name or by id, optionally of one rights group
+        and/or one country. The names, groups and countries are case insensitive.
+
+        Returns
+        -------
+        list
+            Returns the matching avails as dictionaries.
+        """
+        group = None if group is None else _name_key(group)
+        country = None if country is None else _name_key(country)
+        rows = []
+        for title_key in self.titles(title, title_id):
+            if group is not None and country is not None:
+                i = self.by_key.get((title_key, group, country))
+                rows += [] if i is None else [i]
+            else:
+                rows += [
+                    i for i in self.by_title.get(title_key, [])
+                    if (group is None or self.group_key[i] == group) and
+                    (country is None or self.country_key[i] == country)
+                ]
+        return [self.record(i) for i in rows]
+
+    def available(self, group, country, start, end=None, exclusive=False):
+        """
+        Titles of a rights group that can be licensed in a country from `start`
+        through `end`.
+
+        A title is available when its avail starts on or before `start` and both
+        the acquisition and, for a non-exclusive avail, the non-exclusive end date
+        are after `end` (`start` when no end is given).
+
+        Params
+        ------
+        group : str
+            rights group, e.g. 'SVOD', case insensitive
+        country : str
+            country name, case insensitive
+        start : numpy.datetime64
+            first day of the license
+        end : numpy.datetime64
+            last day of the license, or None
+        exclusive : bool
+            whether the license is exclusive
+
+        Returns
+        -------
+        list
+            Returns the avails of the available titles as dictionaries.
+        """
+        rows = self.by_group_country.get((_name_key(group), _name_key(country)))
+        if rows is None:
+            return []
+        if end is None:
+            end = start
+        avail_start = self.dates['exclusive' if exclusive else 'non-exclusive'][rows]
+        acq_expires = self.dates['acq_expires'][rows]
+
+        # NaT compares as False, so a missing avail is never available
+        mask = (avail_start <= start) & (acq_expires >= end)
+        if not exclusive:
+            avail_end = self.dates['non-exclusive_end_date'][rows]
+            mask &= np.isnat(avail_end) | (avail_end >= end)
+        return [self.record(i) for i in rows[mask]]
+
+def build_index(tables_dir, as_of=None):
+    """
+    Compute the avails from the tables written by `process_data` and index them.
+
+    Params
+    ------
+    tables_dir : str
+        directory of the tables written by `process_data`
+    as_of : pandas.Timestamp
+        the date the avails are computed for, defaults to now
+
+    Returns
+    -------
+    AvailsIndex
+    """
+    if as_of is None:
+        as_of = pd.Timestamp('today')
+    # Read the signature first, a table written while loading triggers another refresh
+    signature = tables_signature(tables_dir)
+    windows_df = read_windows(tables_dir)
+    titles = read_table(tables_dir, 'titles', columns=['name', 'original_format'])
+
+    # Same avails as avails_process, without the SD titles
+    avails_df = group_avails(evaluate_windows(build_window_table(windows_df), as_of=as_of))
+    avails_df = apply_rules(avails_df, PAY_TV_RULES)
+    titles = titles.loc[~titles['original_format'].isin(['SD Tape', 'SD File'])]
+    avails_df = avails_df.loc[avails_df.index.get_level_values('title').isin(titles.index)]
+
+    return AvailsIndex(avails_df, titles['name'], as_of, signature)
+
+class AvailsService:
+    """
+    Holds the current `AvailsIndex` and rebuilds it in a background thread when
+    the tables change or the day changes.
+
+    The tables are written one after the other by `process_data`, so a new
+    signature is only loaded once it is unchanged for one polling interval. The
+    new index replaces the old one in a single assignment, a request sees either
+    of them, never a mix.
+
+    Params
+    ------
+    tables_dir : str
+        directory of the tables written by `process_data`
+    interval : float
+        seconds between two checks of the tables
+    """
+
+    def __init__(self, tables_dir, interval=30):
+        self.tables_dir = tables_dir
+        self.interval = interval
+        self.index = build_index(tables_dir)
+        self.last_error = None
+        self._pending = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._watch, name='avails-refresh', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def refresh_needed(self):
+        signature = tables_signature(self.tables_dir)
+        if signature == self.index.signature:
+            self._pending = None
+            # The avails depend on the current date
+            return pd.Timestamp('today').normalize() != self.index.as_of.normalize()
+        # Wait for the writes to settle
+        ready = signature == self._pending
+        self._pending = signature
+        return ready
+
+    def refresh(self):
+        try:
+            self.index = build_index(self.tables_dir)
+            self.last_error = None
+            print(f'Avails refreshed: {len(self.index)} rows', file=sys.stderr)
+        except Exception:
+            # Keep serving the previous index
+            self.last_error = traceback.format_exc()
+            print(self.last_error, file=sys.stderr)
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            if self.refresh_needed():
+                self.refresh()
+
+class AvailsRequestHandler(BaseHTTPRequestHandler):
+    """
+    GET endpoints, every response is JSON:
+
+    /health
+        row count, date and tables of the loaded avails
+    /avails?title=&title_id=&group=&country=
+        avails of a title by name and/or by id, optionally of one group and/or country
+    /available?group=&country=&start=YYYY-MM-DD[&end=YYYY-MM-DD][&exclusive=1]
+        titles available for a license in a country
+
+    Title names, groups and countries are case insensitive. A malformed title_id
+    or date is answered with a 400.
+    """
+
+    service = None
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        # One index for the whole request, a refresh may swap it meanwhile
+        index = self.service.index
+        started = time.perf_counter()
+
+        try:
+            if url.path == '/health':
+                body = {
+                    'status': 'ok' if self.service.last_error is None else 'stale',
+                    'rows': len(index),
+                    'as_of': index.as_of.isoformat(),
+                    'loaded_at': index.loaded_at,
+                    'tables': {
+                        name: None if mtime is None else
+                        datetime.datetime.fromtimestamp(mtime / 1e9).isoformat(timespec='seconds')
+                        for name, mtime, _ in index.signature
+                    },
+                }
+            elif url.path == '/avails':
+                if 'title' not in params and 'title_id' not in params:
+                    return self._send(400, {'error': "missing parameter 'title' or 'title_id'"})
+                body = {'avails': index.lookup(
+                    params.get('title'),
+                    params.get('group'),
+                    params.get('country'),
+                    title_id=params.get('title_id'),
+                )}
+            elif url.path == '/available':
+                missing = [key for key in ['group', 'country', 'start'] if key not in params]
+                if missing:
+                    return self._send(400, {'error': f'missing parameters {missing}'})
+                body = {'avails': index.available(
+                    params['group'],
+                    params['country'],
+                    _parse_date(params['start']),
+                    _parse_date(params['end']) if 'end' in params else None,
+                    exclusive=params.get('exclusive', '0').lower() in ['1', 'true', 'yes'],
+                )}
+            else:
+                return self._send(404, {'error': f'unknown path {url.path}'})
+        except ValueError as e:
+            return self._send(400, {'error': str(e)})
+
+        body['as_of'] = index.as_of.isoformat()
+        body['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        self._send(200, body)
+
+    def log_message(self, format, *args):
+        sys.stderr.write(f'{self.address_string()} - {format % args}\n')
+
+def serve(tables_dir, host='127.0.0.1', port=8765, interval=30):
+    """
+    Serve the avails of the tables in `tables_dir` until interrupted.
+
+    Params
+    ------
+    tables_dir : str
+        directory of the tables written by `process_data`
+    host : str
+        address to listen on
+    port : int
+        port to listen on
+    interval : float
+        seconds between two checks of the tables
+    """
+    service = AvailsService(tables_dir, interval=interval)
+    service.start()
+    handler = type('Handler', (AvailsRequestHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f'Serving {len(service.index)} avails on http://{host}:{port}', file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        server.server_close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the avails of the stored tables over HTTP.')
+    parser.add_argument(
+        '--data-dir',
+        help="directory with the 'tables' written by the ingest (default: <app dir>/data)"
+    )
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='port to listen on (default: 8765)')
+    parser.add_argument('--interval', type=float, default=30, help='seconds between two checks of the tables (default: 30)')
+    args = parser.parse_args(argv)
+
+    data_dir = args.data_dir or os.path.join(get_app_dir(), 'data')
+    try:
+        serve(os.path.join(data_dir, 'tables'), args.host, args.port, args.interval)
+    except FileNotFoundError as e:
+        print(f'Error: {e}', file=sys.stderr)
+        return 3
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,101 @@
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from schema import TABLE_INDEX, table_schema, project_columns, is_declared, column_dtype
+
+# Arrow types of the dtypes declared in schema.TABLE_SCHEMAS
+_ARROW_TYPES = {
+    'category': pa.dictionary(pa.int32(), pa.string()),
+    'string': pa.string(),
+    'int64': pa.int64(),
+    'float64': pa.float64(),
+    'datetime': pa.timestamp('ns'),
+    'bool': pa.bool_(),
+}
+
+def table_path(tables_dir, name):
+    return os.path.join(tables_dir, name + '.feather')
+
+def _to_arrow(values, arrow_type=None):
+    # Categoricals are stored as they are, their codes as the indices of the dictionary
+    if isinstance(values.dtype, pd.CategoricalDtype) and arrow_type is not None and pa.types.is_dictionary(arrow_type):
+        codes = values.cat.codes.to_numpy()
+        indices = pa.array(codes, mask=codes < 0).cast(arrow_type.index_type)
+        dictionary = pa.array(values.cat.categories.astype(str), type=arrow_type.value_type)
+        return pa.DictionaryArray.from_arrays(indices, dictionary)
+    # Columns of mixed Python types (e.g. a title read as a number) are stored as strings
+    if arrow_type is not None and (pa.types.is_dictionary(arrow_type) or pa.types.is_string(arrow_type)):
+        values = values.where(values.isna(), values.astype(str))
+        array = pa.array(values, type=pa.string(), from_pandas=True)
+        return array.dictionary_encode() if pa.types.is_dictionary(arrow_type) else array
+    try:
+        return pa.array(values, type=arrow_type, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        if values.dtype != object:
+            raise
+        return pa.array(values.where(values.isna(), values.astype(str)), type=pa.string(), from_pandas=True)
+
+def write_table(df, tables_dir, name):
+    """
+    Write the declared columns of a table in the Arrow IPC (Feather) format, with
+    the declared column types.
+
+    The file is uncompressed so that it can be memory-mapped by `read_table`.
+    """
+    if name in TABLE_INDEX:
+        df = df.reset_index()
+    df = project_columns(df, name)
+    arrays = []
+    for col in df.columns:
+        dtype = column_dtype(col, name)
+        arrow_type = _ARROW_TYPES[dtype] if dtype is not None else None
+        arrays.append(_to_arrow(df[col], arrow_type))
+    table = pa.Table.from_arrays(arrays, names=[str(col) for col in df.columns])
+    if not os.path.exists(tables_dir):
+        os.makedirs(tables_dir)
+    feather.write_feather(table, table_path(tables_dir, name), compression='uncompressed')
+
+def table_columns(tables_dir, name):
+    """Return the column names of a stored table without reading it."""
+    with pa.memory_map(table_path(tables_dir, name)) as source:
+        return pa.ipc.open_file(source).schema.names
+
+def read_table(tables_dir, name, columns=None, categorical=False):
+    """
+    Memory-map a stored table and load only the given columns.
+
+    Params
+    ------
+    tables_dir : str
+        directory the tables were written to
+    name : str
+        table name, e.g. 'windows'
+    columns : list
+        columns to load, or None to load the declared columns of the table
+    categorical : bool
+        whether to keep the dictionary encoded columns as pandas categoricals,
+        otherwise they are decoded to object columns. The categories are sorted,
+        so the categoricals sort, group and unstack in the order of the strings
+
+    Returns
+    -------
+    pandas.DataFrame
+        Returns the table, indexed as it was written.
+    """
+    index = TABLE_INDEX.get(name)
+    if columns is None and table_schema(name):
+        # Tables written before a column was dropped from the schema still hold it
+        columns = [col for col in table_columns(tables_dir, name) if is_declared(col, name)]
+    if columns is not None and index is not None and index not in columns:
+        columns = [index] + list(columns)
+    table = feather.read_table(table_path(tables_dir, name), columns=columns, memory_map=True)
+    df = table.to_pandas()
+    for col in df.select_dtypes(include=['category']).columns:
+        if not categorical:
+            df[col] = df[col].astype(object)
+        elif not df[col].cat.categories.is_monotonic_increasing:
+            df[col] = df[col].cat.reorder_categories(df[col].cat.categories.sort_values())
+    if index is not None:
+        df = df.set_index(index)
+    return df
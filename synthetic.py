@@ -0,0 +1,300 @@
+import os
+import csv
+import random
+import datetime
+import argparse
+from openpyxl import Workbook
+from regions import LATAM_COUNTRIES
+
+# Stand-ins for the territories, rights and ratings found in the production exports
+OTHER_COUNTRIES = [
+    ('Dominican Republic', 'Caribbean', 'Latin America'),
+    ('Puerto Rico', 'Caribbean', 'Latin America'),
+    ('Jamaica', 'Caribbean', 'Latin America'),
+    ('Belize', None, 'Latin America'),
+    ('Spain', None, 'Europe'),
+    ('France', None, 'Europe'),
+    ('Germany', None, 'Europe'),
+    ('Italy', None, 'Europe'),
+    ('United Kingdom', None, 'Europe'),
+    ('Japan', None, 'Asia'),
+    ('India', None, 'Asia'),
+    ('Canada', None, 'North America'),
+    ('Australia', None, 'Oceania'),
+    ('Egypt', None, 'Africa'),
+    ('South Africa', None, 'Africa'),
+    ('Morocco', None, 'Africa'),
+]
+
+RIGHTS = [
+    'SVOD',
+    'AVOD',
+    'TVOD',
+    'Free TV',
+    'Free TV-CAB',
+    'Basic Pay TV (Local)',
+    'Basic Pay TV (Pan Regional)',
+    'Premium Pay TV (Local)',
+    'Premium Pay TV (Pan Regional)',
+    'Home Video',
+    'Theatrical',
+    'Free TV-SAT',
+    'Basic Pay TV (Local) CC',
+    'Premium Pay TV (Local) CC',
+    'EST',
+    'Airline',
+    'Hotel/Motel',
+    'Ship',
+    'Internet',
+    'Video-Rental',
+]
+
+RATING_COUNTRIES = [
+    'USA', 'Mexico', 'Brazil', 'Argentina', 'Bolivia', 'Chile', 'Colombia',
+    'Costa Rica', 'Ecuador', 'El Salvador', 'Guatemala', 'Honduras', 'Nicaragua',
+    'Panama', 'Paraguay', 'Peru', 'Dominican Republic', 'Uruguay', 'Venezuela',
+]
+
+PROJECT_COLS = [
+    'Title', 'AKA 1', 'AKA 2', 'Adj. Running Time', 'Budget', 'Cast Member',
+    'Copyright Holder', 'Country of Origin', 'Dialogue Language', 'Director',
+    'Genre', 'IMDB Code', 'Logline', 'Number of Episodes', 'Number of Seasons',
+    'Original Format', 'Original Language', 'Producer', 'Project Code',
+    'Project Group', 'Project Type', 'Rating', 'Running Time', 'Season',
+    'Short Synopsis', 'Status', 'Subtitle Language', 'Synopsis', 'Title Code',
+    'Unique Id', 'Website', 'Writer', 'Year Completed',
+]
+
+WINDOW_COLS = [
+    'Contract Code', 'Title', 'Territory', 'Right', 'License Type',
+    'Start Date', 'Start E/A', 'End Date', 'End E/A', 'Unique Id',
+]
+
+OPEN_WINDOWS_FILE = 'Availability Open Windows - By Territory and Right (Copy) 1.xlsx'
+
+def _random_date(rng, start_year, end_year):
+    start = datetime.date(start_year, 1, 1).toordinal()
+    end = datetime.date(end_year, 12, 31).toordinal()
+    return datetime.datetime.fromordinal(rng.randint(start, end))
+
+def _write_sheet(file_path, header, rows):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Sheet1')
+    ws.append(header)
+    for row in rows:
+        ws.append(row)
+    wb.save(file_path)
+
+def _countries(territories):
+    countries = [(name, 'Latam', 'Latin America') for name in LATAM_COUNTRIES]
+    countries += [(name, market or '', geo) for name, market, geo in OTHER_COUNTRIES]
+    if territories is not None:
+        countries += [
+            (f'Territory {i}', '', 'Other') for i in range(len(countries) + 1, territories + 1)
+        ]
+        countries = countries[:territories]
+    return countries
+
+def _rights(rights):
+    if rights is None:
+        return RIGHTS[:11]
+    return (RIGHTS + [f'Right {i}' for i in range(len(RIGHTS) + 1, rights + 1)])[:rights]
+
+def generate(data_dir, titles=50, rights=None, territories=None, windows_per_title=40, seed=0):
+    """
+    Write synthetic stand-ins for the seven input files of `process_data`.
+
+    The Open Windows workbook has one sheet per right, plus the 'All Rights',
+    'Filter Values' and '(U)' sheets that are skipped. Every title has an
+    acquisition over two thirds of the rights, in every territory, and
+    `windows_per_title` sales and holdback windows.
+
+    Params
+    ------
+    data_dir : str
+        directory the files are written to, the 'data' directory of the app
+    titles : int
+        number of titles
+    rights : int
+        number of rights, defaults to the 11 most common ones
+    territories : int
+        number of territories, defaults to the 33 Latam, Caribbean and other territories
+    windows_per_title : int
+        number of sales and holdback windows of each title
+    seed : int
+        seed of the random generator, the same arguments write the same data
+    """
+    rng = random.Random(seed)
+    if not os.path.exists(data_dir):
+        os.makedirs(data_dir)
+    right_names = _rights(rights)
+    countries = _countries(territories)
+    country_names = [name for name, _, _ in countries]
+
+    with open(os.path.join(data_dir, 'rights.csv'), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['name'])
+        for right in right_names:
+            writer.writerow([right])
+
+    with open(os.path.join(data_dir, 'countries.csv'), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['name', 'market_region', 'geo_region'])
+        for country in countries:
+            writer.writerow(country)
+
+    # Contract Summary
+    contracts = []
+    for i in range(max(4, titles // 2)):
+        contracts.append({
+            'Contract #': f'C{i:05d}',
+            'Contract Type': 'Acquisition' if i % 3 == 0 else 'Sales',
+            'Licensor': f'Licensor {i % 7}',
+            'Distributor': f'Distributor {i % 5}',
+            'Status': 'Normal' if rng.random() < 0.9 else 'Cancelled',
+            'Deal Status': 'Closed',
+            'Creation Date': _random_date(rng, 2010, 2023),
+            'Deal Type': 'Flat',
+            'Fully Executed': 'Yes',
+            'MG': rng.randint(1000, 100000),
+            'Cur': 'USD',
+            'Additional Terms/Conditions': None,
+            'Territories': 'Latam',
+        })
+    acq_codes = [c['Contract #'] for c in contracts if c['Contract Type'] == 'Acquisition']
+    sales_codes = [c['Contract #'] for c in contracts if c['Contract Type'] == 'Sales']
+    contract_types = {c['Contract #']: c['Contract Type'] for c in contracts}
+    _write_sheet(
+        os.path.join(data_dir, 'Contract Summary.xlsx'),
+        list(contracts[0].keys()),
+        (list(contract.values()) for contract in contracts)
+    )
+
+    # Project List
+    genres = ['Drama', 'Comedy', 'Action', 'Horror', 'Documentary']
+    people = [f'Person {i}' for i in range(max(10, titles))]
+    projects = []
+    for t in range(1, titles + 1):
+        row = {col: None for col in PROJECT_COLS}
+        row.update({
+            'Title': f'Title {t}',
+            'AKA 1': f'Aka {t}' if t % 4 == 0 else None,
+            'AKA 2': f'Aka2 {t}' if t % 6 == 0 else None,
+            'Adj. Running Time': 90 + t % 30,
+            'Budget': rng.randint(10, 1000) * 1000,
+            'Cast Member': ', '.join(rng.sample(people, 3)),
+            'Copyright Holder': 'Holder',
+            'Country of Origin': rng.choice(['USA', 'Spain', 'Mexico']),
+            'Dialogue Language': 'English',
+            'Director': rng.choice(people) if t % 5 else None,
+            'Genre': rng.choice(genres),
+            'IMDB Code': f'tt{t:07d}',
+            'Logline': f'Logline of title {t}, nanny Fernanda',
+            'Number of Episodes': 10 if t % 9 == 0 else None,
+            'Number of Seasons': 1 if t % 9 == 0 else None,
+            'Original Format': rng.choice(['HD File', 'SD File', '4K']),
+            'Original Language': 'English',
+            'Producer': ', '.join(rng.sample(people, 2)),
+            'Project Code': f'P{t:05d}',
+            'Project Group': 'Features',
+            'Project Type': 'Feature',
+            'Rating': 'PG',
+            'Running Time': 90 + t % 30,
+            'Season': 'Season 1' if t % 9 == 0 else None,
+            'Short Synopsis': f'Short {t}',
+            'Status': 'Active',
+            'Subtitle Language': 'Spanish',
+            'Synopsis': f'Synopsis of "title" {t}',
+            'Title Code': f'T{t:05d}',
+            'Unique Id': t,
+            'Website': f'http://example.com/{t}',
+            'Writer': rng.choice(people),
+            'Year Completed': rng.randint(1990, 2023),
+        })
+        projects.append([row[col] for col in PROJECT_COLS])
+    _write_sheet(os.path.join(data_dir, 'Project List.xlsx'), PROJECT_COLS, projects)
+
+    # Project Data ID
+    _write_sheet(
+        os.path.join(data_dir, 'Project Data ID.xlsx'),
+        ['Unique Identifier', 'Title', 'Link', 'Password', 'US Box Office', 'Latam Box Office', 'Music Cue Sheet'],
+        [
+            [t, f'Title {t}', f'http://screener/{t}', f'pw{t}', rng.randint(0, 10**7), rng.randint(0, 10**6), 'Yes']
+            for t in range(1, titles + 1)
+        ]
+    )
+
+    # Ratings & Titles
+    _write_sheet(
+        os.path.join(data_dir, 'Ratings & Titles.xlsx'),
+        ['Unique Identifier', 'Title', 'IMDB'] + RATING_COUNTRIES,
+        [
+            [t, f'Title {t}', round(rng.uniform(3, 9), 1)] + [rng.choice(['PG', 'R', 'A', None]) for _ in RATING_COUNTRIES]
+            for t in range(1, titles + 1)
+        ]
+    )
+
+    # Open Windows, one sheet per right
+    rows_by_right = {right: [] for right in right_names}
+    for t in range(1, titles + 1):
+        acq_code = rng.choice(acq_codes)
+        acq_rights = rng.sample(right_names, max(1, len(right_names) * 2 // 3))
+        for right in acq_rights:
+            # Half of the acquisitions share their dates across the territories
+            shared = rng.random() < 0.5
+            start = _random_date(rng, 2015, 2024)
+            end = start + datetime.timedelta(days=rng.randint(365, 365 * 15))
+            for country in country_names:
+                if not shared:
+                    start = _random_date(rng, 2015, 2024)
+                    end = start + datetime.timedelta(days=rng.randint(365, 365 * 15))
+                license_type = 'License' if rng.random() < 0.8 else 'Non-Exclusive'
+                rows_by_right[right].append([
+                    acq_code, f'Title {t}', country, right, license_type,
+                    start, 'A', end, rng.choice(['A', 'E']), t,
+                ])
+        for _ in range(windows_per_title):
+            code = rng.choice(sales_codes + acq_codes[:1])
+            start = _random_date(rng, 2016, 2028)
+            end = start + datetime.timedelta(days=rng.randint(180, 365 * 5))
+            license_type = rng.choice(['License', 'License', 'Holdback', 'Non-Exclusive'])
+            if contract_types[code] == 'Acquisition':
+                license_type = 'Holdback'
+            right = rng.choice(acq_rights)
+            # Some contract codes carry extra text and some end dates are blank, as in the export
+            rows_by_right[right].append([
+                code if rng.random() < 0.95 else code + ', extra', f'Title {t}', rng.choice(country_names),
+                right, license_type, start, 'A', end if rng.random() < 0.95 else None, 'E', t,
+            ])
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('All Rights')
+    ws.append(WINDOW_COLS)
+    ws = wb.create_sheet('Filter Values')
+    ws.append(['Value'])
+    for right, rows in rows_by_right.items():
+        ws = wb.create_sheet(right.replace('/', '-')[:31])
+        ws.append(WINDOW_COLS)
+        for row in rows:
+            ws.append(row)
+    ws = wb.create_sheet('SVOD (U)')
+    ws.append(WINDOW_COLS)
+    wb.save(os.path.join(data_dir, OPEN_WINDOWS_FILE))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write synthetic input files for process_data.')
+    parser.add_argument('data_dir', help='directory the files are written to')
+    parser.add_argument('--titles', type=int, default=50)
+    parser.add_argument('--rights', type=int, default=None)
+    parser.add_argument('--territories', type=int, default=None)
+    parser.add_argument('--windows-per-title', type=int, default=40)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    generate(
+        args.data_dir,
+        titles=args.titles,
+        rights=args.rights,
+        territories=args.territories,
+        windows_per_title=args.windows_per_title,
+        seed=args.seed
+    )
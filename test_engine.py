@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import pytest
+from engine import build_window_table, evaluate_windows, evaluate_windows_batch, group_avails
+from engine_reference import random_windows, window_matrix_avails
+
+AS_OF = pd.Timestamp('2024-01-01')
+# The random windows start from 8 years before to 4 years after ORIGIN
+ORIGIN = pd.Timestamp('2026-10-01')
+
+def compute_avails(windows_df, as_of=None):
+    return group_avails(evaluate_windows(build_window_table(windows_df), as_of=as_of))
+
+def windows(*rows):
+    # One window per (contract_type, license_type, start_date, end_date) row, all
+    # for title 1000, SVOD in Mexico
+    return pd.DataFrame([
+        {
+            'title': 1000,
+            'group': 'SVOD',
+            'right_name': 'SVOD',
+            'country_name': 'Mexico',
+            'contract_type': ct,
+            'license_type': lt,
+            'start_date': pd.Timestamp(start),
+            'end_date': pd.Timestamp(end),
+        }
+        for ct, lt, start, end in rows
+    ])
+
+def avails_of(windows_df, as_of=AS_OF):
+    # Random windows of other titles fill every slot, which the window matrix needs
+    windows_df = pd.concat([random_windows(np.random.default_rng(0), 3_000, 100, origin=ORIGIN), windows_df], ignore_index=True)
+    old = window_matrix_avails(windows_df, as_of=as_of)
+    new = compute_avails(windows_df, as_of=as_of)
+    pd.testing.assert_frame_equal(old.apply(pd.to_datetime), new, check_freq=False)
+    return new[new.index.get_level_values('title') == 1000]
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_engine_matches_window_matrix(seed):
+    windows_df = random_windows(np.random.default_rng(seed), 3_000, 100, origin=ORIGIN)
+    old = window_matrix_avails(windows_df, as_of=AS_OF)
+    new = compute_avails(windows_df, as_of=AS_OF)
+    assert len(new)
+    pd.testing.assert_frame_equal(old.apply(pd.to_datetime), new, check_freq=False)
+
+def test_missing_slots():
+    # Only an acquisition license, every other slot is NaT
+    avails_df = avails_of(windows(('Acquisition', 'License', '2020-01-01', '2030-12-31')))
+    row = avails_df.loc[(1000, 'SVOD', 'Mexico')]
+    assert row['exclusive'] == AS_OF
+    assert row['non-exclusive'] == AS_OF
+    assert row['acq_expires'] == pd.Timestamp('2030-12-31')
+    assert pd.isna(row['non-exclusive_end_date'])
+
+def test_sales_end_is_inclusive():
+    avails_df = avails_of(windows(
+        ('Acquisition', 'License', '2020-01-01', '2030-12-31'),
+        ('Sales', 'License', '2022-01-01', '2025-06-30'),
+    ))
+    assert avails_df.loc[(1000, 'SVOD', 'Mexico'), 'exclusive'] == pd.Timestamp('2025-07-01')
+
+def test_expiring_acquisition_has_no_avails():
+    # The acquisition ends less than 26 weeks after the as-of date
+    avails_df = avails_of(windows(('Acquisition', 'License', '2020-01-01', '2024-03-01')))
+    assert avails_df.empty
+
+def test_short_non_exclusive_falls_back():
+    # A holdback sale starting a month later leaves less than 26 weeks of
+    # non-exclusive avail, which then starts after every window, with no end
+    avails_df = avails_of(windows(
+        ('Acquisition', 'License', '2020-01-01', '2030-12-31'),
+        ('Sales', 'Holdback', '2024-02-01', '2024-12-31'),
+    ))
+    row = avails_df.loc[(1000, 'SVOD', 'Mexico')]
+    assert row['non-exclusive'] == pd.Timestamp('2025-01-01')
+    assert pd.isna(row['non-exclusive_end_date'])
+    assert row['exclusive'] == pd.Timestamp('2025-01-01')
+
+def test_non_exclusive_ends_at_future_sale():
+    # A license sale that has not started is ignored by the non-exclusive avail,
+    # which ends when the sale starts
+    avails_df = avails_of(windows(
+        ('Acquisition', 'License', '2020-01-01', '2030-12-31'),
+        ('Sales', 'License', '2025-02-01', '2025-12-31'),
+    ))
+    row = avails_df.loc[(1000, 'SVOD', 'Mexico')]
+    assert row['non-exclusive'] == AS_OF
+    assert row['non-exclusive_end_date'] == pd.Timestamp('2025-02-01')
+    assert row['exclusive'] == pd.Timestamp('2026-01-01')
+
+def test_as_of_batch_matches_single_dates():
+    windows_df = random_windows(np.random.default_rng(3), 3_000, 100, origin=ORIGIN)
+    as_of_dates = list(pd.date_range(AS_OF, periods=4, freq='M'))
+    batch = group_avails(evaluate_windows_batch(build_window_table(windows_df), as_of_dates))
+    assert sorted(batch.index.get_level_values('as_of').unique()) == as_of_dates
+    for as_of in as_of_dates:
+        old = window_matrix_avails(windows_df, as_of=as_of)
+        pd.testing.assert_frame_equal(old.apply(pd.to_datetime), batch.xs(as_of, level='as_of'), check_freq=False)
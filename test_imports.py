@@ -0,0 +1,13 @@
+import pytest
+from benchmarks import check_import_time
+
+# Cold start budget of the entry points, in milliseconds
+IMPORT_BUDGET_MS = 300
+
+@pytest.mark.parametrize('module', ['main', 'cli'])
+def test_entry_point_import_time(module):
+    result = check_import_time(modules=[module], budget_ms=IMPORT_BUDGET_MS)[module]
+    assert not result['heavy_modules'], f"{module} imports {', '.join(result['heavy_modules'])} at startup"
+    assert result['milliseconds'] <= IMPORT_BUDGET_MS, (
+        f"importing {module} took {result['milliseconds']:.0f} ms, over the {IMPORT_BUDGET_MS} ms budget"
+    )
@@ -0,0 +1,116 @@
+import json
+import threading
+import urllib.request
+from urllib.error import HTTPError
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+import pytest
+from http.server import ThreadingHTTPServer
+from service import AvailsIndex, AvailsRequestHandler
+
+AS_OF = pd.Timestamp('2024-01-01')
+
+def make_index():
+    # Title 2 is named '1917', and another title has the id 1917
+    rows = [
+        (1, 'SVOD', 'Mexico', '2024-01-01', '2024-01-01', '2030-12-31', None),
+        (1, 'Free TV', 'Mexico', None, '2024-06-01', '2026-12-31', '2025-06-01'),
+        (2, 'SVOD', 'Mexico', '2025-01-01', '2024-01-01', '2028-12-31', None),
+        (2, 'SVOD', 'Brazil', '2024-01-01', '2024-01-01', '2028-12-31', None),
+        (1917, 'SVOD', 'Mexico', '2024-01-01', '2024-01-01', '2024-12-31', None),
+    ]
+    avails_df = pd.DataFrame(
+        [[pd.Timestamp(date) for date in row[3:]] for row in rows],
+        columns=['exclusive', 'non-exclusive', 'acq_expires', 'non-exclusive_end_date'],
+        index=pd.MultiIndex.from_tuples([row[:3] for row in rows], names=['title', 'group', 'country_name']),
+    )
+    title_names = pd.Series({1: 'The Movie', 2: '1917', 1917: 'Other Movie'}, name='name')
+    return AvailsIndex(avails_df, title_names, AS_OF)
+
+def titles_of(avails):
+    return sorted({avail['title'] for avail in avails})
+
+def test_lookup_by_name():
+    index = make_index()
+    avails = index.lookup(title=' the MOVIE ')
+    assert titles_of(avails) == [1]
+    assert {avail['group'] for avail in avails} == {'SVOD', 'Free TV'}
+
+def test_lookup_by_id():
+    index = make_index()
+    avails = index.lookup(title_id='1')
+    assert titles_of(avails) == [1]
+    assert avails[0]['title_name'] == 'The Movie'
+
+def test_lookup_numeric_name():
+    # A name of digits is looked up as a name, and only as an id through title_id
+    index = make_index()
+    assert titles_of(index.lookup(title='1917')) == [2]
+    assert titles_of(index.lookup(title_id='1917')) == [1917]
+    assert titles_of(index.lookup(title='1917', title_id='1917')) == [2, 1917]
+
+def test_lookup_group_and_country_are_case_insensitive():
+    index = make_index()
+    avails = index.lookup(title_id='2', group='svod', country='MEXICO')
+    assert [(avail['group'], avail['country_name']) for avail in avails] == [('SVOD', 'Mexico')]
+    assert len(index.lookup(title_id='2', group='svod')) == 2
+
+def test_available_date_ranges():
+    index = make_index()
+    start = np.datetime64('2024-02-01', 'ns')
+    # Title 1917 expires at the end of 2024
+    assert titles_of(index.available('SVOD', 'Mexico', start)) == [1, 2, 1917]
+    assert titles_of(index.available('svod', 'mexico', start, np.datetime64('2025-06-30', 'ns'))) == [1, 2]
+    # Title 2 is only available exclusively from 2025
+    assert titles_of(index.available('SVOD', 'Mexico', start, exclusive=True)) == [1, 1917]
+    # The non-exclusive Free TV avail of title 1 starts in June 2024 and ends in June 2025
+    assert titles_of(index.available('Free TV', 'Mexico', start)) == []
+    assert titles_of(index.available('Free TV', 'Mexico', np.datetime64('2024-07-01', 'ns'))) == [1]
+    assert titles_of(index.available(
+        'Free TV', 'Mexico', np.datetime64('2024-07-01', 'ns'), np.datetime64('2025-07-01', 'ns')
+    )) == []
+    assert index.available('AVOD', 'Mexico', start) == []
+
+@pytest.fixture
+def server():
+    service = SimpleNamespace(index=make_index(), last_error=None)
+    handler = type('Handler', (AvailsRequestHandler,), {'service': service, 'log_message': lambda *args: None})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+def get(url):
+    try:
+        with urllib.request.urlopen(url) as response:
+            return response.status, json.load(response)
+    except HTTPError as e:
+        return e.code, json.load(e)
+
+def test_http_avails(server):
+    status, body = get(f'{server}/avails?title=1917')
+    assert status == 200
+    assert titles_of(body['avails']) == [2]
+    status, body = get(f'{server}/avails?title_id=1917&group=svod')
+    assert status == 200
+    assert titles_of(body['avails']) == [1917]
+
+def test_http_available(server):
+    status, body = get(f'{server}/available?group=SVOD&country=Mexico&start=2024-02-01&end=2025-06-30')
+    assert status == 200
+    assert titles_of(body['avails']) == [1, 2]
+
+@pytest.mark.parametrize('path', [
+    '/avails?title_id=abc',
+    '/avails?group=SVOD',
+    '/available?group=SVOD&country=Mexico&start=2024-13-01',
+    '/available?group=SVOD&country=Mexico&start=2024-02-01&end=tomorrow',
+    '/available?group=SVOD&country=Mexico',
+])
+def test_http_bad_requests(server, path):
+    status, body = get(server + path)
+    assert status == 400
+    assert body['error']
@@ -1,27 +1,8 @@
-import os
-import sys
 import pandas as pd
-import tkinter
-from tkinter import messagebox
+import numpy as np
 import json
 import csv
 
-def get_app_dir():
-    """Get the directory where the executable or script is located."""
-    if getattr(sys, 'frozen', False):
-        # Running in a bundle (PyInstaller executable)
-        application_path = os.path.dirname(sys.executable)
-    else:
-        # Running in a normal Python environment
-        application_path = os.path.dirname(os.path.abspath(__file__))
-    return application_path
-
-def check_file(data_file):
-    # Check if the files exists
-    if not os.path.isfile(data_file):
-        messagebox.showerror("Error", f"Required file not found: {data_file}")
-        sys.exit(1)
-
 def clean_date(date_string, start_date=True):
     try:
         formated_date = pd.to_datetime(date_string)
@@ -32,6 +13,32 @@ def clean_date(date_string, start_date=True):
         if start_date:
             return pd.Timestamp('1974-11-01 00:00:00')
         return pd.Timestamp('2100-12-31 00:00:00')
+
+def clean_dates(dates, start_date=True):
+    """
+    Vectorized `clean_date` for a whole column.
+
+    Params
+    ------
+    dates : pandas.Series
+        the column to convert
+    start_date : bool
+        whether out of bounds dates are replaced with the start or the end sentinel
+
+    Returns
+    -------
+    pandas.Series
+        Returns a datetime64 series with the same sentinels as `clean_date`.
+    """
+    formated_dates = pd.to_datetime(dates, errors='coerce').copy()
+    missing = dates.isna()
+    formated_dates[missing] = pd.Timestamp('2100-12-31 00:00:00')
+    # The few values the single pass could not convert (out of bounds dates, odd
+    # formats) go through clean_date so that they get the same result as before
+    failed = formated_dates.isna() & ~missing
+    if failed.any():
+        formated_dates[failed] = dates[failed].apply(lambda x: clean_date(x, start_date=start_date))
+    return formated_dates
     
 def tidy_split(df, column, sep=',', keep=False):
     """
@@ -54,21 +61,62 @@ def tidy_split(df, column, sep=',', keep=False):
     pandas.DataFrame
         Returns a dataframe with the same columns as `df`.
     """
-    indexes = list()
-    new_values = list()
     df = df.dropna(subset=[column])
-    for i, presplit in enumerate(df[column].astype(str)):
-        values = presplit.split(sep)
-        if keep and len(values) > 1:
-            indexes.append(i)
-            new_values.append(presplit)
-        for value in values:
-            indexes.append(i)
-            new_values.append(value.strip())
-    new_df = df.iloc[indexes, :].copy()
+    presplit = df[column].astype(str)
+    values = presplit.str.split(sep).reset_index(drop=True)
+    exploded = values.explode()
+    positions = exploded.index.to_numpy()
+    new_values = exploded.str.strip().to_numpy()
+    if keep:
+        # Place the presplit value of multi-valued rows just before its parts
+        multi = (values.str.len() > 1).to_numpy()
+        positions = np.concatenate([np.flatnonzero(multi), positions])
+        new_values = np.concatenate([presplit.to_numpy()[multi], new_values])
+        order = np.argsort(positions, kind='stable')
+        positions = positions[order]
+        new_values = new_values[order]
+    new_df = df.iloc[positions, :].copy()
     new_df[column] = new_values
     return new_df
 
+def tidy_split_columns(df, columns, id_column, value_name, var_name, sep=',', keep=False):
+    """
+    Split and expand several columns at once into one long dataframe, with one
+    split value per row and the source column recorded in `var_name`.
+
+    Params
+    ------
+    df : pandas.DataFrame
+        dataframe with the columns to split and expand
+    columns : dict
+        the columns to split and expand, mapped to their label in `var_name`
+    id_column : str
+        the column kept alongside every split value
+    value_name : str
+        name of the column holding the split values
+    var_name : str
+        name of the column holding the label of the source column
+    sep : str
+        the string used to split the columns' values
+    keep : bool
+        whether to retain the presplit value as it's own row
+
+    Returns
+    -------
+    pandas.DataFrame
+        Returns a dataframe with the `value_name`, `id_column` and `var_name` columns,
+        ordered by source column and then by row.
+    """
+    long_df = df.melt(
+        id_vars=[id_column],
+        value_vars=list(columns),
+        var_name=var_name,
+        value_name=value_name
+    )
+    long_df[var_name] = long_df[var_name].map(columns)
+    long_df = tidy_split(long_df, value_name, sep=sep, keep=keep)
+    return long_df[[value_name, id_column, var_name]].reset_index(drop=True)
+
 def getCategories(df, df_name, max_unique=12):
     category_cols = [
         col for col in df.columns if (len(df[col].unique()) <= max_unique) and (df[col].dtype not in [bool, int])
@@ -79,191 +127,117 @@ def getCategories(df, df_name, max_unique=12):
     with open(df_name+"_enums.json", "w") as outfile:
         json.dump(categories, outfile)
 
-def avails_region(cell):
-    latam_countries = [
-        'Costa Rica',
-        'El Salvador',
-        'Guatemala',
-        'Honduras',
-        'Nicaragua',
-        'Panama',
-        'Mexico',
-        'Argentina',
-        'Bolivia',
-        'Brazil',
-        'Chile',
-        'Colombia',
-        'Ecuador',
-        'Paraguay',
-        'Peru',
-        'Uruguay',
-        'Venezuela'
-    ]
+def render_value(cell):
+    """
+    Render one cell as display text, by type: missing values as '', lists as
+    their comma separated items, sets sorted, dictionaries as 'key: value'
+    pairs, and strings as they are.
+    """
+    if isinstance(cell, str):
+        return cell
+    if isinstance(cell, dict):
+        return ', '.join(f'{key}: {render_value(value)}' for key, value in cell.items())
+    if isinstance(cell, (set, frozenset)):
+        return ', '.join(sorted(render_value(value) for value in cell))
+    if isinstance(cell, (list, tuple, np.ndarray)):
+        return ', '.join(render_value(value) for value in cell)
+    if pd.isna(cell):
+        return ''
+    return str(cell)
+
+def render_dates(values):
+    """
+    Render a column of dates as 'YYYY-MM-DD' text in one conversion, missing
+    dates as ''.
 
-    latam_ex_mex = [
-        'Costa Rica',
-        'El Salvador',
-        'Guatemala',
-        'Honduras',
-        'Nicaragua',
-        'Panama',
-        'Argentina',
-        'Bolivia',
-        'Brazil',
-        'Chile',
-        'Colombia',
-        'Ecuador',
-        'Paraguay',
-        'Peru',
-        'Uruguay',
-        'Venezuela'
-    ]
+    Params
+    ------
+    values : pandas.Series
+        datetime64 column, other columns are converted with `pd.to_datetime`
 
-    latam_ex_brz = [
-        'Costa Rica',
-        'El Salvador',
-        'Guatemala',
-        'Honduras',
-        'Nicaragua',
-        'Panama',
-        'Mexico',
-        'Argentina',
-        'Bolivia',
-        'Chile',
-        'Colombia',
-        'Ecuador',
-        'Paraguay',
-        'Peru',
-        'Uruguay',
-        'Venezuela'
-    ]
+    Returns
+    -------
+    pandas.Series
+        Returns an object series of strings.
+    """
+    if not pd.api.types.is_datetime64_dtype(values):
+        values = pd.to_datetime(values)
+    days = values.to_numpy(dtype='datetime64[D]')
+    text = np.datetime_as_string(days).astype(object)
+    text[np.isnat(days)] = ''
+    return pd.Series(text, index=values.index, name=values.name, dtype=object)
+
+def render_date_pairs(dates):
+    """
+    Render each row of a matrix of dates as the 'column: YYYY-MM-DD' pairs of its
+    dates, in the order of the columns, e.g. 'Distributor 2_License: 2020-11-06'.
 
-    latam_ex_mex_brz = [
-        'Costa Rica',
-        'El Salvador',
-        'Guatemala',
-        'Honduras',
-        'Nicaragua',
-        'Panama',
-        'Argentina',
-        'Bolivia',
-        'Chile',
-        'Colombia',
-        'Ecuador',
-        'Paraguay',
-        'Peru',
-        'Uruguay',
-        'Venezuela'
-    ]
+    Params
+    ------
+    dates : pandas.DataFrame
+        the date columns
 
-    caribbean = [
-        'Anguilla',
-        'Antigua and Barbuda',
-        'Aruba',
-        'Bahamas',
-        'Barbados',
-        'Bermuda',
-        'Bonaire',
-        'British Virgin Islands',
-        'Cayman Islands',
-        'Cuba',
-        'Curaçao',
-        'Dominica',
-        'Dominican Republic',
-        'Grenada',
-        'Guadeloupe',
-        'Haiti',
-        'Jamaica',
-        'Martinique',
-        'Montserrat',
-        'Puerto Rico',
-        'Saint Barthélemy',
-        'Saint Kitts and Nevis',
-        'Saint Lucia',
-        'Saint Vincent and the Grenadines',
-        'Sint Eustatius',
-        'Sint Maarten',
-        'Trinidad and Tobago',
-        'Turks and Caicos Islands',
-        'United States Virgin Islands',
-    ]
+    Returns
+    -------
+    pandas.Series
+        Returns an object series of strings, '' for a row without dates.
+    """
+    text = np.full(dates.shape[0], '', dtype=object)
+    for col in dates.columns:
+        rendered = render_dates(dates[col]).to_numpy()
+        present = rendered != ''
+        pairs = f'{col}: ' + rendered[present]
+        previous = text[present]
+        text[present] = np.where(previous == '', pairs, previous + ', ' + pairs)
+    return pd.Series(text, index=dates.index, dtype=object)
+
+def render_values(values):
+    """
+    Render a whole column as display text by type, datetime64 columns are
+    rendered by `render_dates`.
 
-    dependencies = ['Guyana', 'French Guiana', 'Suriname', 'Belize']
+    Unlike the former `clean_str` (`benchmarks._clean_str`), the text of a string is kept as it is ('Fernanda' keeps
+    its 'nan'), and only the missing values become ''. Columns of strings or of
+    scalars and lists of strings are rendered with vectorized operations, only
+    the other containers (e.g. dictionaries) are rendered one by one.
 
-    world = set(['Moldova', 'Malaysia', 'Qatar', 'Luxembourg', 'Portugal', 'Kenya', 'United Kingdom', 'Ghana', 'Andorra', 'South Korea', 'Latvia', 'Mayotte', 'Comoros', 'Turkmenistan', 'South Africa', 'Ukraine', 'Singapore', 'Kazakhstan', 'India', 'Slovenia', 'Bahrain', 'Indonesia', 'Lebanon', 'Tajikistan', 'Cambodia', 'Syria', 'Cameroon', 'Burundi', 'Tonga', 'Lithuania', 'Gabon', 'Bosnia and Herzegovina', 'Romania', 'Finland', 'Spain', 'Mauritania', 'Croatia', 'Djibouti', 'Bulgaria', 'Tanzania', 'South Sudan', 'Greece', 'Sudan', 'Brunei', 'Vietnam', 'North Korea', 'Philippines', 'Pakistan', 'Papua New Guinea', 'Uzbekistan', 'Sweden', 'Azerbaijan', 'New Zealand', 'Liberia', 'Vanuatu', 'Yemen', 'Russia', 'Czech Republic', 'Taiwan', 'Mongolia', 'Senegal', 'Botswana', 'Georgia', 'Serbia', 'United Arab Emirates', 'Iran', 'France', 'Saudi Arabia', 'Liechtenstein', 'Uganda', 'Zambia', 'Montenegro', 'Cyprus', 'Bermuda', 'Puerto Rico', 'Australia', 'Central African Republic', 'Iceland', 'Burkina Faso', 'Germany', 'Algeria', 'Denmark', 'Malta', 'Benin', 'Hungary', 'Solomon Islands', 'Bangladesh', 'Mauritius', 'Nepal', 'Norway', 'Lesotho', 'Belgium', 'Kyrgyzstan', 'New Caledonia', 'Fiji', 'Italy', 'Malawi', 'Bahamas', 'Seychelles', 'Madagascar', 'Sri Lanka', 'Kosovo', 'Israel', 'Laos', 'Togo', 'Canada', 'Guinea', 'Zimbabwe', 'French Polynesia', 'Albania', 'China', 'Mali', 'Ethiopia', 'Morocco', 'Namibia', 'Egypt', 'Japan', 'Bhutan', 'Belarus', 'Sierra Leone', 'Equatorial Guinea', 'Jordan', 'Estonia', 'Armenia', 'Turkey', 'Chad', 'Rwanda', 'Guinea-Bissau', 'Hong Kong', 'Switzerland', 'Nigeria', 'Kuwait', 'Monaco', 'Poland', 'Eritrea', 'Afghanistan', 'Iraq', 'Tuvalu', 'Mozambique', 'Ireland', 'Kiribati', 'Niger', 'Angola', 'Tunisia', 'Slovakia', 'Somalia', 'Libya', 'Thailand', 'Austria', 'Oman'])
+    Params
+    ------
+    values : pandas.Series
+        the column to render
 
-    cell = cell - set(caribbean) - set(dependencies)
-    if (
-        set(latam_countries).issubset(cell) and \
-        len(set(world).intersection(cell)) <= 16
-    ):
-        return 'All Latam'
-    elif (
-        set(latam_ex_mex).issubset(cell) and \
-        len(set(world).intersection(cell)) <= 16
-    ):
-        return 'Latam excluding Mexico'
-    elif (
-        set(latam_ex_brz).issubset(cell) and \
-        len(set(world).intersection(cell)) <= 16
-    ):
-        return 'Latam excluding Brazil'
-    elif (
-        set(latam_ex_mex_brz).issubset(cell) and \
-        len(set(world).intersection(cell)) <= 16
-    ):
-        return 'Latam excluding Mexico and Brazil'
-    elif (
-        len(set(world).intersection(cell)) >= 50 and \
-        len(set(latam_countries).intersection(cell)) >= 16
-    ):
-        return 'Worldwide'
-    elif (
-        len(set(world).intersection(cell)) >= 50 and \
-        len(set(latam_countries).intersection(cell)) < 16
-    ):
-        return 'Worldwide excluding Latam'
+    Returns
+    -------
+    pandas.Series
+        Returns an object series of strings.
+    """
+    if pd.api.types.is_datetime64_dtype(values):
+        return render_dates(values)
+    kind = pd.api.types.infer_dtype(values, skipna=True)
+    missing = values.isna().to_numpy()
+    if kind in ['string', 'empty']:
+        text = values.to_numpy(dtype=object).copy()
+    elif kind in ['integer', 'floating', 'boolean', 'date', 'datetime', 'decimal']:
+        text = values.astype(str).to_numpy(dtype=object)
     else:
-        return cell
-
-def clean_str(cell):
-    # Define the characters to remove
-    chars_to_remove = '[]{}\"\''
-
-    # Create a translation table that maps the unwanted characters to None
-    translation_table = str.maketrans('', '', chars_to_remove)
-
-    # Apply the translation table to the input string
-    new_cell = str(cell).translate(translation_table)
-    new_cell = new_cell.replace('None', '')
-    new_cell = new_cell.replace('nan', '')
-    new_cell = new_cell.replace('NaT', '')
-    return new_cell
+        # Strings mixed with containers or numbers. The lists of strings are joined
+        # in one pass, only the other cells are rendered one by one
+        text = values.to_numpy(dtype=object).copy()
+        types = values.map(type).to_numpy()
+        lists = ~missing & (types == list)
+        if lists.any():
+            joined = pd.Series(text[lists], dtype=object).str.join(', ').to_numpy(dtype=object)
+            # A list holding other than strings is joined to NaN
+            failed = pd.isna(joined)
+            joined[failed] = [render_value(cell) for cell in text[lists][failed]]
+            text[lists] = joined
+        rest = ~missing & ~lists & (types != str)
+        text[rest] = [render_value(cell) for cell in text[rest]]
+    text[missing] = ''
+    return pd.Series(text, index=values.index, name=values.name, dtype=object)
 
 # read the first row of a csv file into a list
 def read_csv_header(csv_file):
     with open(csv_file, 'r') as f:
         reader = csv.reader(f)
         return next(reader)
-    
-# Function to apply on each row
-def max_date(row):
-    today = pd.to_datetime('today')
-    if today < row[('start_date', 'Sales', 'License')]:
-        # Exclude 'sales_start_date' and 'sales_end_date', and return max date
-        return max(row.drop([('start_date', 'Sales', 'License'), ('end_date', 'Sales', 'License')]))
-    else:
-        # Return max date of the entire row
-        return max(row)
-    
-def non_exclusive_end_date(row):
-    sales_dates = [row.iloc[2], 
-                row.iloc[3]]
-    valid_dates = [
-        date for date in sales_dates if row.iloc[0] <= date <= row.iloc[1]
-    ]
-    
-    if valid_dates:
-        return min(valid_dates)
-    else:
-        return pd.NaT
\ No newline at end of file